@@ -0,0 +1,109 @@
+"""
+Event-loop lag benchmark for CPU-bound parsing.
+
+Runs N concurrent search_airbnb_listings calls against an in-process mock of Airbnb
+and samples how late a 5 ms ticker wakes up while the searches run. The "inline" mode
+parses on the event loop (the behaviour before the parse executor existed); "thread"
+and "process" run parsing in the configured executor.
+
+Usage:
+    python benchmarks/event_loop_lag.py [--searches 8] [--pages 2] [--modes inline,thread,process]
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+import fixtures
+import main
+
+TICK = 0.005
+
+def build_transport(searches: int, pages: int, latency: float) -> httpx.MockTransport:
+    """
+    Pre-renders every page up front so building fixtures never runs on the measured event loop.
+    """
+    room_template = fixtures.room_page('LISTING_ID')
+    search_pages = {
+        (f"/s/City%20{i}/homes", page): fixtures.search_page(i, page)
+        for i in range(searches) for page in range(pages)
+    }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        room = re.search(r'/rooms/(\d+)', request.url.path)
+        if room:
+            return httpx.Response(200, text=room_template.replace('LISTING_ID', room.group(1)))
+        cursor = request.url.params.get('cursor')
+        page = int(cursor.rsplit('-', 1)[1]) if cursor else 0
+        return httpx.Response(200, text=search_pages[(request.url.raw_path.split(b'?')[0].decode(), page)])
+
+    return httpx.MockTransport(handler)
+
+async def sample_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+async def run_mode(mode: str, searches: int, pages: int, latency: float) -> dict:
+    main.PARSE_EXECUTOR = mode
+    main.shutdown_parse_executor()
+    main.listing_details_cache.clear()
+    main.listing_info_cache.clear()
+    main.section_index_cache.clear()
+    main.search_results_cache.clear()
+    main._http_client = httpx.AsyncClient(transport=build_transport(searches, pages, latency))
+    # Warm the pool outside the measurement
+    await main.run_cpu_bound(len, "warm-up")
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(sample_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        main.search_airbnb_listings(f"City {i}", "2030-08-01", "2030-08-05", max_pages=pages)
+        for i in range(searches)
+    ])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    await main.close_http_client()
+    main.shutdown_parse_executor()
+    lags.sort()
+    return {
+        'mode': mode,
+        'wall_s': elapsed,
+        'lag_p50_ms': statistics.median(lags) * 1000,
+        'lag_p99_ms': lags[int(len(lags) * 0.99) - 1] * 1000,
+        'lag_max_ms': lags[-1] * 1000,
+    }
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--searches', type=int, default=8)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated response latency in seconds')
+    parser.add_argument('--modes', default='inline,thread,process')
+    args = parser.parse_args()
+
+    # Keep the rate limiter out of the way; this benchmark measures parsing only
+    main.detail_scheduler = main.DetailFetchScheduler(max_concurrency=64, initial_rate=10_000, max_rate=10_000, burst=10_000)
+
+    print(f"{args.searches} concurrent searches x {args.pages} pages")
+    print(f"{'mode':<8} {'wall s':>8} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for mode in args.modes.split(','):
+        result = asyncio.run(run_mode(mode, args.searches, args.pages, args.latency))
+        print(f"{result['mode']:<8} {result['wall_s']:>8.2f} {result['lag_p50_ms']:>11.1f} {result['lag_p99_ms']:>11.1f} {result['lag_max_ms']:>11.1f}")
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,86 @@
+"""
+Synthetic Airbnb pages for the benchmarks.
+
+The pages mirror the structure the scraper reads (a large HTML document with the
+data-deferred-state-0 JSON payload in the middle), padded to realistic sizes.
+"""
+import base64
+import json
+
+def _listing(listing_id: int, index: int) -> dict:
+    return {
+        "demandStayListing": {
+            "id": base64.b64encode(f"DemandStayListing:{listing_id}".encode()).decode(),
+            "description": {"name": {"localizedStringWithTranslationPreference": f"Bright apartment {listing_id}"}},
+            "location": {"coordinate": {"latitude": 22.28 + index * 0.001, "longitude": 114.15 + index * 0.001}},
+        },
+        "structuredContent": {
+            "secondaryLine": [{"body": f"{1 + index % 3} beds"}, {"body": f"{2 + index % 4} guests"}],
+            "distance": [],
+            "mapCategoryInfo": [],
+        },
+        "passportData": {
+            "name": "Alex",
+            "ratingCount": 10 + index,
+            "isVerified": True,
+            "isSuperhost": index % 2 == 0,
+            "timeAsHost": {"years": 1 + index % 5, "months": index % 12},
+        },
+        "structuredDisplayPrice": {"primaryLine": {"accessibilityLabel": f"${50 + index} CAD per night", "qualifier": "night"}},
+        "avgRatingA11yLabel": f"{4 + (index % 10) / 10:.2f} out of 5 average rating, {10 + index} reviews",
+        "contextualPictures": [{"picture": f"https://a0.muscache.com/im/pictures/{listing_id}/{k}.jpg"} for k in range(8)],
+        "badges": [{"id": "GUEST_FAVORITE"}] if index % 3 == 0 else [],
+        "listingParamOverrides": {"pricingMetadata": [{"key": k, "value": "x" * 24} for k in range(300)]},
+    }
+
+def _page(payload: dict, padding: int) -> str:
+    filler = '<div class="c1">' + "<span>layout</span>" * 40 + "</div>"
+    head = filler * (padding // len(filler) // 2)
+    tail = "<script>window.__bootstrap=" + json.dumps({"chunk": "y" * (padding // 2)}) + "</script>"
+    return (
+        "<!doctype html><html><head><title>Airbnb</title></head><body>"
+        f"{head}"
+        f'<script id="data-deferred-state-0" data-deferred-state-0="true" type="application/json">{json.dumps(payload)}</script>'
+        f"{tail}</body></html>"
+    )
+
+def search_page(seed: int, page: int, per_page: int = 18, overlap: int = 3, last_page: int = 5, padding: int = 400_000) -> str:
+    """
+    Returns a search results page. Consecutive pages repeat `overlap` listings, like Airbnb's cursors do.
+    """
+    start = seed * 100_000 + page * (per_page - overlap)
+    results = [_listing(1_000_000 + start + i, page * per_page + i) for i in range(per_page)]
+    payload = {
+        "niobeMinimalClientData": [["StaysSearch", {"data": {"presentation": {"staysSearch": {"results": {
+            "searchResults": results,
+            "paginationInfo": {"nextPageCursor": f"cursor-{page + 1}" if page + 1 < last_page else None},
+        }}}}}]]
+    }
+    return _page(payload, padding)
+
+def room_page(listing_id: str, padding: int = 600_000) -> str:
+    """
+    Returns a listing page with the stayProductDetail and stayProductDetailPage sections the tools read.
+    """
+    section_data = [
+        {"sectionType": "HIGHLIGHTS", "sectionItems": [
+            {"title": "2 beds", "subtitle": "2 beds"},
+            {"title": "1 bedroom", "subtitle": "1 bedroom"},
+            {"title": "1 bath", "subtitle": "1 bath"},
+        ]},
+        {"sectionType": "AMENITIES", "sectionItems": [{"title": t} for t in ("Wifi", "Kitchen", "Washer", "Air conditioning", "Dedicated workspace")]},
+        {"sectionType": "LOCATION", "title": f"Central, Hong Kong ({listing_id})"},
+        {"sectionType": "REVIEWS", "sectionItems": [{"title": f"Review {k}", "subtitle": "Great stay " * 20} for k in range(40)]},
+    ]
+    sections = [
+        {"sectionComponentType": kind, "section": {"title": kind, "items": [{"id": k, "text": "z" * 32} for k in range(800)]}}
+        for kind in ("PDP_DESCRIPTION_MODAL", "LOCATION_PDP", "MEET_YOUR_HOST", "REVIEWS_DEFAULT",
+                     "POLICIES_DEFAULT", "BOOK_IT_SIDEBAR", "HERO_DEFAULT")
+    ]
+    payload = {
+        "niobeMinimalClientData": [["StaysPdpSections", {"data": {"presentation": {
+            "stayProductDetail": {"sections": {"sectionData": section_data}},
+            "stayProductDetailPage": {"sections": {"sections": sections}},
+        }}}]]
+    }
+    return _page(payload, padding)
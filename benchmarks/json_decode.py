@@ -0,0 +1,105 @@
+"""
+Benchmark for decoding page payloads: decode time and peak memory of the three AIRBNB_JSON_DECODE modes.
+
+"full" decodes the whole data-deferred-state-0 payload with json.loads, "targeted" decodes only the
+subtrees the parsers read (staysSearch on search pages, stayProductDetail and stayProductDetailPage on
+listing pages) and "orjson" decodes the whole payload with orjson, when it is installed.
+Payloads come from recorded pages (see record_fixtures.py) when --fixtures is given, otherwise from
+the synthetic pages of fixtures.py. Real pages carry more niobeMinimalClientData entries than the
+parsers read, so --sibling-kb adds an unrelated entry of that size to the synthetic payloads.
+
+Usage:
+    python benchmarks/json_decode.py [--fixtures DIR] [--sibling-kb 500] [--repeat 20]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from fixtures import room_page, search_page
+
+SUBTREES = {
+    'search': ('staysSearch',),
+    'room': ('stayProductDetail', 'stayProductDetailPage'),
+}
+
+def recorded_payloads(directory: str) -> list[tuple[str, str]]:
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        kind = 'search' if os.path.basename(path).startswith('search-') else 'room'
+        with open(path, encoding='utf-8') as f:
+            deferred_state = main.extract_deferred_state(f.read())
+        if deferred_state:
+            payloads.append((f"{kind} {os.path.basename(path)}", deferred_state))
+    return payloads
+
+def with_sibling(deferred_state: str, size_kb: int) -> str:
+    """
+    Appends an unrelated niobeMinimalClientData entry, as real pages have, of roughly size_kb kilobytes.
+    """
+    data = json.loads(deferred_state)
+    reviews = [{"id": str(i), "comments": "Lovely place, would stay again. " * 8, "reviewer": {"firstName": "Guest"}}
+               for i in range(size_kb * 1024 // 330)]
+    data["niobeMinimalClientData"].append(["StaysPdpReviews", {"data": {"presentation": {"reviews": reviews}}}])
+    return json.dumps(data)
+
+def synthetic_payloads(sibling_kb: int) -> list[tuple[str, str]]:
+    pages = [('search', main.extract_deferred_state(search_page(0, 0))), ('room', main.extract_deferred_state(room_page('1000001')))]
+    payloads = []
+    for kind, deferred_state in pages:
+        payloads.append((kind, deferred_state))
+        if sibling_kb:
+            payloads.append((f"{kind} + {sibling_kb}KB sibling", with_sibling(deferred_state, sibling_kb)))
+    return payloads
+
+def decoders(kind: str) -> list[tuple[str, object]]:
+    modes = [
+        ('full', json.loads),
+        ('targeted', lambda doc: [main.decode_json_subtree(doc, key) for key in SUBTREES[kind]]),
+    ]
+    try:
+        import orjson
+        modes.append(('orjson', orjson.loads))
+    except ImportError:
+        pass
+    return modes
+
+def best_of(func, document: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(document)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def peak_memory(func, document: str) -> int:
+    tracemalloc.start()
+    try:
+        func(document)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--fixtures', help='directory of recorded HTML fixtures')
+    parser.add_argument('--sibling-kb', type=int, default=500, help='size of the unrelated entry added to synthetic payloads (0 for none)')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = recorded_payloads(args.fixtures) if args.fixtures else synthetic_payloads(args.sibling_kb)
+    print(f"{'payload':<34} {'KB':>6}  {'mode':<9} {'ms':>7} {'peak MB':>8}")
+    for name, document in payloads:
+        for mode, func in decoders(name.split()[0]):
+            elapsed = best_of(func, document, args.repeat)
+            peak = peak_memory(func, document)
+            print(f"{name[:34]:<34} {len(document) // 1024:>6}  {mode:<9} {elapsed * 1000:>7.2f} {peak / 2**20:>8.2f}")
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,128 @@
+"""
+Load test of the HTTP transport.
+
+Starts mock_airbnb.py and the server in streamable HTTP mode (AIRBNB_MCP_TRANSPORT=streamable-http),
+each in its own process, then opens N concurrent MCP sessions that each call search_airbnb_listings.
+Sessions cycle through --places distinct places, so sessions asking for the same place share one crawl
+and the listing detail cache in the server. Reports session latency percentiles, the requests the mock
+received (compare them with one session's requests times N) and the server's /health and statistics.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 20] [--places 4] [--pages 1] [--detail-level full]
+                                   [--workers 1] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(os.path.dirname(BENCHMARK_DIR), 'main.py')
+sys.path.insert(0, BENCHMARK_DIR)
+
+from run_benchmark import percentile, start_mock_server
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(args: argparse.Namespace, mock_url: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'AIRBNB_BASE_URL': mock_url,
+        'AIRBNB_MCP_TRANSPORT': 'streamable-http',
+        'AIRBNB_MCP_PORT': str(port),
+        'AIRBNB_MCP_WORKERS': str(args.workers),
+    }
+    env.pop('AIRBNB_DISK_CACHE_PATH', None)
+    return subprocess.Popen([sys.executable, MAIN], cwd=args.workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_healthy(base_url: str, timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                response = await client.get(f"{base_url}/health")
+                if response.status_code == 200:
+                    return response.json()
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Server did not become healthy")
+            await asyncio.sleep(0.1)
+
+async def session(base_url: str, index: int, args: argparse.Namespace) -> tuple[float, int]:
+    """
+    Runs one MCP session making one search; returns its latency and the number of listings found.
+    """
+    started = time.perf_counter()
+    async with streamablehttp_client(f"{base_url}/mcp") as (read, write, _):
+        async with ClientSession(read, write) as client:
+            await client.initialize()
+            result = await client.call_tool('search_airbnb_listings', {
+                'place': f"City {index % args.places}", 'checkin_date': '2030-08-01', 'checkout_date': '2030-08-05',
+                'max_pages': args.pages, 'detail_level': args.detail_level,
+            })
+    text = result.content[0].text if result.content else ''
+    return time.perf_counter() - started, len(json.loads(text)) if text.startswith('[') else 0
+
+async def run(args: argparse.Namespace, base_url: str, mock_url: str) -> None:
+    health = await wait_healthy(base_url)
+    print(f"Server ready: {health}")
+    async with httpx.AsyncClient() as client:
+        await client.get(f"{mock_url}/__reset")
+        started = time.perf_counter()
+        results = await asyncio.gather(*(session(base_url, i, args) for i in range(args.sessions)), return_exceptions=True)
+        wall = time.perf_counter() - started
+        mock_stats = (await client.get(f"{mock_url}/__stats")).json()
+        health = (await client.get(f"{base_url}/health")).json()
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    latencies = [result[0] for result in results if not isinstance(result, BaseException)]
+    listings = [result[1] for result in results if not isinstance(result, BaseException)]
+    print(f"\n{args.sessions} concurrent sessions, {args.places} places, {args.workers} worker(s): wall {wall:.2f} s")
+    if latencies:
+        print(f"  session latency p50 {percentile(latencies, 0.50) * 1000:8.1f} ms   p95 {percentile(latencies, 0.95) * 1000:8.1f} ms"
+              f"   p99 {percentile(latencies, 0.99) * 1000:8.1f} ms")
+        print(f"  listings per session {min(listings)}-{max(listings)}")
+    print(f"  failed sessions {len(failures)}" + (f" (first: {failures[0]!r})" if failures else ''))
+    print(f"  mock requests {mock_stats['requests']} ({mock_stats['search_requests']} search, {mock_stats['room_requests']} room),"
+          f" {mock_stats['requests'] / max(1, args.sessions):.1f} per session")
+    print(f"Server after the run: {health}")
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--places', type=int, default=4, help='distinct places cycled through by the sessions')
+    parser.add_argument('--pages', type=int, default=1)
+    parser.add_argument('--detail-level', default='full')
+    parser.add_argument('--workers', type=int, default=1, help='AIRBNB_MCP_WORKERS of the server')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--fixtures', help='directory of recorded HTML fixtures (see record_fixtures.py)')
+    parser.add_argument('--workdir', default=BENCHMARK_DIR, help='working directory of the server (scraper.log goes there)')
+    args = parser.parse_args()
+    args.error_rate, args.error_status = 0.0, 429
+
+    mock, mock_url = start_mock_server(args)
+    port = free_port()
+    server = start_server(args, mock_url, port)
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{port}", mock_url))
+    finally:
+        server.terminate()
+        server.wait()
+        mock.terminate()
+        mock.wait()
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,165 @@
+"""
+Local stand-in for airbnb.ca used by the benchmarks.
+
+Serves search result pages (/s/<place>/homes) and listing pages (/rooms/<id>) either from
+recorded HTML fixtures (see record_fixtures.py) or from synthetic pages, with configurable
+latency and error injection. GET /__stats returns request and byte counters; GET /__reset clears them.
+
+Usage:
+    python benchmarks/mock_airbnb.py [--port 8765] [--latency 0.05] [--error-rate 0.02] [--fixtures DIR]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+
+NEXT_CURSOR_RE = re.compile(r'"nextPageCursor"\s*:\s*"([^"]+)"')
+ROOM_PATH_RE = re.compile(r'^/rooms/(\d+)')
+
+class FixtureStore:
+    """
+    Page source: recorded HTML when a fixtures directory is given, synthetic pages otherwise.
+    Recorded search pages are named search-<n>.html and listing pages room-<id>.html.
+    """
+
+    def __init__(self, directory: str | None, last_page: int):
+        self.last_page = last_page
+        self.search_pages: list[bytes] = []
+        self.room_pages: dict[str, bytes] = {}
+        self.cursor_pages: dict[str, int] = {}
+        if directory:
+            self._load(directory)
+        self._room_template = fixtures.room_page('LISTING_ID').encode()
+
+    def _load(self, directory: str) -> None:
+        names = sorted(os.listdir(directory))
+        search_names = sorted((n for n in names if n.startswith('search-')), key=lambda n: int(n[7:-5]))
+        for index, name in enumerate(search_names):
+            with open(os.path.join(directory, name), 'rb') as f:
+                page = f.read()
+            self.search_pages.append(page)
+            cursor = NEXT_CURSOR_RE.search(page.decode('utf-8', 'replace'))
+            if cursor:
+                self.cursor_pages[cursor.group(1)] = index + 1
+        for name in names:
+            if name.startswith('room-'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    self.room_pages[name[5:-5]] = f.read()
+
+    def search_page(self, path: str, cursor: str | None) -> bytes:
+        if self.search_pages:
+            index = self.cursor_pages.get(cursor, 0) if cursor else 0
+            return self.search_pages[min(index, len(self.search_pages) - 1)]
+        page = int(cursor.rsplit('-', 1)[1]) if cursor else 0
+        return self._synthetic_search_page(sum(map(ord, path)) % 1000, page)
+
+    @lru_cache(maxsize=256)
+    def _synthetic_search_page(self, seed: int, page: int) -> bytes:
+        return fixtures.search_page(seed, page, last_page=self.last_page).encode()
+
+    def room_page(self, listing_id: str) -> bytes:
+        if self.room_pages:
+            return self.room_pages.get(listing_id) or next(iter(self.room_pages.values()))
+        return self._room_template.replace(b'LISTING_ID', listing_id.encode())
+
+class MockAirbnbServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store: FixtureStore, latency: float, jitter: float, error_rate: float, error_status: int):
+        super().__init__(address, MockAirbnbHandler)
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.stats = {'requests': 0, 'search_requests': 0, 'room_requests': 0, 'errors': 0, 'bytes_sent': 0}
+
+    def count(self, kind: str, size: int, error: bool) -> None:
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats[f'{kind}_requests'] += 1
+            self.stats['errors'] += int(error)
+            self.stats['bytes_sent'] += size
+
+class MockAirbnbHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = 'text/html; charset=utf-8') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        server: MockAirbnbServer = self.server
+        parsed = urlparse(self.path)
+        if parsed.path == '/__stats':
+            with server.lock:
+                body = json.dumps(server.stats).encode()
+            return self._send(200, body, 'application/json')
+        if parsed.path == '/__reset':
+            server.reset_stats()
+            return self._send(200, b'{}', 'application/json')
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        room = ROOM_PATH_RE.match(parsed.path)
+        kind = 'room' if room else 'search'
+        if random.random() < server.error_rate:
+            body = b'<html><body>Too many requests</body></html>'
+            server.count(kind, len(body), True)
+            return self._send(server.error_status, body)
+
+        if room:
+            body = server.store.room_page(room.group(1))
+        else:
+            cursor = parse_qs(parsed.query).get('cursor', [None])[0]
+            body = server.store.search_page(parsed.path, cursor)
+        server.count(kind, len(body), False)
+        self._send(200, body)
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='0 picks a free port')
+    parser.add_argument('--latency', type=float, default=0.05, help='base response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='extra random latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=429)
+    parser.add_argument('--last-page', type=int, default=5, help='number of synthetic search pages per place')
+    parser.add_argument('--fixtures', help='directory of recorded HTML fixtures')
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures, args.last_page)
+    server = MockAirbnbServer((args.host, args.port), store, args.latency, args.jitter, args.error_rate, args.error_status)
+    # The first line on stdout is the base URL, so a parent process can start the server on port 0
+    print(f"http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,63 @@
+"""
+Records Airbnb pages as HTML fixtures for the offline benchmarks.
+
+Fetches the search result pages for one search and a sample of its listing pages through the
+server's own HTTP client and saves them as search-<n>.html and room-<id>.html. Run it sparingly:
+it talks to the live site.
+
+Usage:
+    python benchmarks/record_fixtures.py "Hong Kong" 2025-08-01 2025-08-06 --pages 2 --rooms 10 --out benchmarks/recorded
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+async def record(args: argparse.Namespace) -> None:
+    os.makedirs(args.out, exist_ok=True)
+    initial_url = url = main.build_search_url(args.place, args.checkin, args.checkout, price_max=args.price_max)
+    listing_ids: list[str] = []
+    for page in range(args.pages):
+        html_content = await main.get_page_html_async(url, early_stop=False)
+        if html_content is None:
+            print(f"Search page {page} could not be fetched; stopping.")
+            break
+        with open(os.path.join(args.out, f"search-{page}.html"), 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        deferred_state = main.extract_deferred_state(html_content)
+        if deferred_state is None:
+            print(f"Search page {page} has no data-deferred-state-0 payload; stopping.")
+            break
+        rooms, pagination = main.parse_search_results(deferred_state, args.checkin, args.checkout, 1, 1)
+        listing_ids.extend(room.listing_id for room in rooms if room.listing_id is not None)
+        cursor = pagination.get('nextPageCursor')
+        if not cursor:
+            break
+        # Same URL as crawl_search_listings requests, so the recorded pages match a real crawl
+        url = main.next_page_url(initial_url, cursor)
+
+    for listing_id in list(dict.fromkeys(listing_ids))[:args.rooms]:
+        html_content = await main.get_page_html_async(f"{main.BASE_AIRBNB_ROOM_URL}{listing_id}", early_stop=False)
+        if html_content is not None:
+            with open(os.path.join(args.out, f"room-{listing_id}.html"), 'w', encoding='utf-8') as f:
+                f.write(html_content)
+    await main.close_http_client()
+    print(f"Saved fixtures to {args.out}")
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('place')
+    parser.add_argument('checkin')
+    parser.add_argument('checkout')
+    parser.add_argument('--price-max', type=int, default=1000)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recorded'))
+    asyncio.run(record(parser.parse_args()))
+
+if __name__ == '__main__':
+    main_cli()
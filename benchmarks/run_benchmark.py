@@ -0,0 +1,140 @@
+"""
+End-to-end offline benchmark.
+
+Starts mock_airbnb.py in a separate process, points the server at it through AIRBNB_BASE_URL and
+drives search_airbnb_listings and scrape_airbnb_listing_info. Reports p50/p95/p99 latency, requests
+and bytes per call, and wall/CPU time per phase (fetch, parse, enrich, serialize). Only the client
+process is measured; the mock server runs in its own process.
+
+Usage:
+    python benchmarks/run_benchmark.py [--searches 20] [--pages 2] [--listing-info 20] [--latency 0.05]
+                                       [--error-rate 0.0] [--fixtures DIR] [--detail-level full] [--warm]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+def start_mock_server(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    command = [
+        sys.executable, os.path.join(BENCHMARK_DIR, 'mock_airbnb.py'), '--port', '0',
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--error-rate', str(args.error_rate), '--error-status', str(args.error_status),
+    ]
+    if args.fixtures:
+        command += ['--fixtures', args.fixtures]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("Mock Airbnb server did not start")
+    return process, base_url
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(name: str, latencies: list[float], requests: list[int], sent_bytes: list[int]) -> None:
+    if not latencies:
+        return
+    print(f"\n{name} ({len(latencies)} calls)")
+    print(f"  latency p50 {percentile(latencies, 0.50) * 1000:8.1f} ms   p95 {percentile(latencies, 0.95) * 1000:8.1f} ms"
+          f"   p99 {percentile(latencies, 0.99) * 1000:8.1f} ms")
+    print(f"  requests/call {statistics.mean(requests):6.1f}   bytes/call {statistics.mean(sent_bytes) / 1024:10.1f} KiB")
+
+async def server_stats(main, base_url: str, reset: bool = False) -> dict:
+    response = await main.get_http_client().get(f"{base_url}/{'__reset' if reset else '__stats'}")
+    return response.json()
+
+def clear_caches(main) -> None:
+    main.listing_details_cache.clear()
+    main.listing_info_cache.clear()
+    main.section_index_cache.clear()
+    main.search_results_cache.clear()
+
+async def run(args: argparse.Namespace, base_url: str) -> None:
+    import main
+
+    latencies: dict[str, list[float]] = {'search_airbnb_listings': [], 'scrape_airbnb_listing_info': []}
+    requests: dict[str, list[int]] = {name: [] for name in latencies}
+    sent_bytes: dict[str, list[int]] = {name: [] for name in latencies}
+    listing_urls: list[str] = []
+
+    main.phase_timings.reset()
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+
+    for i in range(args.searches):
+        if not args.warm:
+            clear_caches(main)
+        await server_stats(main, base_url, reset=True)
+        started = time.perf_counter()
+        result = await main.search_airbnb_listings(
+            f"City {i % args.places}", "2030-08-01", "2030-08-05", max_pages=args.pages, detail_level=args.detail_level
+        )
+        latencies['search_airbnb_listings'].append(time.perf_counter() - started)
+        stats = await server_stats(main, base_url)
+        requests['search_airbnb_listings'].append(stats['requests'])
+        sent_bytes['search_airbnb_listings'].append(stats['bytes_sent'])
+        if result.startswith('['):
+            listing_urls.extend(room['url'] for room in json.loads(result) if 'url' in room)
+
+    for url in listing_urls[:args.listing_info]:
+        if not args.warm:
+            clear_caches(main)
+        await server_stats(main, base_url, reset=True)
+        started = time.perf_counter()
+        await main.scrape_airbnb_listing_info(url)
+        latencies['scrape_airbnb_listing_info'].append(time.perf_counter() - started)
+        stats = await server_stats(main, base_url)
+        requests['scrape_airbnb_listing_info'].append(stats['requests'])
+        sent_bytes['scrape_airbnb_listing_info'].append(stats['bytes_sent'])
+
+    total_wall = time.perf_counter() - wall_started
+    total_cpu = time.process_time() - cpu_started
+    await main.close_http_client()
+    main.shutdown_parse_executor()
+
+    for name in latencies:
+        summarize(name, latencies[name], requests[name], sent_bytes[name])
+
+    print(f"\n{'phase':<22} {'calls':>6} {'wall s':>9} {'cpu s':>9}")
+    for phase, timing in main.phase_timings.snapshot().items():
+        print(f"{phase:<22} {timing['count']:>6} {timing['wall_s']:>9.3f} {timing['cpu_s']:>9.3f}")
+    print(f"\nclient process: wall {total_wall:.2f} s, cpu {total_cpu:.2f} s")
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--searches', type=int, default=20)
+    parser.add_argument('--places', type=int, default=5, help='distinct places cycled through by the searches')
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--listing-info', type=int, default=20, help='scrape_airbnb_listing_info calls')
+    parser.add_argument('--detail-level', default='full')
+    parser.add_argument('--warm', action='store_true', help='keep in-process caches between calls')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=429)
+    parser.add_argument('--fixtures', help='directory of recorded HTML fixtures (see record_fixtures.py)')
+    args = parser.parse_args()
+
+    process, base_url = start_mock_server(args)
+    # main reads its settings at import time
+    os.environ['AIRBNB_BASE_URL'] = base_url
+    os.environ.pop('AIRBNB_DISK_CACHE_PATH', None)
+    try:
+        asyncio.run(run(args, base_url))
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmark for parsing listing secondaryLine texts (beds, bedrooms, bathrooms, guests).
+
+Compares the previous per-item parsing (two re.search calls with inline patterns for every
+secondaryLine item) with parse_secondary_lines, which scans a whole page of listings with one
+precompiled regex. Texts come from recorded search pages (see record_fixtures.py) when
+--fixtures is given, otherwise from a synthetic mix of English and localized strings.
+
+Usage:
+    python benchmarks/secondary_line.py [--strings 5000] [--per-page 18] [--fixtures DIR] [--repeat 50]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+SYNTHETIC_LINES = (
+    '{n} beds', '{n} bed', '{n} guests', '{n} bedrooms', '1 bedroom · {n} beds', '{n}.5 baths',
+    '1 shared bath', '{n} lits', '1 lit', '{n} camas', '{n} voyageurs', '{n} huéspedes',
+    '{n} Betten · 1 Schlafzimmer', '{n} chambres', 'Aug 1 – 6', 'Free cancellation',
+)
+
+def recorded_lines(directory: str) -> list[str]:
+    lines = []
+    for path in sorted(glob.glob(os.path.join(directory, 'search-*.html'))):
+        with open(path, encoding='utf-8') as f:
+            deferred_state = main.extract_deferred_state(f.read())
+        if deferred_state is None:
+            continue
+        results = json.loads(deferred_state)['niobeMinimalClientData'][0][1]['data']['presentation']['staysSearch']['results']
+        for listing in results.get('searchResults', []):
+            for item in listing.get('structuredContent', {}).get('secondaryLine', []):
+                lines.append(item.get('body') or '')
+    return lines
+
+def synthetic_lines(count: int) -> list[str]:
+    rng = random.Random(7)
+    return [rng.choice(SYNTHETIC_LINES).format(n=rng.randint(1, 6)) for _ in range(count)]
+
+def per_item(pages: list[list[list[str]]]) -> list[dict]:
+    """
+    The parsing done before parse_secondary_lines existed, with its result kept in the same shape.
+    """
+    results = []
+    for page in pages:
+        for lines in page:
+            counts = {}
+            for body_text in lines:
+                bed_match = re.search(r'(\d+)\s*beds?', body_text, re.IGNORECASE)
+                if bed_match:
+                    counts['beds'] = int(bed_match.group(1))
+                guest_match = re.search(r'(\d+)\s*guests?', body_text, re.IGNORECASE)
+                if guest_match:
+                    counts['guests'] = int(guest_match.group(1))
+            results.append(counts)
+    return results
+
+def batched(pages: list[list[list[str]]]) -> list[dict]:
+    results = []
+    for page in pages:
+        results.extend(main.parse_secondary_lines(page))
+    return results
+
+PARSERS = (('per-item', per_item), ('batched', batched))
+FIELDS = ('beds', 'bedrooms', 'bathrooms', 'guests')
+
+def best_of(func, pages, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(pages)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--strings', type=int, default=5000, help='number of secondaryLine strings')
+    parser.add_argument('--per-page', type=int, default=18, help='listings per search page')
+    parser.add_argument('--lines-per-listing', type=int, default=2)
+    parser.add_argument('--fixtures', help='directory of recorded HTML fixtures')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    lines = recorded_lines(args.fixtures) if args.fixtures else []
+    source = 'recorded' if lines else 'synthetic'
+    if lines:
+        lines = (lines * (args.strings // len(lines) + 1))[:args.strings]
+    else:
+        lines = synthetic_lines(args.strings)
+
+    listings = [lines[i:i + args.lines_per_listing] for i in range(0, len(lines), args.lines_per_listing)]
+    pages = [listings[i:i + args.per_page] for i in range(0, len(listings), args.per_page)]
+
+    found = {name: [sum(1 for counts in func(pages) if field in counts) for field in FIELDS] for name, func in PARSERS}
+
+    print(f"{len(lines)} {source} strings, {len(listings)} listings, {len(pages)} pages (best of {args.repeat})")
+    print(f"{'parser':<10} {'total ms':>9} {'us/listing':>11}  " + ' '.join(f"{field:>9}" for field in FIELDS))
+    for name, func in PARSERS:
+        elapsed = best_of(func, pages, args.repeat)
+        print(f"{name:<10} {elapsed * 1000:>9.2f} {elapsed / len(listings) * 1e6:>11.2f}  " + ' '.join(f"{count:>9}" for count in found[name]))
+    print("The field columns count listings with a value found; the per-item parser reads \"1 bedroom\" as 1 bed.")
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,143 @@
+"""
+Cold start benchmark for the stdio server.
+
+Launches main.py the way an MCP client does, a fresh process per run, and measures how long it takes
+to answer the initialize request and then tools/list. It also lists the modules that take the longest
+to import (python -X importtime) and checks that modules the server loads lazily are not imported at
+startup. With --max-ms the script exits with status 1 when the median time to ready is above the
+limit, so it can guard against startup regressions.
+
+Usage:
+    python benchmarks/startup_time.py [--runs 5] [--top 15] [--max-ms 2000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# Modules that must only be imported when a tool needs them. mcp itself already imports
+# multiprocessing (mcp.server.sse -> sse_starlette -> uvicorn), so a module only counts as loaded
+# at startup when importing main loads it on top of what mcp.server.fastmcp loads.
+LAZY_MODULES = ('bs4', 'requests', 'selenium', 'multiprocessing', 'concurrent.futures.process', 'orjson')
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "startup-benchmark", "version": "0"}},
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+LIST_TOOLS = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
+
+def send(process: subprocess.Popen, message: dict) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+def read_response(process: subprocess.Popen, request_id: int) -> dict:
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"Server exited before answering request {request_id}: {process.stderr.read()}")
+        message = json.loads(line)
+        if message.get('id') == request_id:
+            return message
+
+def handshake(workdir: str, timeout: float | None = None) -> tuple[float, float, int]:
+    """
+    Returns seconds until the initialize response and until the tools/list response, and the tool count.
+    With timeout, a server that has not answered both within that many seconds is killed and
+    RuntimeError is raised.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, MAIN], cwd=workdir, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    killer = threading.Timer(timeout, process.kill) if timeout is not None else None
+    if killer is not None:
+        killer.start()
+    try:
+        send(process, INITIALIZE)
+        read_response(process, 1)
+        initialized = time.perf_counter() - started
+        send(process, INITIALIZED)
+        send(process, LIST_TOOLS)
+        tools = read_response(process, 2)['result']['tools']
+        return initialized, time.perf_counter() - started, len(tools)
+    finally:
+        if killer is not None:
+            killer.cancel()
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def mcp_import_time(workdir: str) -> float:
+    """
+    Returns seconds for a fresh process to import mcp.server.fastmcp and exit: the part of the time
+    to ready that the server cannot reduce.
+    """
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import mcp.server.fastmcp'], cwd=workdir, check=True)
+    return time.perf_counter() - started
+
+def import_profile(workdir: str, top: int) -> tuple[list[tuple[int, int, str]], list[str]]:
+    """
+    Returns the slowest imports as (self us, cumulative us, module) and the lazy modules that importing
+    main loads beyond what mcp.server.fastmcp loads.
+    """
+    check = (
+        "import sys, mcp.server.fastmcp; loaded_by_mcp = set(sys.modules); import main; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules and m not in loaded_by_mcp))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', check], cwd=workdir, text=True, capture_output=True,
+        env={**os.environ, 'PYTHONPATH': os.path.dirname(MAIN)},
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((int(self_us), int(cumulative_us), module))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    loaded = [module for module in result.stdout.strip().split(',') if module]
+    return rows[:top], loaded
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    parser.add_argument('--max-ms', type=float, help='fail when the median time to ready is above this')
+    args = parser.parse_args()
+
+    # The server writes scraper.log to its working directory, so runs happen in a scratch directory
+    with tempfile.TemporaryDirectory() as workdir:
+        rows, loaded = import_profile(workdir, args.top)
+        print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+        for self_us, cumulative_us, module in rows:
+            print(f"{cumulative_us / 1000:>13.1f} {self_us / 1000:>8.1f}  {module}")
+        print(f"Lazily imported modules loaded at startup: {', '.join(loaded) or 'none'}")
+
+        handshake(workdir)  # warm the bytecode cache so every measured run is a plain cold start
+        runs = [handshake(workdir) for _ in range(args.runs)]
+        baseline_ms = statistics.median(mcp_import_time(workdir) for _ in range(args.runs)) * 1000
+
+    initialize_ms = statistics.median(run[0] for run in runs) * 1000
+    ready_ms = statistics.median(run[1] for run in runs) * 1000
+    print(f"\n{runs[0][2]} tools, median of {args.runs} runs: initialize {initialize_ms:.0f} ms, tools/list {ready_ms:.0f} ms")
+    print(f"Importing mcp.server.fastmcp alone: {baseline_ms:.0f} ms")
+    if loaded:
+        sys.exit(1)
+    if args.max_ms is not None and ready_ms > args.max_ms:
+        print(f"Time to ready {ready_ms:.0f} ms is above the {args.max_ms:.0f} ms limit")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main_cli()
@@ -1,176 +1,1491 @@
 import logging
-import requests
-from bs4 import BeautifulSoup
+import os
 import json
 import re
+import sqlite3
+import threading
+import zlib
 import base64
+import bisect
+import math
+import random
 import urllib.parse
-from typing import Any, List, Dict
+from typing import Any, AsyncIterator, Callable, List, Dict
 import asyncio
+import functools
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, fields as dataclass_fields, replace as dataclass_replace
+from concurrent.futures import BrokenExecutor, Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, filename='scraper.log', format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging; the log file is opened on the first record, not at import
+logging.basicConfig(
+    level=os.environ.get("AIRBNB_LOG_LEVEL", "INFO").upper(),
+    handlers=[logging.FileHandler('scraper.log', delay=True)],
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
 logger = logging.getLogger(__name__)
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 import httpx
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+# MCP transport: "stdio" serves one client per process; "streamable-http" and "sse" run one long-lived
+# server for many clients, which then share the HTTP client, caches and fetch scheduler
+MCP_TRANSPORT = os.environ.get("AIRBNB_MCP_TRANSPORT", "stdio")
+MCP_HOST = os.environ.get("AIRBNB_MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.environ.get("AIRBNB_MCP_PORT", "8000"))
+# More than one worker runs separate processes, which only share the persistent response cache;
+# sessions cannot follow a client across processes, so HTTP is then served statelessly
+MCP_WORKERS = int(os.environ.get("AIRBNB_MCP_WORKERS", "1"))
+MCP_STATELESS_HTTP = os.environ.get("AIRBNB_MCP_STATELESS_HTTP", "0") != "0" or MCP_WORKERS > 1
+
+# Overridable so benchmarks can point the server at a local stand-in for Airbnb
+AIRBNB_BASE_URL = os.environ.get("AIRBNB_BASE_URL", "https://www.airbnb.ca").rstrip('/')
+BASE_AIRBNB_ROOM_URL = f"{AIRBNB_BASE_URL}/rooms/"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
-mcp = FastMCP("airbnb-scraper")
+# Shared HTTP client settings (overridable through the environment)
+HTTP_TIMEOUT = float(os.environ.get("AIRBNB_HTTP_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("AIRBNB_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("AIRBNB_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("AIRBNB_HTTP_MAX_CONNECTIONS_PER_HOST", "8"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("AIRBNB_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_ENABLE_HTTP2 = os.environ.get("AIRBNB_HTTP2", "1") != "0"
+# Stop downloading a page once its data-deferred-state-0 script has closed, unless fewer than
+# HTTP_EARLY_STOP_MIN_BYTES remain (reading those keeps an HTTP/1.1 connection reusable)
+HTTP_EARLY_STOP = os.environ.get("AIRBNB_HTTP_EARLY_STOP", "1") != "0"
+HTTP_EARLY_STOP_MIN_BYTES = int(os.environ.get("AIRBNB_HTTP_EARLY_STOP_MIN_BYTES", "65536"))
+
+# Detail-fetch scheduler settings (overridable through the environment)
+DETAIL_MAX_CONCURRENCY = int(os.environ.get("AIRBNB_DETAIL_MAX_CONCURRENCY", "6"))
+DETAIL_INITIAL_RATE = float(os.environ.get("AIRBNB_DETAIL_INITIAL_RATE", "8"))
+DETAIL_MIN_RATE = float(os.environ.get("AIRBNB_DETAIL_MIN_RATE", "0.5"))
+DETAIL_MAX_RATE = float(os.environ.get("AIRBNB_DETAIL_MAX_RATE", "20"))
+DETAIL_BURST = float(os.environ.get("AIRBNB_DETAIL_BURST", "4"))
+DETAIL_RATE_INCREASE = float(os.environ.get("AIRBNB_DETAIL_RATE_INCREASE", "0.5"))
+DETAIL_RATE_DECREASE_FACTOR = float(os.environ.get("AIRBNB_DETAIL_RATE_DECREASE_FACTOR", "0.5"))
+THROTTLE_STATUS_CODES = (403, 429)
+
+# Batch search settings (overridable through the environment)
+BATCH_MAX_CONCURRENCY = int(os.environ.get("AIRBNB_BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_QUERIES = int(os.environ.get("AIRBNB_BATCH_MAX_QUERIES", "10"))
+
+# Retry and bulk listing info settings (overridable through the environment)
+RETRY_BASE_DELAY = float(os.environ.get("AIRBNB_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("AIRBNB_RETRY_MAX_DELAY", "8"))
+LISTING_INFO_MAX_CONCURRENCY = int(os.environ.get("AIRBNB_LISTING_INFO_MAX_CONCURRENCY", "4"))
+LISTING_INFO_MAX_BULK = int(os.environ.get("AIRBNB_LISTING_INFO_MAX_BULK", "50"))
+
+# In-process cache settings (overridable through the environment)
+DETAIL_CACHE_MAX_SIZE = int(os.environ.get("AIRBNB_DETAIL_CACHE_MAX_SIZE", "1024"))
+DETAIL_CACHE_TTL = float(os.environ.get("AIRBNB_DETAIL_CACHE_TTL", "1800"))
+LISTING_INFO_CACHE_MAX_SIZE = int(os.environ.get("AIRBNB_LISTING_INFO_CACHE_MAX_SIZE", "256"))
+LISTING_INFO_CACHE_TTL = float(os.environ.get("AIRBNB_LISTING_INFO_CACHE_TTL", "600"))
+SECTION_INDEX_CACHE_MAX_SIZE = int(os.environ.get("AIRBNB_SECTION_INDEX_CACHE_MAX_SIZE", "64"))
+SECTION_INDEX_CACHE_TTL = float(os.environ.get("AIRBNB_SECTION_INDEX_CACHE_TTL", "600"))
+SEARCH_CACHE_MAX_SIZE = int(os.environ.get("AIRBNB_SEARCH_CACHE_MAX_SIZE", "32"))
+SEARCH_CACHE_TTL = float(os.environ.get("AIRBNB_SEARCH_CACHE_TTL", "120"))
+
+# Geospatial index of recently seen listings (overridable through the environment)
+GEO_INDEX_MAX_SIZE = int(os.environ.get("AIRBNB_GEO_INDEX_MAX_SIZE", "20000"))
+GEO_INDEX_TTL = float(os.environ.get("AIRBNB_GEO_INDEX_TTL", "3600"))
+GEO_INDEX_CELL_DEGREES = float(os.environ.get("AIRBNB_GEO_INDEX_CELL_DEGREES", "0.01"))
+
+# Persistent response cache settings; the cache is disabled unless a path is configured
+DISK_CACHE_PATH = os.environ.get("AIRBNB_DISK_CACHE_PATH")
+DISK_CACHE_MAX_BYTES = int(os.environ.get("AIRBNB_DISK_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+DISK_CACHE_SEARCH_TTL = float(os.environ.get("AIRBNB_DISK_CACHE_SEARCH_TTL", "900"))
+DISK_CACHE_ROOM_TTL = float(os.environ.get("AIRBNB_DISK_CACHE_ROOM_TTL", "21600"))
+
+# CPU-bound parsing runs off the event loop: "thread", "process" or "inline" (on the loop)
+PARSE_EXECUTOR = os.environ.get("AIRBNB_PARSE_EXECUTOR", "thread")
+PARSE_WORKERS = int(os.environ.get("AIRBNB_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# How page payloads are decoded: "targeted" decodes only the subtrees the parsers read,
+# "full" decodes the whole payload, "orjson" decodes the whole payload with the optional orjson package
+JSON_DECODE = os.environ.get("AIRBNB_JSON_DECODE", "targeted")
+
+class PhaseTimings:
+    """
+    Accumulates call count, wall-clock time, CPU time and the slowest call per processing phase
+    (fetch, extract, json_decode, normalize, parse, enrich, serialize). Safe to update from parse worker threads.
+    """
 
-BASE_AIRBNB_ROOM_URL = "https://www.airbnb.ca/rooms/"
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: Dict[str, List[float]] = {}
+
+    def add(self, phase: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            totals = self._phases.setdefault(phase, [0, 0.0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] = max(totals[3], wall)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                phase: {
+                    'count': count,
+                    'wall_s': round(wall, 6),
+                    'cpu_s': round(cpu, 6),
+                    'avg_wall_ms': round(wall / count * 1000, 3) if count else 0.0,
+                    'max_wall_ms': round(max_wall * 1000, 3),
+                }
+                for phase, (count, wall, cpu, max_wall) in self._phases.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases.clear()
+
+phase_timings = PhaseTimings()
+
+# Spans recorded inside a parse worker are collected here and returned with the result (see _timed_call)
+_span_collector = threading.local()
+
+def record_span(phase: str, wall_started: float, cpu_started: float) -> None:
+    """
+    Records a timing span that started at the given perf_counter() and thread_time() readings.
+    """
+    wall = time.perf_counter() - wall_started
+    cpu = time.thread_time() - cpu_started
+    collected = getattr(_span_collector, 'spans', None)
+    if collected is not None:
+        collected.append((phase, wall, cpu))
+    else:
+        phase_timings.add(phase, wall, cpu)
 
-async def get_page_html_async(url: str) -> str | None:
+@contextmanager
+def span(phase: str):
     """
-    Fetches the HTML content from a given URL asynchronously.
+    Times a synchronous block as a span of the given phase. CPU time is that of the current thread.
     """
-    logger.info(f"Fetching HTML from: {url}")
-    headers = {
-        'User-Agent': USER_AGENT,
-        'Accept-Language': 'en-US,en;q=0.9',
-    }
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            html_content = response.text
+        yield
+    finally:
+        record_span(phase, wall_started, cpu_started)
+
+class MetricCounters:
+    """
+    Monotonic counters with optional labels, e.g. HTTP responses by status code.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
 
-            # with open("debug_airbnb_page.html", "w", encoding="utf-8") as f:
-            #     f.write(html_content)
-            # logger.info("Saved current page HTML to debug_airbnb_page.html for inspection.")
+    def items(self) -> List[tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(name, dict(labels), value) for (name, labels), value in sorted(self._values.items())]
 
-            return html_content
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns unlabelled counters as numbers and labelled ones as {"label=value,...": number}.
+        """
+        result: Dict[str, Any] = {}
+        for name, labels, value in self.items():
+            if labels:
+                result.setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels.items())] = value
+            else:
+                result[name] = value
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+metrics = MetricCounters()
+SERVER_STARTED_AT = time.time()
+
+_http_client: httpx.AsyncClient | None = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _http2_available() -> bool:
+    """
+    HTTP/2 support in httpx needs the optional 'h2' package.
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the server-lifetime HTTP client, creating it on first use.
+    All tools share this client so connections to Airbnb are kept alive and reused.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        http2 = HTTP_ENABLE_HTTP2 and _http2_available()
+        if HTTP_ENABLE_HTTP2 and not http2:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1.")
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            headers={
+                'User-Agent': USER_AGENT,
+                'Accept-Language': 'en-US,en;q=0.9',
+            },
+        )
+        logger.info("Created shared HTTP client (http2=%s, max_connections=%s)", http2, HTTP_MAX_CONNECTIONS)
+    return _http_client
+
+async def close_http_client() -> None:
+    """
+    Closes the shared HTTP client and drops its pooled connections.
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("Closed shared HTTP client")
+    _host_semaphores.clear()
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    """
+    Returns the semaphore capping concurrent requests to the host of the given URL.
+    """
+    host = urlparse(url).netloc
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+_infrastructure_users = 0
+active_mcp_sessions = 0
+
+@asynccontextmanager
+async def shared_infrastructure() -> AsyncIterator[None]:
+    """
+    Keeps the shared HTTP client open while anyone holds it, and closes it together with the
+    persistent cache and the parse executor when the last holder leaves.
+    """
+    global _infrastructure_users
+    _infrastructure_users += 1
+    get_http_client()
+    try:
+        yield
+    finally:
+        _infrastructure_users -= 1
+        if _infrastructure_users == 0:
+            await close_http_client()
+            close_disk_cache()
+            shutdown_parse_executor()
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """
+    Holds the shared infrastructure for one MCP session. Over stdio this is the whole server lifetime;
+    over HTTP every session runs it, and the HTTP app holds the infrastructure for the process lifetime
+    (see build_http_app), so sessions ending never close what other sessions use.
+    """
+    global active_mcp_sessions
+    async with shared_infrastructure():
+        active_mcp_sessions += 1
+        try:
+            yield
+        finally:
+            active_mcp_sessions -= 1
+
+mcp = FastMCP("airbnb-scraper", lifespan=server_lifespan, host=MCP_HOST, port=MCP_PORT, stateless_http=MCP_STATELESS_HTTP)
+
+async def read_until_deferred_state(response: httpx.Response, content_length: int | None = None) -> tuple[bytes, float | None, bool]:
+    """
+    Reads a streamed response body until the <script id="data-deferred-state-0"> element has closed.
+    Chunks are scanned as bytes, resuming where the previous scan stopped, so nothing is decoded here.
+    The rest of the body is still read when fewer than HTTP_EARLY_STOP_MIN_BYTES of it remain.
+
+    Returns:
+        tuple: (body bytes up to and including the closing tag, or the whole body if the element
+        never closed; perf_counter() reading when the element closed, or None;
+        True if reading stopped before the end of the body)
+    """
+    buffer = bytearray()
+    body_start = payload_end = payload_at = None
+    scan_from = 0
+    async for chunk in response.aiter_bytes():
+        if payload_end is not None:
+            continue
+        buffer.extend(chunk)
+        if body_start is None:
+            open_match, resume_from = find_deferred_state_open_tag(buffer, scan_from)
+            if open_match is None:
+                # An opening tag may straddle two chunks, so the next scan re-reads the tail;
+                # a tag inside a comment that has not ended yet is checked again with more data
+                scan_from = resume_from if resume_from is not None else max(scan_from, len(buffer) - DEFERRED_STATE_TAG_MAX_BYTES)
+                continue
+            body_start = scan_from = open_match.end()
+        close_match = DEFERRED_STATE_CLOSE_TAG_BYTES_RE.search(buffer, scan_from)
+        if close_match is None:
+            scan_from = max(body_start, len(buffer) - len(b'</script'))
+            continue
+        payload_at = time.perf_counter()
+        payload_end = close_match.end()
+        remaining = None if content_length is None else content_length - response.num_bytes_downloaded
+        if remaining is None or remaining > HTTP_EARLY_STOP_MIN_BYTES:
+            return bytes(buffer[:payload_end]), payload_at, True
+        # A short tail is drained without being kept, so the connection stays reusable
+    if payload_end is not None:
+        return bytes(buffer[:payload_end]), payload_at, False
+    return bytes(buffer), None, False
+
+async def fetch_page_async(url: str, early_stop: bool = HTTP_EARLY_STOP) -> tuple[int | None, str | None]:
+    """
+    Fetches a URL with the shared HTTP client. The body is streamed and, with early_stop, the download
+    ends once the data-deferred-state-0 script has closed: the rest of the page is never read or decoded.
+
+    Returns:
+        tuple: (HTTP status code or None on a network error, HTML content or None on failure)
+    """
+    logger.info("Fetching HTML from: %s", url)
+    started = time.perf_counter()
+    try:
+        async with _host_semaphore(url):
+            async with get_http_client().stream('GET', url) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                content_length = response.headers.get('Content-Length')
+                content_length = int(content_length) if content_length and content_length.isdigit() else None
+                if early_stop:
+                    body, payload_at, stopped = await read_until_deferred_state(response, content_length)
+                    if payload_at is not None:
+                        phase_timings.add('time_to_payload', payload_at - started, 0.0)
+                    if stopped:
+                        metrics.inc('http_early_stops_total')
+                        if content_length is not None:
+                            metrics.inc('http_bytes_saved_total', content_length - response.num_bytes_downloaded)
+                else:
+                    body = await response.aread()
+                encoding = response.encoding or 'utf-8'
+        decode_started = time.thread_time()
+        html_content = body.decode(encoding, errors='replace')
+        phase_timings.add('fetch', time.perf_counter() - started, time.thread_time() - decode_started)
+        metrics.inc('http_responses_total', status=response.status_code)
+        metrics.inc('http_bytes_received_total', response.num_bytes_downloaded)
+
+        # with open("debug_airbnb_page.html", "w", encoding="utf-8") as f:
+        #     f.write(html_content)
+        # logger.info("Saved current page HTML to debug_airbnb_page.html for inspection.")
+
+        return response.status_code, html_content
     except httpx.RequestError as e:
-        logger.error(f"Error fetching the URL {url}: {e}")
-        return None
+        metrics.inc('http_request_errors_total')
+        logger.error("Error fetching the URL %s: %s", url, e)
+        return None, None
     except httpx.HTTPStatusError as e:
-        logger.error(f"HTTP error fetching {url}: {e.response.status_code}. The server might be blocking requests.")
+        metrics.inc('http_responses_total', status=e.response.status_code)
+        metrics.inc('http_bytes_received_total', e.response.num_bytes_downloaded)
+        logger.error("HTTP error fetching %s: %s. The server might be blocking requests.", url, e.response.status_code)
+        return e.response.status_code, None
+
+async def get_page_html_async(url: str, early_stop: bool = HTTP_EARLY_STOP) -> str | None:
+    """
+    Fetches the HTML content from a given URL asynchronously using the shared HTTP client.
+    With early_stop the page ends right after its data-deferred-state-0 script.
+    """
+    _, html_content = await fetch_page_async(url, early_stop=early_stop)
+    return html_content
+
+class TokenBucket:
+    """
+    Token bucket limiting the request rate to a single host.
+    The rate can be changed at any time; waiters pick up the new rate on their next refill.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and consumes it. Waiters are served in arrival order.
+        """
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class DetailFetchScheduler:
+    """
+    Schedules listing detail fetches under a global concurrency cap and a per-host token bucket.
+    The per-host rate follows AIMD: it is cut multiplicatively whenever Airbnb answers with
+    429/403 and grows additively with every successful response.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DETAIL_MAX_CONCURRENCY,
+        initial_rate: float = DETAIL_INITIAL_RATE,
+        min_rate: float = DETAIL_MIN_RATE,
+        max_rate: float = DETAIL_MAX_RATE,
+        burst: float = DETAIL_BURST,
+        rate_increase: float = DETAIL_RATE_INCREASE,
+        rate_decrease_factor: float = DETAIL_RATE_DECREASE_FACTOR,
+    ):
+        self.max_concurrency = max_concurrency
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.rate_increase = rate_increase
+        self.rate_decrease_factor = rate_decrease_factor
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.initial_rate, self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def _record_status(self, host: str, status: int | None) -> None:
+        """
+        Adjusts the host rate from the outcome of a request.
+        """
+        bucket = self._bucket(host)
+        if status in THROTTLE_STATUS_CODES:
+            self.throttled += 1
+            bucket.rate = max(self.min_rate, bucket.rate * self.rate_decrease_factor)
+            logger.warning("Throttled by %s (HTTP %s); detail fetch rate lowered to %.2f/s", host, status, bucket.rate)
+        elif status is not None and status < 400:
+            bucket.rate = min(self.max_rate, bucket.rate + self.rate_increase)
+
+    async def fetch(self, url: str) -> str | None:
+        """
+        Fetches a URL once a concurrency slot and a host token are available.
+        """
+        host = urlparse(url).netloc
+        waiting = True
+        self.queued += 1
+        try:
+            async with self._semaphore:
+                await self._bucket(host).acquire()
+                waiting = False
+                self.queued -= 1
+                self.in_flight += 1
+                try:
+                    status, html_content = await fetch_page_async(url)
+                finally:
+                    self.in_flight -= 1
+        finally:
+            if waiting:
+                self.queued -= 1
+        self.completed += 1
+        self._record_status(host, status)
+        return html_content
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the current rate per host, queue depth and request counters.
+        """
+        return {
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self.queued,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'throttled': self.throttled,
+            'rates': {host: round(bucket.rate, 3) for host, bucket in self._buckets.items()},
+        }
+
+detail_scheduler = DetailFetchScheduler()
+
+class FairFetchBudget:
+    """
+    Fetch slots shared by the queries of one batch search. When every slot is busy, freed slots
+    are handed to the waiting queries in turn (round-robin), so a query with many listings cannot
+    starve the others. Fetches still go through the global detail scheduler and host rate limits.
+    """
+
+    def __init__(self, max_concurrency: int = BATCH_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.available = max_concurrency
+        self._waiters: OrderedDict[Any, deque[asyncio.Future]] = OrderedDict()
+
+    async def acquire(self, query: Any) -> None:
+        if self.available > 0 and not self._waiters:
+            self.available -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(query, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            query, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(query)
+            else:
+                del self._waiters[query]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.available += 1
+
+    def fetcher(self, query: Any, fetch: Callable[[str], Any]) -> Callable[[str], Any]:
+        """
+        Returns fetch wrapped so each call of the given query first takes a slot of the budget.
+        """
+        async def fetch_within_budget(url: str) -> str | None:
+            await self.acquire(query)
+            try:
+                return await fetch(url)
+            finally:
+                self.release()
+
+        return fetch_within_budget
+
+class AsyncTTLCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL and single-flight loading.
+    Concurrent get_or_load calls for the same key share one in-flight load.
+    Loads that return None are handed to every waiter but not cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        """
+        Returns the cached value for key, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """
+        Stores value under key, evicting the least recently used entries past max_size.
+        """
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_load(self, key: str, loader) -> Any | None:
+        """
+        Returns the cached value for key, or awaits loader() once for all concurrent callers.
+        If the load being shared was registered with start_load and gets abandoned, the wait starts over.
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            task = self._in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(loader())
+                self._in_flight[key] = task
+                task.add_done_callback(functools.partial(self._finish_load, key))
+            else:
+                self.coalesced += 1
+            try:
+                # Shield the shared load so one cancelled caller does not cancel it for the others
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if task.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+    def is_loading(self, key: str) -> bool:
+        return key in self._in_flight
+
+    def start_load(self, key: str) -> asyncio.Future:
+        """
+        Registers a load of key that the caller runs itself, for loads that hand out results as they go.
+        The caller sets the returned future's result (cached unless None), or cancels it if it gives up;
+        concurrent get_or_load calls for key wait for it in the meantime.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        future.add_done_callback(functools.partial(self._finish_load, key))
+        return future
+
+    def _finish_load(self, key: str, task: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if task.result() is not None:
+            self.set(key, task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'in_flight': len(self._in_flight),
+        }
+
+listing_details_cache = AsyncTTLCache(DETAIL_CACHE_MAX_SIZE, DETAIL_CACHE_TTL)
+listing_info_cache = AsyncTTLCache(LISTING_INFO_CACHE_MAX_SIZE, LISTING_INFO_CACHE_TTL)
+section_index_cache = AsyncTTLCache(SECTION_INDEX_CACHE_MAX_SIZE, SECTION_INDEX_CACHE_TTL)
+# Finished search results, keyed by search_cache_key; identical concurrent searches share one crawl
+search_results_cache = AsyncTTLCache(SEARCH_CACHE_MAX_SIZE, SEARCH_CACHE_TTL)
+
+class DiskResponseCache:
+    """
+    SQLite-backed cache of extracted data-deferred-state-0 payloads, kept across server restarts.
+    Payloads are zlib-compressed and keyed by normalized URL. Each URL class (search or room page)
+    has its own TTL, and the least recently used entries are evicted once the total size passes max_bytes.
+    The database runs in WAL mode so several server processes can read it while one writes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DISK_CACHE_MAX_BYTES, ttls: Dict[str, float] | None = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {'search': DISK_CACHE_SEARCH_TTL, 'room': DISK_CACHE_ROOM_TTL}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url_class TEXT NOT NULL, payload BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        Normalizes a URL into a cache key: lower-case scheme and host, sorted query, no fragment.
+        """
+        parsed = urlparse(url)
+        query = urllib.parse.urlencode(sorted(parse_qs(parsed.query, keep_blank_values=True).items()), doseq=True)
+        return parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), query=query, fragment='').geturl()
+
+    @staticmethod
+    def url_class(url: str) -> str:
+        return 'room' if '/rooms/' in urlparse(url).path else 'search'
+
+    def get(self, url: str) -> str | None:
+        key = self.normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, url: str, payload: str) -> None:
+        key = self.normalize_url(url)
+        url_class = self.url_class(url)
+        blob = zlib.compress(payload.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url_class, payload, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url_class, blob, len(blob), now, now + self.ttls[url_class], now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """
+        Drops expired entries, then the least recently used ones until the cache fits in max_bytes.
+        """
+        self.evictions += self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            'path': self.path,
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+_disk_cache: DiskResponseCache | None = None
+
+def get_disk_cache() -> DiskResponseCache | None:
+    """
+    Returns the persistent response cache, opening it on first use. None when it is not configured.
+    """
+    global _disk_cache
+    if _disk_cache is None and DISK_CACHE_PATH:
+        try:
+            _disk_cache = DiskResponseCache(DISK_CACHE_PATH)
+            logger.info("Opened persistent response cache at %s", DISK_CACHE_PATH)
+        except sqlite3.Error as e:
+            logger.error("Could not open persistent response cache at %s: %s", DISK_CACHE_PATH, e)
+            return None
+    return _disk_cache
+
+def close_disk_cache() -> None:
+    global _disk_cache
+    if _disk_cache is not None:
+        _disk_cache.close()
+        _disk_cache = None
+        logger.info("Closed persistent response cache")
+
+# Attribute text of a tag: quoted values may contain '>'
+_TAG_ATTRIBUTE_CHAR = r'(?:[^>"\']|"[^"]*"|\'[^\']*\')'
+DEFERRED_STATE_OPEN_TAG_RE = re.compile(
+    r'<script\b%s*?\sid\s*=\s*(["\']?)data-deferred-state-0\1(?=[\s/>])%s*>' % (_TAG_ATTRIBUTE_CHAR, _TAG_ATTRIBUTE_CHAR),
+    re.IGNORECASE,
+)
+DEFERRED_STATE_CLOSE_TAG_RE = re.compile(r'</script', re.IGNORECASE)
+DEFERRED_STATE_OPEN_TAG_BYTES_RE = re.compile(DEFERRED_STATE_OPEN_TAG_RE.pattern.encode(), re.IGNORECASE)
+DEFERRED_STATE_CLOSE_TAG_BYTES_RE = re.compile(DEFERRED_STATE_CLOSE_TAG_RE.pattern.encode(), re.IGNORECASE)
+# Longest opening tag a streamed scan expects to find split across two chunks
+DEFERRED_STATE_TAG_MAX_BYTES = 1024
+
+def find_deferred_state_open_tag(document: str | bytes | bytearray, start: int = 0) -> tuple[re.Match | None, int | None]:
+    """
+    Finds the first <script id="data-deferred-state-0"> opening tag at or after start that is not inside
+    an HTML comment.
+
+    Returns:
+        tuple: (the match, or None; when there is no match, the offset to resume from once more of the
+        document is available if a candidate tag sits inside a comment that has not ended yet, else None)
+    """
+    if isinstance(document, str):
+        open_re, comment_open, comment_close = DEFERRED_STATE_OPEN_TAG_RE, '<!--', '-->'
+    else:
+        open_re, comment_open, comment_close = DEFERRED_STATE_OPEN_TAG_BYTES_RE, b'<!--', b'-->'
+    while True:
+        open_match = open_re.search(document, start)
+        if open_match is None:
+            return None, None
+        comment_start = document.rfind(comment_open, 0, open_match.start())
+        if comment_start == -1:
+            return open_match, None
+        comment_end = document.find(comment_close, comment_start + len(comment_open))
+        if comment_end == -1:
+            return None, open_match.start()
+        if comment_end >= open_match.start():
+            start = comment_end + len(comment_close)
+            continue
+        return open_match, None
+
+def find_deferred_state_span(document: str | bytes) -> tuple[int, int] | None:
+    """
+    Locates the body of <script id="data-deferred-state-0"> by scanning offsets, without building a DOM.
+    Works on both decoded text and raw bytes. Tags inside HTML comments are skipped.
+
+    Returns:
+        tuple: (start, end) offsets of the script body, or None if the element is not found or not closed,
+        or if the scan cannot tell whether it is commented out; extract_deferred_state then parses the page.
+    """
+    close_re = DEFERRED_STATE_CLOSE_TAG_RE if isinstance(document, str) else DEFERRED_STATE_CLOSE_TAG_BYTES_RE
+    open_match, _ = find_deferred_state_open_tag(document)
+    if open_match is None:
+        return None
+    close_match = close_re.search(document, open_match.end())
+    if close_match is None:
         return None
+    return open_match.end(), close_match.start()
 
-async def scrape_listing_details(listing_id: str) -> Dict[str, Any]:
+_json_decoder = json.JSONDecoder()
+
+@functools.lru_cache(maxsize=None)
+def _json_member_re(key: str) -> re.Pattern:
+    return re.compile(r'"%s"\s*:\s*' % re.escape(key))
+
+@functools.lru_cache(maxsize=None)
+def _orjson_loads() -> Callable[[str], Any] | None:
     """
-    Scrapes additional details from an individual listing page.
+    Decoding with orjson needs the optional 'orjson' package.
     """
-    url = f"{BASE_AIRBNB_ROOM_URL}{listing_id}"
-    logger.info(f"Scraping details for listing {listing_id}")
-    html_content = await get_page_html_async(url)
-    details = {
-        'beds': 'N/A',
-        'bedrooms': 'N/A',
-        'bathrooms': 'N/A',
+    try:
+        import orjson
+    except ImportError:
+        logger.warning("AIRBNB_JSON_DECODE is 'orjson' but orjson is not installed; using json instead.")
+        return None
+    return orjson.loads
+
+def decode_json(document: str) -> Any:
+    """
+    Decodes a whole JSON document, with orjson when AIRBNB_JSON_DECODE is 'orjson' and it is installed.
+    Raises json.JSONDecodeError (a ValueError) on invalid JSON.
+    """
+    loads = _orjson_loads() if JSON_DECODE == 'orjson' else None
+    return (loads or json.loads)(document)
+
+def decode_json_subtree(document: str, key: str) -> Any | None:
+    """
+    Decodes only the value of the "key" member of a JSON document; the rest of the document
+    is skipped by a plain text search instead of being decoded into objects.
+    The text search cannot tell where in the document a member is, so the key must occur once.
+    Returns None when the key is absent; raises ValueError when it occurs more than once or its
+    value is not valid JSON.
+    """
+    member_re = _json_member_re(key)
+    match = member_re.search(document)
+    if match is None:
+        return None
+    if member_re.search(document, match.end()) is not None:
+        raise ValueError(f"'{key}' occurs more than once in the JSON document.")
+    return _json_decoder.raw_decode(document, match.end())[0]
+
+def extract_deferred_state(html_content: str) -> str | None:
+    """
+    Returns the JSON text of the <script id="data-deferred-state-0"> element, or None if it is missing.
+    Uses the offset scan and only falls back to a full BeautifulSoup parse when the scan finds nothing.
+    """
+    with span('extract'):
+        payload_span = find_deferred_state_span(html_content)
+    if payload_span is not None:
+        start, end = payload_span
+        return html_content[start:end] or None
+
+    logger.warning("Fast data-deferred-state-0 scan failed; falling back to BeautifulSoup.")
+    # bs4 is only needed for this fallback, so it is not imported at startup
+    from bs4 import BeautifulSoup
+    with span('extract_soup'):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        script_element = soup.find('script', id="data-deferred-state-0")
+    if not (script_element and script_element.string):
+        return None
+    return script_element.string
+
+def parse_page(html_content: str, keep_payload: bool, parse, *args) -> tuple[str | None, Any] | None:
+    """
+    Extracts the data-deferred-state-0 payload of a page and returns parse(payload, *args), in a single
+    parse executor call: the page crosses the executor boundary once and only the parsed result comes
+    back, plus the payload itself when keep_payload is set (the persistent cache stores it).
+
+    Returns:
+        tuple: (payload or None, parsed result), or None if the page has no payload
+    """
+    payload = extract_deferred_state(html_content)
+    if payload is None:
+        return None
+    return (payload if keep_payload else None), parse(payload, *args)
+
+async def load_page_async(url: str, parse, *args, fetch=get_page_html_async) -> Any | None:
+    """
+    Returns parse(payload, *args) for the data-deferred-state-0 JSON payload of an Airbnb page,
+    or None if the page could not be fetched or has no payload.
+    The persistent cache is consulted first; on a miss the page is fetched with fetch(url), then
+    extracted and parsed in the parse executor, and the payload stored, so a restarted server can
+    answer without the network. Errors raised by parse propagate.
+    """
+    disk_cache = get_disk_cache()
+    if disk_cache is not None:
+        try:
+            payload = await asyncio.to_thread(disk_cache.get, url)
+        except sqlite3.Error as e:
+            logger.error("Persistent cache read failed for %s: %s", url, e)
+            payload = None
+        if payload is not None:
+            logger.info("Persistent cache hit for %s", url)
+            return await run_cpu_bound(parse, payload, *args)
+
+    html_content = await fetch(url)
+    if not html_content:
+        return None
+    parsed = await run_cpu_bound(parse_page, html_content, disk_cache is not None, parse, *args)
+    if parsed is None:
+        logger.error("Script tag 'data-deferred-state-0' not found or empty for %s", url)
+        return None
+    payload, result = parsed
+
+    if disk_cache is not None:
+        try:
+            await asyncio.to_thread(disk_cache.put, url, payload)
+        except sqlite3.Error as e:
+            logger.error("Persistent cache write failed for %s: %s", url, e)
+    return result
+
+_parse_executor: Executor | None = None
+
+def get_parse_executor() -> Executor | None:
+    """
+    Returns the executor used for CPU-bound parsing, creating it on first use.
+    None means parsing runs inline on the event loop.
+    """
+    global _parse_executor
+    if PARSE_EXECUTOR == 'inline':
+        return None
+    if _parse_executor is None:
+        if PARSE_EXECUTOR == 'process':
+            # Imported here so thread and inline modes never load the process pool; multiprocessing
+            # itself is usually imported already, by mcp through uvicorn
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Spawned workers do not inherit the event loop, sockets or the SQLite connection
+            _parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            _parse_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='airbnb-parse')
+        logger.info("Started %s parse executor with %s workers", PARSE_EXECUTOR, PARSE_WORKERS)
+    return _parse_executor
+
+def shutdown_parse_executor() -> None:
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+        logger.info("Stopped parse executor")
+
+def _timed_call(func, *args) -> tuple[Any, float, float, List[tuple[str, float, float]]]:
+    """
+    Calls func in the parse worker and returns its result with the wall and CPU time it took there
+    and the spans recorded while it ran, so timings also come back from worker processes.
+    """
+    _span_collector.spans = []
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        result = func(*args)
+        return result, time.perf_counter() - wall_started, time.thread_time() - cpu_started, _span_collector.spans
+    finally:
+        _span_collector.spans = None
+
+async def run_cpu_bound(func, *args):
+    """
+    Runs a module-level parsing function in the parse executor so the event loop stays responsive.
+    Only the arguments and the (small) normalized result cross the executor boundary.
+    """
+    executor = get_parse_executor()
+    if executor is None:
+        result, wall, cpu, spans = _timed_call(func, *args)
+    else:
+        try:
+            result, wall, cpu, spans = await asyncio.get_running_loop().run_in_executor(executor, _timed_call, func, *args)
+        except BrokenExecutor:
+            logger.error("Parse worker pool is broken; restarting it and parsing inline for this call.")
+            shutdown_parse_executor()
+            result, wall, cpu, spans = _timed_call(func, *args)
+    phase_timings.add('parse', wall, cpu)
+    for phase, span_wall, span_cpu in spans:
+        phase_timings.add(phase, span_wall, span_cpu)
+    return result
+
+def _empty_listing_details() -> Dict[str, Any]:
+    return {
+        'beds': None,
+        'bedrooms': None,
+        'bathrooms': None,
         'amenities': [],
-        'location': 'N/A'
+        'location': None
     }
 
-    if not html_content:
-        logger.error(f"Failed to fetch details for listing {listing_id}")
-        return details
+async def scrape_listing_details(listing_id: str, fetch: Callable[[str], Any] | None = None) -> Dict[str, Any]:
+    """
+    Returns additional details for a listing, served from the in-process cache when possible.
+    fetch, if given, replaces the detail fetch scheduler for the listing page request.
+    """
+    details = await listing_details_cache.get_or_load(listing_id, lambda: _fetch_listing_details(listing_id, fetch))
+    if details is None:
+        return _empty_listing_details()
+    details = {**details, 'amenities': list(details['amenities'])}
+    listing_geo_index.update_details(listing_id, details)
+    return details
 
+async def _fetch_listing_details(listing_id: str, fetch: Callable[[str], Any] | None = None) -> Dict[str, Any] | None:
+    """
+    Scrapes additional details from an individual listing page.
+    Returns None when the page could not be fetched or parsed, so the failure is not cached.
+    """
+    url = f"{BASE_AIRBNB_ROOM_URL}{listing_id}"
+    logger.info("Scraping details for listing %s", listing_id)
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        script_element = soup.find('script', id="data-deferred-state-0")
-        if not (script_element and script_element.string):
-            logger.error(f"No data-deferred-state-0 script found for listing {listing_id}")
-            return details
-
-        full_data = json.loads(script_element.string)
-        client_data = full_data.get("niobeMinimalClientData", [])
-        if not client_data or len(client_data) < 1 or len(client_data[0]) < 2:
-            logger.error(f"Unexpected JSON structure for listing {listing_id}")
-            return details
-
-        listing_data = client_data[0][1].get('data', {}).get('presentation', {}).get('stayProductDetail', {})
-        section_data = listing_data.get('sections', {})
-
-        # Extract beds, bedrooms, bathrooms
-        for section in section_data.get('sectionData', []):
-            if section.get('sectionType') == 'HIGHLIGHTS':
-                highlights = section.get('sectionItems', [])
-                for highlight in highlights:
-                    title = highlight.get('title', '').lower()
-                    if 'bed' in title and 'bedroom' not in title:
-                        details['beds'] = highlight.get('subtitle', 'N/A')
-                    elif 'bedroom' in title:
-                        details['bedrooms'] = highlight.get('subtitle', 'N/A')
-                    elif 'bath' in title:
-                        details['bathrooms'] = highlight.get('subtitle', 'N/A')
-
-        # Extract amenities
-        amenities_section = next((s for s in section_data.get('sectionData', []) if s.get('sectionType') == 'AMENITIES'), {})
-        details['amenities'] = [item.get('title', 'N/A') for item in amenities_section.get('sectionItems', [])]
-
-        # Extract location
-        location_section = next((s for s in section_data.get('sectionData', []) if s.get('sectionType') == 'LOCATION'), {})
-        details['location'] = location_section.get('title', 'N/A')
-
-    except (json.JSONDecodeError, KeyError, IndexError) as e:
-        logger.error(f"Error processing listing details for {listing_id}: {e}")
+        section_index = await get_section_index_async(url, fetch=fetch or detail_scheduler.fetch)
+        if section_index is None:
+            logger.error("Failed to fetch details for listing %s", listing_id)
+            return None
+        with span('extract_fields'):
+            return extract_section_fields(section_index, LISTING_DETAIL_EXTRACTORS)
+    except ValueError as e:
+        logger.error("Error processing listing details for %s: %s", listing_id, e)
+        return None
     except Exception as e:
-        logger.error(f"Unexpected error processing listing details for {listing_id}: {e}")
+        logger.error("Unexpected error processing listing details for %s: %s", listing_id, e)
+        return None
 
-    return details
+# Section type -> sections of that type, in page order
+SectionIndex = Dict[str, List[Dict[str, Any]]]
+
+def _json_member(container: Dict[str, Any], key: str, expected_type: type) -> Any:
+    """
+    Returns container[key] when it has the expected JSON type, an empty one when it is missing or null,
+    and raises ValueError when the payload has something else there.
+    """
+    value = container.get(key)
+    if value is None:
+        return expected_type()
+    if not isinstance(value, expected_type):
+        raise ValueError(f"'{key}' is a {type(value).__name__}, expected a {expected_type.__name__}.")
+    return value
+
+def _decode_listing_presentation(deferred_state: str) -> Dict[str, Any]:
+    """
+    Decodes a whole listing page payload and returns its data.presentation object.
+    """
+    full_data = decode_json(deferred_state)
+    if not isinstance(full_data, dict):
+        raise ValueError("The JSON payload is not an object.")
+    client_data = full_data.get("niobeMinimalClientData", [])
+    if not client_data or not isinstance(client_data, list) or not isinstance(client_data[0], list) or len(client_data[0]) < 2:
+        raise ValueError("'niobeMinimalClientData' is missing or has unexpected structure.")
+    relevant_data = client_data[0][1]
+    if not isinstance(relevant_data, dict):
+        raise ValueError("'niobeMinimalClientData[0][1]' is not a dictionary.")
+    data = relevant_data.get('data')
+    if data is None:
+        raise ValueError("'data' key missing in JSON payload.")
+    if not isinstance(data, dict):
+        raise ValueError("'data' is not a dictionary.")
+    return _json_member(data, 'presentation', dict)
+
+def build_section_index(deferred_state: str) -> SectionIndex:
+    """
+    Decodes a listing page payload and indexes its sections by type in a single pass.
+    Both section lists of the page are indexed: stayProductDetail sections by sectionType and
+    stayProductDetailPage sections by sectionComponentType. Their type names do not overlap.
+    Only the INDEXED_SECTION_TYPES that the field registries read are kept; entries of the section
+    lists that are not objects are skipped.
+    Raises ValueError when the payload is not valid JSON or has an unexpected structure.
+    """
+    presentation = None
+    with span('json_decode'):
+        if JSON_DECODE == 'targeted':
+            try:
+                subtrees = {key: decode_json_subtree(deferred_state, key) for key in ('stayProductDetail', 'stayProductDetailPage')}
+            except ValueError:
+                subtrees = {}
+            found = {key: subtree for key, subtree in subtrees.items() if subtree is not None}
+            # Every subtree found must hold its sections, or the page is decoded whole
+            if found and all(isinstance(subtree, dict) and isinstance(subtree.get('sections'), dict) for subtree in found.values()):
+                presentation = found
+        if presentation is None:
+            presentation = _decode_listing_presentation(deferred_state)
+
+    section_index: SectionIndex = {}
+    with span('section_index'):
+        detail_sections = _json_member(_json_member(presentation, 'stayProductDetail', dict), 'sections', dict)
+        for section in _json_member(detail_sections, 'sectionData', list):
+            if isinstance(section, dict) and section.get('sectionType') in INDEXED_SECTION_TYPES:
+                section_index.setdefault(section['sectionType'], []).append(section)
+        page_sections = _json_member(_json_member(presentation, 'stayProductDetailPage', dict), 'sections', dict)
+        for section_container in _json_member(page_sections, 'sections', list):
+            if isinstance(section_container, dict) and section_container.get('sectionComponentType') in INDEXED_SECTION_TYPES:
+                section_index.setdefault(section_container['sectionComponentType'], []).append(section_container.get('section', {}))
+    return section_index
+
+async def get_section_index_async(url: str, fetch=get_page_html_async) -> SectionIndex | None:
+    """
+    Returns the section index of a listing page, shared by every tool that loads the same page
+    while it stays in the section index cache. Returns None if the page could not be fetched.
+    Raises ValueError if the page payload could not be parsed.
+    """
+    return await section_index_cache.get_or_load(
+        DiskResponseCache.normalize_url(url), lambda: load_page_async(url, build_section_index, fetch=fetch)
+    )
+
+@dataclass(frozen=True, slots=True)
+class SectionExtractor:
+    """
+    Declares one field read from a listing page: the section types it comes from, in order of
+    preference, and a function turning the sections of the first type present into the field value.
+    """
+    section_types: tuple[str, ...]
+    extract: Callable[[List[Dict[str, Any]]], Any]
+
+def extract_section_fields(section_index: SectionIndex, extractors: Dict[str, SectionExtractor]) -> Dict[str, Any]:
+    """
+    Extracts every declared field from an indexed listing page. Sections are looked up in the index,
+    so adding a field never adds a scan over the page.
+    """
+    values = {}
+    for name, extractor in extractors.items():
+        sections = next((section_index[section_type] for section_type in extractor.section_types if section_type in section_index), [])
+        values[name] = extractor.extract(sections)
+    return values
+
+def _highlight_subtitle(sections: List[Dict[str, Any]], matches: Callable[[str], bool]) -> str | None:
+    subtitle = None
+    for section in sections:
+        for highlight in section.get('sectionItems', []):
+            if matches(highlight.get('title', '').lower()):
+                subtitle = highlight.get('subtitle')
+    return subtitle
+
+def _bedroom_count(sections: List[Dict[str, Any]]) -> int | None:
+    subtitle = _highlight_subtitle(sections, lambda title: 'bedroom' in title or 'studio' in title)
+    count = parse_count(subtitle)
+    # A studio highlight has no count: it stands for 0 bedrooms
+    if count is None and subtitle is not None and 'studio' in subtitle.lower():
+        return 0
+    return count
+
+def _last_section(sections: List[Dict[str, Any]]) -> Any:
+    return sections[-1] if sections else 'N/A'
+
+# Fields of scrape_listing_details / enrich_airbnb_listings
+LISTING_DETAIL_EXTRACTORS = {
+    'beds': SectionExtractor(('HIGHLIGHTS',), lambda sections: parse_count(_highlight_subtitle(sections, lambda title: 'bed' in title and 'bedroom' not in title))),
+    'bedrooms': SectionExtractor(('HIGHLIGHTS',), _bedroom_count),
+    'bathrooms': SectionExtractor(('HIGHLIGHTS',), lambda sections: parse_number(_highlight_subtitle(sections, lambda title: 'bath' in title and 'bed' not in title))),
+    'amenities': SectionExtractor(('AMENITIES',), lambda sections: [item['title'] for item in sections[0].get('sectionItems', []) if item.get('title')] if sections else []),
+    'location': SectionExtractor(('LOCATION',), lambda sections: sections[0].get('title') if sections else None),
+}
+
+# Sections of scrape_airbnb_listing_info, in output order
+LISTING_INFO_EXTRACTORS = {
+    'airbnb_description': SectionExtractor(('PDP_DESCRIPTION_MODAL',), _last_section),
+    'airbnb_location': SectionExtractor(('LOCATION_PDP',), _last_section),
+    'airbnb_host': SectionExtractor(('MEET_YOUR_HOST',), _last_section),
+    'airbnb_rating_and_reviews': SectionExtractor(('REVIEWS_DEFAULT',), _last_section),
+    'airbnb_house_rules': SectionExtractor(('POLICIES_DEFAULT',), _last_section),
+    'airbnb_prices_info': SectionExtractor(('BOOK_IT_SIDEBAR', 'BOOK_IT_FLOATING_FOOTER'), _last_section),
+    'airbnb_image_info': SectionExtractor(('HERO_DEFAULT',), _last_section),
+}
+
+# Section types read by the registries above; the section index holds nothing else, which keeps
+# what a parse worker sends back, and what the section index cache holds, small
+INDEXED_SECTION_TYPES = frozenset(
+    section_type
+    for extractors in (LISTING_DETAIL_EXTRACTORS, LISTING_INFO_EXTRACTORS)
+    for extractor in extractors.values()
+    for section_type in extractor.section_types
+)
+
+def apply_listing_details(room: 'ListingRecord', details: Dict[str, Any]) -> None:
+    """
+    Merges listing page details into a listing record; counts the page did not show are kept.
+    """
+    if details['beds'] is not None:
+        room.beds = details['beds']
+    if details['bedrooms'] is not None:
+        room.bedrooms = details['bedrooms']
+    if details['bathrooms'] is not None:
+        room.bathrooms = details['bathrooms']
+    room.amenities = details['amenities']
+    room.location = details['location']
+
+async def enrich_room_details(
+    listings_data: List['ListingRecord'],
+    on_enriched: Callable[['ListingRecord'], None] | None = None,
+    fetch: Callable[[str], Any] | None = None
+) -> None:
+    """
+    Fetches details from individual listing pages and merges them into the listing records in place.
+    on_enriched, if given, is called with each room as soon as its details have been merged.
+    fetch, if given, replaces the detail fetch scheduler for the listing page requests.
+    """
+    rooms = [room for room in listings_data if room.listing_id is not None]
+    if not rooms:
+        return
 
-async def extract_room_information(html_content: str, checkin_date: str, checkout_date: str, adults: int, guests: int) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    async def enrich(room: ListingRecord) -> None:
+        started = time.perf_counter()
+        try:
+            details = await scrape_listing_details(room.listing_id, fetch)
+        except Exception as e:
+            logger.warning("Failed to fetch details for listing %s: %s", room.listing_id, e)
+            phase_timings.add('enrich', time.perf_counter() - started, 0.0)
+        else:
+            merge_started = time.thread_time()
+            apply_listing_details(room, details)
+            phase_timings.add('enrich', time.perf_counter() - started, time.thread_time() - merge_started)
+        if on_enriched is not None:
+            on_enriched(room)
+
+    logger.info("Fetching details for %s listings", len(rooms))
+    await asyncio.gather(*(enrich(room) for room in rooms))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Detail fetch scheduler stats: %s", detail_scheduler.stats())
+
+# Numeric values embedded in display strings such as "$1,234 CAD total" or "1.5 baths"
+NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+CURRENCY_CODE_RE = re.compile(r'\b[A-Z]{3}\b')
+CURRENCY_SYMBOL_RE = re.compile(r'[$€£¥₹₩]')
+
+# Counts in a listing's secondaryLine, e.g. "2 beds", "1 bedroom", "1.5 baths", "4 guests",
+# including common localized forms in singular and plural, such as "1 lit", "2 camas", "1 Bett",
+# "3 Betten", "1 huésped" or "4 voyageurs".
+# Bedroom words come before bed words so "bedroom" is never read as "bed". A studio has no
+# count and stands for 0 bedrooms.
+SECONDARY_LINE_RE = re.compile(
+    r'\b(?P<studio>studio|estudio|est[uú]dio|monolocale)\b'
+    r'|(?P<count>\d+(?:[.,]\d+)?)\s*(?:'
+    r'(?P<bedrooms>bedrooms?|chambres?|habitaci[oó]n(?:es)?|dormitorios?|quartos?|camere da letto|camera da letto|schlafzimmer)'
+    r'|(?P<beds>beds?|lits?|camas?|lett[oi]|bett(?:en)?)'
+    r'|(?P<bathrooms>(?:shared |private )?baths?|bathrooms?|salles? de bain|baños?|banheiros?|bagn[oi]|badezimmer|bäder|bad)'
+    r'|(?P<guests>guests?|voyageurs?|hu[eé]sped(?:es)?|h[oó]spedes?|ospit[ei]|gast|g[aä]ste)'
+    r')\b',
+    re.IGNORECASE
+)
+SECONDARY_LINE_INT_FIELDS = ('beds', 'bedrooms', 'guests')
+# Separates listings and lines in a batch; never whitespace, so a count cannot match across it
+SECONDARY_LINE_SEPARATOR = '\x00'
+
+def parse_secondary_lines(lines_per_listing: List[List[str]]) -> List[Dict[str, int | float]]:
     """
-    Extracts room information and pagination data from the Airbnb page's JSON payload.
-    Always fetches additional details from individual listing pages.
+    Parses the secondaryLine texts of a whole page of listings with a single regex scan.
 
     Args:
-        html_content (str): HTML content of the Airbnb search results page.
-        checkin_date (str): Check-in date in YYYY-MM-DD format.
-        checkout_date (str): Check-out date in YYYY-MM-DD format.
-        adults (int): Number of adults.
-        guests (int): Total number of guests.
+        lines_per_listing: For each listing, the bodies of its secondaryLine items.
 
     Returns:
-        tuple: (list of room information dictionaries, pagination information dictionary)
+        list: For each listing, the counts found (beds, bedrooms, bathrooms, guests); a later line wins.
     """
-    listings_data = []
-    pagination_info = {}
+    texts = [SECONDARY_LINE_SEPARATOR.join(lines) for lines in lines_per_listing]
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+    counts: List[Dict[str, int | float]] = [{} for _ in texts]
+    page_text = SECONDARY_LINE_SEPARATOR.join(texts)
+    for match in SECONDARY_LINE_RE.finditer(page_text):
+        name, number = match.lastgroup, match.group('count')
+        if name == 'studio':
+            name, number = 'bedrooms', '0'
+        value = int(number) if number.isdigit() else float(number.replace(',', '.'))
+        counts[bisect.bisect_right(starts, match.start()) - 1][name] = int(value) if name in SECONDARY_LINE_INT_FIELDS else float(value)
+    return counts
+
+def parse_number(text: str | None) -> float | None:
+    """
+    Returns the first number in a display string (thousands separators removed), or None if there is none.
+    """
+    if not text:
+        return None
+    match = NUMBER_RE.search(text)
+    if not match:
+        return None
+    return float(match.group().replace(',', ''))
 
-    # Parse HTML and find script tag
-    soup = BeautifulSoup(html_content, 'html.parser')
-    script_element = soup.find('script', id="data-deferred-state-0")
-    if not script_element or not script_element.string:
-        logger.error("Script tag 'data-deferred-state-0' not found or empty.")
-        return [], {}
+def parse_count(text: str | None) -> int | None:
+    """
+    Returns the first number in a display string as an integer, e.g. 2 for "2 beds".
+    """
+    number = parse_number(text)
+    return int(number) if number is not None else None
+
+def parse_price(label: str | None) -> tuple[float | None, str | None]:
+    """
+    Splits a price label such as "$39 CAD per night" into its amount and currency.
+    The currency is the ISO code when the label has one, otherwise the currency symbol.
+    """
+    amount = parse_number(label)
+    if amount is None:
+        return None, None
+    currency = CURRENCY_CODE_RE.search(label) or CURRENCY_SYMBOL_RE.search(label)
+    return amount, currency.group() if currency else None
+
+def parse_rating(label: str | None) -> float | None:
+    """
+    Returns the average rating from a label such as "4.85 out of 5 average rating", or None for new listings.
+    """
+    rating = parse_number(label)
+    return rating if rating is not None and rating <= 5 else None
+
+@dataclass(slots=True)
+class ListingRecord:
+    """
+    One listing of a search, normalized once when its search results page is parsed.
+    Values that are unknown are None; details from the listing page are merged in by enrich_room_details.
+    """
+    listing_id: str | None = None
+    url: str | None = None
+    title: str | None = None
+    price: float | None = None
+    currency: str | None = None
+    price_qualifier: str | None = None
+    average_rating: float | None = None
+    rating_count: int = 0
+    host_name: str | None = None
+    host_is_verified: bool = False
+    host_is_superhost: bool = False
+    host_years: int = 0
+    host_months: int = 0
+    latitude: float | None = None
+    longitude: float | None = None
+    beds: int | None = None
+    guests: int | None = None
+    image_urls: List[str] = field(default_factory=list)
+    badges: List[str] = field(default_factory=list)
+    listing_type: str | None = None
+    bedrooms: int | None = None
+    bathrooms: float | None = None
+    amenities: List[str] = field(default_factory=list)
+    location: str | None = None
+
+    def to_dict(self, fields: tuple[str, ...]) -> Dict[str, Any]:
+        """
+        Returns the given fields of the listing as a dictionary, in the order given.
+        """
+        return {name: getattr(self, name) for name in fields}
+
+# Field names of a listing record, in output order
+LISTING_FIELDS = tuple(record_field.name for record_field in dataclass_fields(ListingRecord))
+
+def serialize_listings(records: List[ListingRecord], fields: tuple[str, ...], pretty: bool = False) -> str:
+    """
+    Serializes listing records restricted to the given fields.
+    """
+    return dump_json([record.to_dict(fields) for record in records], pretty)
 
+def _decode_stays_search(deferred_state: str) -> Dict[str, Any] | None:
+    """
+    Decodes a whole search results page payload and returns its staysSearch object, or None if it is missing.
+    """
     # Parse JSON from script tag
     try:
-        full_data = json.loads(script_element.string)
+        full_data = decode_json(deferred_state)
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON from script tag: {e}")
-        return [], {}
+        logger.error("Failed to parse JSON from script tag: %s", e)
+        return None
 
     # Access niobeMinimalClientData
     client_data = full_data.get("niobeMinimalClientData", [])
 
     if not client_data or not isinstance(client_data, list) or len(client_data) < 1 or len(client_data[0]) < 2:
         logger.error("'niobeMinimalClientData' is missing or has unexpected structure.")
-        return [], {}
+        return None
 
     # Access relevant data
     relevant_data = client_data[0][1]
     if not isinstance(relevant_data, dict):
         logger.error("'niobeMinimalClientData[0][1]' is not a dictionary.")
-        return [], {}
+        return None
 
     # Navigate to staysSearch.results
     data = relevant_data.get('data')
     if data is None:
         logger.error("'data' key missing in JSON payload.")
-        return [], {}
+        return None
 
     presentation = data.get('presentation')
     if presentation is None:
         logger.error("'presentation' key missing in JSON payload.")
-        return [], {}
+        return None
 
     stays_search = presentation.get('staysSearch')
     if stays_search is None:
         logger.error("'staysSearch' key missing in JSON payload.")
+    return stays_search
+
+def parse_search_results(deferred_state: str, checkin_date: str, checkout_date: str, adults: int, guests: int) -> tuple[List[ListingRecord], Dict[str, Any]]:
+    """
+    Parses and normalizes the listings and pagination data of a search results page payload.
+
+    Args:
+        deferred_state (str): data-deferred-state-0 JSON payload of the Airbnb search results page.
+        checkin_date (str): Check-in date in YYYY-MM-DD format.
+        checkout_date (str): Check-out date in YYYY-MM-DD format.
+        adults (int): Number of adults.
+        guests (int): Total number of guests.
+
+    Returns:
+        tuple: (list of listing records, pagination information dictionary)
+    """
+    listings_data = []
+    pagination_info = {}
+
+    # Decode only the staysSearch subtree, or the whole payload if it cannot be found on its own
+    stays_search = None
+    with span('json_decode'):
+        if JSON_DECODE == 'targeted':
+            try:
+                stays_search = decode_json_subtree(deferred_state, 'staysSearch')
+            except ValueError:
+                stays_search = None
+        # A subtree without its results is not the one the parser reads: decode the page whole
+        if not (isinstance(stays_search, dict) and isinstance(stays_search.get('results'), dict)):
+            stays_search = _decode_stays_search(deferred_state)
+    if stays_search is None:
         return [], {}
 
     results = stays_search.get('results')
@@ -178,130 +1493,661 @@ async def extract_room_information(html_content: str, checkin_date: str, checkou
         logger.error("'results' key missing in JSON payload.")
         return [], {}
 
-    # Extract pagination info and search results
-    pagination_info = results.get('paginationInfo', {})
-    search_results = results.get('searchResults', [])
-    if not search_results:
-        logger.warning("No 'searchResults' found in JSON payload.")
-        return [], pagination_info
+    # Extract pagination info and search results
+    pagination_info = results.get('paginationInfo', {})
+    search_results = results.get('searchResults', [])
+    if not search_results:
+        logger.warning("No 'searchResults' found in JSON payload.")
+        return [], pagination_info
+
+    # Process each listing
+    normalize_started = (time.perf_counter(), time.thread_time())
+    secondary_lines = []
+    for index, listing in enumerate(search_results):
+        try:
+            if not isinstance(listing, dict):
+                logger.warning("Listing at index %s is not a dictionary, skipping.", index)
+                continue
+
+            room = ListingRecord()
+            demand_stay_listing = listing.get('demandStayListing', {})
+            structured_content = listing.get('structuredContent', {})
+            passport_data = listing.get('passportData', {})
+
+            # Extract listing ID and URL
+            listing_id_encoded = demand_stay_listing.get('id')
+            if listing_id_encoded:
+                try:
+                    decoded_id_string = base64.b64decode(listing_id_encoded).decode('utf-8')
+                    room.listing_id = decoded_id_string.split(':')[-1]
+                    room.url = f"{BASE_AIRBNB_ROOM_URL}{room.listing_id}?check_in={checkin_date}&check_out={checkout_date}&guests={guests}&adults={adults}"
+                except (base64.binascii.Error, UnicodeDecodeError, IndexError) as e:
+                    logger.error("Error decoding listing ID %s at index %s: %s", listing_id_encoded, index, e)
+
+            # Extract title
+            description = demand_stay_listing.get('description', {})
+            name = description.get('name', {})
+            room.title = name.get('localizedStringWithTranslationPreference')
+
+            # Extract price
+            structured_display_price = listing.get('structuredDisplayPrice', {})
+            primary_line = structured_display_price.get('primaryLine', {})
+            room.price, room.currency = parse_price(primary_line.get('accessibilityLabel'))
+            room.price_qualifier = primary_line.get('qualifier')
+
+            # Extract rating
+            room.average_rating = parse_rating(listing.get('avgRatingA11yLabel'))
+            room.rating_count = passport_data.get('ratingCount') or 0
+
+            # Extract host info
+            room.host_name = passport_data.get('name')
+            room.host_is_verified = bool(passport_data.get('isVerified'))
+            room.host_is_superhost = bool(passport_data.get('isSuperhost'))
+            time_as_host = passport_data.get('timeAsHost') or {}
+            room.host_years = time_as_host.get('years') or 0
+            room.host_months = time_as_host.get('months') or 0
+
+            # Extract location
+            location = demand_stay_listing.get('location', {})
+            coordinate = location.get('coordinate', {})
+            room.latitude = coordinate.get('latitude')
+            room.longitude = coordinate.get('longitude')
+
+            # Extract images
+            contextual_pictures = listing.get('contextualPictures', [])
+            room.image_urls = [img['picture'] for img in contextual_pictures if img.get('picture')]
+
+            # Extract badges
+            room.badges = [badge['id'] for badge in listing.get('badges', []) if badge.get('id')]
+
+            # Extract listing type
+            for item in structured_content.get('distance', []) + structured_content.get('mapCategoryInfo', []):
+                if item.get('type') == 'LISTING_PRIVATE_ROOM_SUITE_HIGHLIGHT':
+                    room.listing_type = 'Private Room'
+                    break
+
+            # Beds, bedrooms, bathrooms and guests are parsed for the whole page below
+            secondary_lines.append([item.get('body') or '' for item in structured_content.get('secondaryLine', [])])
+            listings_data.append(room)
+
+        except Exception as e:
+            logger.error("Error processing listing at index %s: %s", index, e)
+            continue
+
+    # Extract beds, bedrooms, bathrooms and guests
+    for room, counts in zip(listings_data, parse_secondary_lines(secondary_lines)):
+        for name, value in counts.items():
+            setattr(room, name, value)
+    record_span('normalize', *normalize_started)
+
+    return listings_data, pagination_info
+
+# Fields available straight from the search results payload
+SUMMARY_FIELDS = (
+    'listing_id', 'url', 'title', 'price', 'currency', 'price_qualifier', 'average_rating', 'rating_count',
+    'latitude', 'longitude', 'beds', 'guests', 'listing_type',
+)
+STANDARD_FIELDS = SUMMARY_FIELDS + (
+    'host_name', 'host_is_verified', 'host_is_superhost', 'host_years', 'host_months', 'image_urls', 'badges',
+)
+# Fields that need the individual listing page
+DETAIL_FIELDS = ('bedrooms', 'bathrooms', 'amenities', 'location')
+DETAIL_LEVEL_FIELDS = {
+    'summary': SUMMARY_FIELDS,
+    'standard': STANDARD_FIELDS,
+    'full': STANDARD_FIELDS + DETAIL_FIELDS,
+}
+
+def resolve_listing_fields(detail_level: str, fields: List[str] | None) -> tuple[tuple[str, ...], bool]:
+    """
+    Works out which listing fields to return and whether listing pages must be fetched for them.
+    Raises ValueError with a user-facing message if detail_level or a field is unknown.
+
+    Returns:
+        tuple: (field names to return, whether detail enrichment is needed)
+    """
+    if fields:
+        known = DETAIL_LEVEL_FIELDS['full']
+        valid = all(field in known for field in fields)
+        wanted = {'listing_id', *fields}
+    else:
+        valid = detail_level in DETAIL_LEVEL_FIELDS
+        wanted = set(DETAIL_LEVEL_FIELDS.get(detail_level, ()))
+    if not valid:
+        raise ValueError(
+            f"Invalid detail_level or fields: detail_level must be one of {', '.join(DETAIL_LEVEL_FIELDS)} "
+            f"and fields must be among {', '.join(DETAIL_LEVEL_FIELDS['full'])}."
+        )
+    # Fields are always returned in listing record order
+    selected = tuple(name for name in LISTING_FIELDS if name in wanted)
+    return selected, any(name in DETAIL_FIELDS for name in selected)
+
+def dump_json(value: Any, pretty: bool = False) -> str:
+    """
+    Serializes a tool result: compact JSON unless pretty is True, in which case it is indented for reading.
+    """
+    if pretty:
+        return json.dumps(value, indent=2, ensure_ascii=False)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def build_search_url(
+    place: str,
+    checkin_date: str,
+    checkout_date: str,
+    adults: int = 1,
+    children: int = 0,
+    infants: int = 0,
+    pets: int = 0,
+    price_max: int | None = None
+) -> str:
+    """
+    Builds the URL of the first Airbnb search results page for the given search parameters.
+    """
+    # URL-encode the place string
+    encoded_place = urllib.parse.quote(place)
+
+    initial_url_template = (
+        "{base_url}/s/{encoded_place}/homes?"
+        "refinement_paths%5B%5D=%2Fhomes"
+        "&date_picker_type=calendar"
+        "&checkin={checkin_date}"
+        "&checkout={checkout_date}"
+        "&adults={adults}"
+        "&children={children}"
+        "&infants={infants}"
+        "&pets={pets}"
+        "&source=structured_search_input_header"
+    )
+
+    if price_max is not None:
+        initial_url_template += "&price_max={price_max}"
+
+    return initial_url_template.format(
+        base_url=AIRBNB_BASE_URL,
+        encoded_place=encoded_place,
+        checkin_date=checkin_date,
+        checkout_date=checkout_date,
+        adults=adults,
+        children=children,
+        infants=infants,
+        pets=pets,
+        **({'price_max': price_max} if price_max is not None else {})
+    )
+
+def next_page_url(initial_url: str, cursor: str) -> str:
+    """
+    Returns the URL of the search results page a pagination cursor points to. The cursor is
+    URL-encoded, so base64 characters such as '+' and '/' reach Airbnb unchanged.
+    """
+    parsed_initial_url = urllib.parse.urlparse(initial_url)
+    query_params = urllib.parse.parse_qs(parsed_initial_url.query)
+    query_params['cursor'] = [cursor]
+    return parsed_initial_url._replace(query=urllib.parse.urlencode(query_params, doseq=True)).geturl()
+
+STAY_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def normalize_stay_date(date_str: str, label: str) -> str:
+    """
+    Validates a YYYY-MM-DD stay date and moves dates from past years into the current year.
+    Raises ValueError with a user-facing message when the date is invalid.
+    """
+    if not STAY_DATE_RE.match(date_str):
+        raise ValueError(f"Invalid {label} date format: Must be YYYY-MM-DD.")
+    try:
+        parsed_date = datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid {label} date: Unable to parse date.")
+    current_year = datetime.now().year
+    if parsed_date.year < current_year:
+        adjusted = f"{current_year}-{parsed_date.strftime('%m-%d')}"
+        logger.info("Adjusted %s date from %s to %s: %s", label, parsed_date.year, current_year, adjusted)
+        return adjusted
+    return date_str
+
+class SearchSession:
+    """
+    Registry of the listings seen during one search, shared by all of its pages,
+    so a listing repeated across pages or cursors is parsed into the results and enriched only once.
+    """
+    duplicates_avoided_total = 0
+
+    def __init__(self):
+        self.seen: set[str] = set()
+        self.duplicates_avoided = 0
+
+    def claim_new(self, rooms: List[ListingRecord]) -> List[ListingRecord]:
+        """
+        Returns the rooms not seen before in this session and marks them as seen.
+        Rooms without a listing ID are always returned.
+        """
+        new_rooms = []
+        for room in rooms:
+            listing_id = room.listing_id
+            if listing_id is not None:
+                if listing_id in self.seen:
+                    self.duplicates_avoided += 1
+                    SearchSession.duplicates_avoided_total += 1
+                    continue
+                self.seen.add(listing_id)
+            new_rooms.append(room)
+        return new_rooms
+
+LISTING_SORT_KEYS = {
+    'rating': lambda room: (room.average_rating is None, -(room.average_rating or 0), -room.rating_count),
+    'price': lambda room: (room.price is None, room.price or 0),
+}
+
+def rank_listings(rooms: List[ListingRecord], sort_by: str) -> List[ListingRecord]:
+    """
+    Returns the rooms ordered by sort_by: "rating" (highest first, then most reviews) or "price" (lowest first).
+    Rooms without the value come last.
+    """
+    return sorted(rooms, key=LISTING_SORT_KEYS[sort_by])
+
+def in_bounding_box(latitude: float | None, longitude: float | None, bounding_box: tuple[float, float, float, float]) -> bool:
+    """
+    Tells whether a point lies inside (south, west, north, east). A box whose west edge is east
+    of its east edge crosses the antimeridian. Points without coordinates are outside every box.
+    """
+    south, west, north, east = bounding_box
+    if latitude is None or longitude is None or not south <= latitude <= north:
+        return False
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
+
+EARTH_RADIUS_KM = 6371.0088
 
-    # Process each listing
-    for index, listing in enumerate(search_results):
-        try:
-            if not isinstance(listing, dict):
-                logger.warning(f"Listing at index {index} is not a dictionary, skipping.")
-                continue
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
 
-            room_info = {}
-            demand_stay_listing = listing.get('demandStayListing', {})
-            structured_content = listing.get('structuredContent', {})
-            passport_data = listing.get('passportData', {})
+def _amenity_key(name: str) -> str:
+    return ''.join(char for char in name.casefold() if char.isalnum())
 
-            # Extract listing ID and URL
-            listing_id = "N/A"
-            listing_id_encoded = demand_stay_listing.get('id')
-            if listing_id_encoded:
-                try:
-                    decoded_id_string = base64.b64decode(listing_id_encoded).decode('utf-8')
-                    listing_id = decoded_id_string.split(':')[-1]
-                    room_info['listing_id'] = listing_id
-                    # Modified line to include detailed query parameters
-                    room_info['url'] = f"{BASE_AIRBNB_ROOM_URL}{listing_id}?check_in={checkin_date}&check_out={checkout_date}&guests={guests}&adults={adults}"
-                except (base64.binascii.Error, UnicodeDecodeError, IndexError) as e:
-                    logger.error(f"Error decoding listing ID {listing_id_encoded} at index {index}: {e}")
-                    room_info['listing_id'] = 'N/A'
-                    room_info['url'] = 'N/A'
+@dataclass(slots=True)
+class ListingFilters:
+    """
+    Server-side filters of a search. Summary filters only need the search results page, so they are
+    applied before enrichment; detail filters (amenities, bedrooms) need the listing page.
+    """
+    min_rating: float | None = None
+    superhost_only: bool = False
+    bounding_box: tuple[float, float, float, float] | None = None
+    required_amenities: tuple[str, ...] = ()
+    min_bedrooms: int | None = None
 
-            # Extract title
-            description = demand_stay_listing.get('description', {})
-            name = description.get('name', {})
-            room_info['title'] = name.get('localizedStringWithTranslationPreference', 'N/A')
+    @property
+    def needs_details(self) -> bool:
+        return bool(self.required_amenities) or (self.min_bedrooms is not None and self.min_bedrooms > 0)
 
-            # Extract price
-            structured_display_price = listing.get('structuredDisplayPrice', {})
-            primary_line = structured_display_price.get('primaryLine', {})
-            room_info['price'] = primary_line.get('accessibilityLabel', 'N/A')
-            room_info['price_qualifier'] = primary_line.get('qualifier', 'N/A')
+    def needs_listing_page(self, room: ListingRecord) -> bool:
+        """
+        Whether the detail filters need room's listing page: always for amenities, and for bedrooms
+        only if the search results did not state them.
+        """
+        return bool(self.required_amenities) or (self.needs_details and room.bedrooms is None)
+
+    @property
+    def active(self) -> bool:
+        return self != ListingFilters()
+
+    def matches_summary(self, room: ListingRecord) -> bool:
+        if self.min_rating is not None and (room.average_rating is None or room.average_rating < self.min_rating):
+            return False
+        if self.superhost_only and not room.host_is_superhost:
+            return False
+        if self.bounding_box is not None and not in_bounding_box(room.latitude, room.longitude, self.bounding_box):
+            return False
+        return True
+
+    def matches_details(self, room: ListingRecord) -> bool:
+        if self.needs_details and self.min_bedrooms is not None and (room.bedrooms is None or room.bedrooms < self.min_bedrooms):
+            return False
+        if self.required_amenities:
+            amenities = [_amenity_key(amenity) for amenity in room.amenities]
+            return all(any(_amenity_key(required) in amenity for amenity in amenities) for required in self.required_amenities)
+        return True
+
+    def matches(self, room: ListingRecord) -> bool:
+        return self.matches_summary(room) and self.matches_details(room)
+
+    def crawl_key(self) -> str:
+        """
+        Returns the part of the filters that changes what a crawl returns; detail filters are applied
+        afterwards, but decide which listing pages the crawl fetches.
+        """
+        return repr((self.min_rating, self.superhost_only, self.bounding_box, self.needs_details))
 
-            # Extract rating
-            room_info['average_rating'] = listing.get('avgRatingA11yLabel', 'N/A')
-            room_info['rating_count'] = passport_data.get('ratingCount', 0)
+class ListingGeoIndex:
+    """
+    In-process grid index of recently seen listings by coordinates, so radius and bounding box
+    questions are answered without crawling again. Cells are cell_degrees square in latitude and
+    longitude; a query only visits the cells its box overlaps. Listings are kept for ttl seconds
+    after they were last seen, at most max_size of them, least recently seen dropped first.
+    Listing page details fetched later are merged into the indexed listing.
+    """
 
-            # Extract host info
-            room_info['host_name'] = passport_data.get('name', 'N/A')
-            room_info['host_is_verified'] = passport_data.get('isVerified', False)
-            room_info['host_is_superhost'] = passport_data.get('isSuperhost', False)
-            time_as_host = passport_data.get('timeAsHost', {})
-            room_info['host_years'] = time_as_host.get('years', 0)
-            room_info['host_months'] = time_as_host.get('months', 0)
+    def __init__(self, max_size: int = GEO_INDEX_MAX_SIZE, ttl: float = GEO_INDEX_TTL, cell_degrees: float = GEO_INDEX_CELL_DEGREES):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cell_degrees = cell_degrees
+        self._entries: OrderedDict[str, tuple[float, tuple[int, int], ListingRecord]] = OrderedDict()
+        self._cells: Dict[tuple[int, int], set[str]] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _remove(self, listing_id: str) -> None:
+        _, cell, _ = self._entries.pop(listing_id)
+        members = self._cells[cell]
+        members.discard(listing_id)
+        if not members:
+            del self._cells[cell]
+
+    def _expire(self) -> None:
+        # Entries are ordered by the time they were last seen, so expired ones are at the front
+        deadline = time.monotonic() - self.ttl
+        while self._entries:
+            listing_id, (seen_at, _, _) = next(iter(self._entries.items()))
+            if seen_at > deadline:
+                break
+            self._remove(listing_id)
+            self.evictions += 1
 
-            # Extract location
-            location = demand_stay_listing.get('location', {})
-            coordinate = location.get('coordinate', {})
-            room_info['latitude'] = coordinate.get('latitude', 'N/A')
-            room_info['longitude'] = coordinate.get('longitude', 'N/A')
-
-            # Extract beds and guests
-            beds_info = 'N/A'
-            guests_info = 'N/A'
-            secondary_line = structured_content.get('secondaryLine', [])
-            for item in secondary_line:
-                body_text = item.get('body', '')
-                bed_match = re.search(r'(\d+\s*bed(s)?)', body_text, re.IGNORECASE)
-                if bed_match:
-                    beds_info = bed_match.group(1)
-                guest_match = re.search(r'(\d+\s*guest(s)?)', body_text, re.IGNORECASE)
-                if guest_match:
-                    guests_info = guest_match.group(1)
-            room_info['beds'] = beds_info
-            room_info['guests'] = guests_info
+    def add(self, rooms: List[ListingRecord]) -> None:
+        """
+        Indexes copies of the listings that have an id and coordinates; the records passed in are left
+        as they are. A listing seen again replaces its previous record, keeping listing page details
+        the new record does not have yet.
+        """
+        now = time.monotonic()
+        for room in rooms:
+            if room.listing_id is None or room.latitude is None or room.longitude is None:
+                continue
+            indexed_room = dataclass_replace(room, image_urls=list(room.image_urls), badges=list(room.badges), amenities=list(room.amenities))
+            previous = self._entries.get(room.listing_id)
+            if previous is not None:
+                previous_room = previous[2]
+                for name in DETAIL_FIELDS:
+                    if getattr(indexed_room, name) in (None, []):
+                        setattr(indexed_room, name, getattr(previous_room, name))
+                self._remove(room.listing_id)
+            cell = self._cell(room.latitude, room.longitude)
+            self._entries[room.listing_id] = (now, cell, indexed_room)
+            self._cells.setdefault(cell, set()).add(room.listing_id)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        self._expire()
+
+    def update_details(self, listing_id: str, details: Dict[str, Any]) -> None:
+        """
+        Merges listing page details into the indexed listing, if it is indexed.
+        """
+        entry = self._entries.get(listing_id)
+        if entry is not None:
+            apply_listing_details(entry[2], details)
+
+    def _cell_ranges(self, bounding_box: tuple[float, float, float, float]) -> List[tuple[int, int, int, int]]:
+        south, west, north, east = bounding_box
+        low_row, low_column = self._cell(south, west)
+        high_row, high_column = self._cell(north, east)
+        if west <= east:
+            return [(low_row, high_row, low_column, high_column)]
+        # Split a box crossing the antimeridian into its two halves
+        return [
+            (low_row, high_row, low_column, self._cell(north, 180.0)[1]),
+            (low_row, high_row, self._cell(south, -180.0)[1], high_column),
+        ]
+
+    def within_bounding_box(self, bounding_box: tuple[float, float, float, float]) -> List[ListingRecord]:
+        """
+        Returns the indexed listings inside (south, west, north, east), most recently seen first.
+        """
+        self._expire()
+        ranges = self._cell_ranges(bounding_box)
+        cell_count = sum((high_row - low_row + 1) * (high_column - low_column + 1) for low_row, high_row, low_column, high_column in ranges)
+        if cell_count > len(self._cells):
+            # Large boxes: walking the occupied cells is cheaper than walking the box
+            cells = [cell for cell in self._cells if any(
+                low_row <= cell[0] <= high_row and low_column <= cell[1] <= high_column
+                for low_row, high_row, low_column, high_column in ranges
+            )]
+        else:
+            cells = [
+                (row, column)
+                for low_row, high_row, low_column, high_column in ranges
+                for row in range(low_row, high_row + 1)
+                for column in range(low_column, high_column + 1)
+                if (row, column) in self._cells
+            ]
+        found = []
+        for cell in cells:
+            for listing_id in self._cells[cell]:
+                seen_at, _, room = self._entries[listing_id]
+                if in_bounding_box(room.latitude, room.longitude, bounding_box):
+                    found.append((seen_at, room))
+        found.sort(key=lambda item: item[0], reverse=True)
+        return [room for _, room in found]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[tuple[float, ListingRecord]]:
+        """
+        Returns (distance in km, listing) pairs for the indexed listings within radius_km of a point, nearest first.
+        """
+        d_latitude = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = max(-90.0, latitude - d_latitude), min(90.0, latitude + d_latitude)
+        cos_latitude = math.cos(math.radians(latitude))
+        d_longitude = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_latitude)) if cos_latitude > 1e-9 else 180.0
+        if south <= -90.0 or north >= 90.0 or d_longitude >= 180.0:
+            west, east = -180.0, 180.0
+        else:
+            west = (longitude - d_longitude + 180.0) % 360.0 - 180.0
+            east = (longitude + d_longitude + 180.0) % 360.0 - 180.0
+        found = []
+        for room in self.within_bounding_box((south, west, north, east)):
+            distance = haversine_km(latitude, longitude, room.latitude, room.longitude)
+            if distance <= radius_km:
+                found.append((distance, room))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._cells.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self._entries),
+            'cells': len(self._cells),
+            'max_size': self.max_size,
+            'ttl_s': self.ttl,
+            'cell_degrees': self.cell_degrees,
+            'evictions': self.evictions,
+        }
 
-            # Extract images
-            contextual_pictures = listing.get('contextualPictures', [])
-            room_info['image_urls'] = [img.get('picture', 'N/A') for img in contextual_pictures]
+listing_geo_index = ListingGeoIndex()
 
-            # Extract badges
-            room_info['badges'] = [badge.get('id', 'N/A') for badge in listing.get('badges', [])]
+async def crawl_search_listings(
+    initial_url: str,
+    checkin_date: str,
+    checkout_date: str,
+    adults: int,
+    guests: int,
+    max_pages: int,
+    on_enriched: Callable[[ListingRecord], None] | None = None,
+    enrich: bool = True,
+    session: SearchSession | None = None,
+    page_fetch: Callable[[str], Any] = get_page_html_async,
+    detail_fetch: Callable[[str], Any] | None = None,
+    keep: Callable[[ListingRecord], bool] | None = None,
+    max_results: int | None = None,
+    enrich_if: Callable[[ListingRecord], bool] | None = None
+) -> List[ListingRecord]:
+    """
+    Crawls up to max_pages search result pages starting at initial_url.
+    Listings already seen in the session are dropped before enrichment, so each one is fetched once.
+    When enrich is True every listing is also enriched with details from its listing page;
+    otherwise on_enriched is called for each listing as soon as its page is parsed.
+    page_fetch and detail_fetch replace the fetch functions of search pages and listing pages.
+    keep, if given, drops listings before they are enriched. Crawling stops early once
+    max_results listings have been kept. When enrich is False, enrich_if selects the listings
+    that are enriched anyway.
 
-            # Extract listing type
-            listing_type = 'N/A'
-            for item in structured_content.get('distance', []) + structured_content.get('mapCategoryInfo', []):
-                if item.get('type') == 'LISTING_PRIVATE_ROOM_SUITE_HIGHLIGHT':
-                    listing_type = 'Private Room'
+    Returns:
+        list: Listing records of the new listings, in page order.
+    """
+    if session is None:
+        session = SearchSession()
+    all_rooms = []
+    enrichment_tasks = []
+    current_url = initial_url
+    page_count = 0
+
+    # Pages are fetched back to back: the next page is requested as soon as its cursor is parsed,
+    # while detail enrichment of earlier pages continues in the background
+    try:
+        while current_url and page_count < max_pages:
+            page_count += 1
+            logger.info("Scraping page %s: %s", page_count, current_url)
+            parsed_page = await load_page_async(
+                current_url, parse_search_results, checkin_date, checkout_date, adults, guests, fetch=page_fetch
+            )
+
+            if parsed_page is None:
+                logger.error("Failed to retrieve search data for page %s. Stopping scrape.", page_count)
+                break
+
+            rooms_on_page, pagination_data = parsed_page
+            listing_geo_index.add(rooms_on_page)
+            found_on_page = len(rooms_on_page)
+            rooms_on_page = session.claim_new(rooms_on_page)
+            if found_on_page and len(rooms_on_page) < found_on_page:
+                logger.info("Skipped %s listings on page %s already seen in this search", found_on_page - len(rooms_on_page), page_count)
+            if keep is not None:
+                rooms_on_page = [room for room in rooms_on_page if keep(room)]
+            if max_results is not None:
+                rooms_on_page = rooms_on_page[:max_results - len(all_rooms)]
+
+            if rooms_on_page:
+                all_rooms.extend(rooms_on_page)
+                logger.info("Extracted %s rooms from page %s", len(rooms_on_page), page_count)
+                if enrich:
+                    to_enrich = rooms_on_page
+                elif enrich_if is not None:
+                    to_enrich = [room for room in rooms_on_page if enrich_if(room)]
+                else:
+                    to_enrich = []
+                if to_enrich:
+                    # Enrich this page in the background while the next page is fetched
+                    enrichment_tasks.append(asyncio.create_task(enrich_room_details(to_enrich, on_enriched, detail_fetch)))
+                if on_enriched is not None and len(to_enrich) < len(rooms_on_page):
+                    enriched_ids = {id(room) for room in to_enrich}
+                    for room in rooms_on_page:
+                        if room.listing_id is not None and id(room) not in enriched_ids:
+                            on_enriched(room)
+            elif found_on_page == 0:
+                logger.warning("No rooms found on page %s. This might indicate the end of the results.", page_count)
+                if page_count == 1:
                     break
-            room_info['listing_type'] = listing_type
 
-            # Initialize additional fields
-            room_info['bedrooms'] = 'N/A'
-            room_info['bathrooms'] = 'N/A'
-            room_info['amenities'] = []
-            room_info['location'] = 'N/A'
+            if max_results is not None and len(all_rooms) >= max_results:
+                logger.info("Collected %s listings; not fetching further pages", len(all_rooms))
+                break
+        
+            next_cursor_str = pagination_data.get('nextPageCursor')
+            if next_cursor_str:
+                current_url = next_page_url(initial_url, next_cursor_str)
+                logger.info("Next page cursor found. Updating URL for page %s", page_count + 1)
+            else:
+                logger.info("No 'nextPageCursor' found. Reached the last page or an error occurred.")
+                current_url = None
+    
+        if enrichment_tasks:
+            await asyncio.gather(*enrichment_tasks)
+    finally:
+        for task in enrichment_tasks:
+            task.cancel()
 
-            listings_data.append(room_info)
+    if session.duplicates_avoided:
+        logger.info("Deduplication avoided %s duplicate listings in this search", session.duplicates_avoided)
 
-        except Exception as e:
-            logger.error(f"Error processing listing at index {index}: {e}")
-            continue
+    return all_rooms
 
-    # Always fetch additional details
-    if listings_data:
-        logger.info(f"Fetching details for {len(listings_data)} listings")
-        tasks = [scrape_listing_details(room['listing_id']) for room in listings_data if room['listing_id'] != 'N/A']
-        details_list = await asyncio.gather(*tasks, return_exceptions=True)
-        for room, details in zip(listings_data, details_list):
-            if isinstance(details, dict):
-                if details['beds'] != 'N/A':
-                    room['beds'] = details['beds']
-                if details['bedrooms'] != 'N/A':
-                    room['bedrooms'] = details['bedrooms']
-                if details['bathrooms'] != 'N/A':
-                    room['bathrooms'] = details['bathrooms']
-                room['amenities'] = details['amenities']
-                room['location'] = details['location']
-            else:
-                logger.warning(f"Failed to fetch details for listing {room['listing_id']}: {details}")
+async def iter_search_listings(
+    initial_url: str,
+    checkin_date: str,
+    checkout_date: str,
+    adults: int,
+    guests: int,
+    max_pages: int,
+    enrich: bool = True,
+    keep: Callable[[ListingRecord], bool] | None = None,
+    max_results: int | None = None,
+    enrich_if: Callable[[ListingRecord], bool] | None = None
+) -> AsyncIterator[ListingRecord]:
+    """
+    Yields listings as soon as their details have been fetched, in completion order.
+    A listing repeated across pages is yielded (and fetched) once.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
 
-    return listings_data, pagination_info
+    async def crawl() -> None:
+        try:
+            await crawl_search_listings(
+                initial_url, checkin_date, checkout_date, adults, guests, max_pages, queue.put_nowait, enrich,
+                keep=keep, max_results=max_results, enrich_if=enrich_if
+            )
+        finally:
+            queue.put_nowait(finished)
+
+    crawler = asyncio.create_task(crawl())
+    try:
+        while (room := await queue.get()) is not finished:
+            yield room
+        await crawler
+    finally:
+        crawler.cancel()
+
+async def replay_listings(rooms: List[ListingRecord]) -> AsyncIterator[ListingRecord]:
+    """
+    Yields already fetched listings, so cached results can be streamed like a live crawl.
+    """
+    for room in rooms:
+        yield room
+
+def search_cache_key(
+    place: str,
+    checkin_date: str,
+    checkout_date: str,
+    adults: int,
+    children: int,
+    infants: int,
+    pets: int,
+    price_max: int | None,
+    max_pages: int,
+    enrich: bool,
+    filters: ListingFilters | None = None,
+    max_results: int | None = None
+) -> str:
+    """
+    Builds the search results cache key from normalized search parameters.
+    Place names differing only in case or whitespace map to the same key.
+    """
+    normalized_place = ' '.join(place.split()).casefold()
+    filters_key = filters.crawl_key() if filters is not None else None
+    return '|'.join(str(part) for part in (normalized_place, checkin_date, checkout_date, adults, children, infants, pets, price_max, max_pages, enrich, filters_key, max_results))
 
 @mcp.tool()
 async def search_airbnb_listings(
@@ -313,11 +2159,25 @@ async def search_airbnb_listings(
     infants: int = 0,
     pets: int = 0,
     price_max: int = 1000,
-    max_pages: int = 3
+    max_pages: int = 3,
+    detail_level: str = "full",
+    fields: List[str] | None = None,
+    stream: bool = False,
+    pretty: bool = False,
+    min_rating: float | None = None,
+    superhost_only: bool = False,
+    required_amenities: List[str] | None = None,
+    min_bedrooms: int | None = None,
+    bounding_box: List[float] | None = None,
+    sort_by: str | None = None,
+    limit: int | None = None,
+    ctx: Context = None
 ) -> str:
     """
     Scrapes Airbnb listings for a given location and dates, returning detailed information for each listing.
-    Always fetches details from individual listing pages to include beds, bedrooms, bathrooms, amenities, and location.
+    Individual listing pages (bedrooms, bathrooms, amenities, location) are only fetched when the requested
+    detail level or fields need them; use enrich_airbnb_listings to add those details to chosen listings later.
+    Identical searches made at the same time share one crawl, and repeats are answered from a short-lived cache.
     Optimized for Telegram with concise output and sanitized titles.
 
     Args:
@@ -330,15 +2190,36 @@ async def search_airbnb_listings(
         pets: Number of pets (default: 0).
         price_max: Maximum price per night (you must ask the user to provide how is their budget).
         max_pages: Maximum number of pages to scrape (default: 3).
+        detail_level: How much to return (default: "full"):
+            - "summary": listing_id, url, title, price, currency, price_qualifier, average_rating, rating_count, latitude, longitude, beds, guests, listing_type
+            - "standard": summary plus host details, image_urls and badges (no listing page fetches)
+            - "full": standard plus bedrooms, bathrooms, amenities and location (fetches every listing page)
+        fields: Exact list of fields to return instead of a detail level (listing_id is always included).
+            Listing pages are fetched only if it contains bedrooms, bathrooms, amenities or location.
+        stream: Send each listing as an MCP progress notification as soon as its details are fetched (default: False).
+            The client must supply a progress token to receive them; the full list is still returned at the end.
+        pretty: Indent the returned JSON for reading instead of returning compact JSON (default: False).
+        min_rating: Only return listings rated at least this (e.g., 4.8); unrated listings are dropped.
+        superhost_only: Only return listings whose host is a superhost (default: False).
+        required_amenities: Only return listings that have all of these amenities (e.g., ["Wifi", "Kitchen"]).
+            Matching ignores case and punctuation, so "wifi" matches "Wi-Fi". Fetches listing pages.
+        min_bedrooms: Only return listings with at least this many bedrooms. Fetches listing pages.
+        bounding_box: Only return listings inside [south_latitude, west_longitude, north_latitude, east_longitude].
+        sort_by: Order of the results: "price" (lowest first) or "rating" (highest first). Default: search order.
+        limit: Maximum number of listings to return. Without sort_by or listing-page filters, crawling stops
+            as soon as enough listings are found.
+        Rating, superhost and bounding box filters are applied before listing pages are fetched,
+        so listings they drop are never enriched.
 
     Returns:
-        str: JSON string containing a list of listings, each with:
+        str: JSON string containing a list of listings, each with (depending on detail_level/fields):
             - listing_id: Unique listing identifier
             - url: Direct link to the Airbnb listing
             - title: Listing title (sanitized, max 50 characters)
-            - price: Price per night or total (e.g., "$39 CAD per night")
+            - price: Price amount per night or total as a number (e.g., 39.0)
+            - currency: Currency code or symbol of the price (e.g., "CAD")
             - price_qualifier: Additional price context (e.g., "per night")
-            - average_rating: Rating (e.g., "4.78") or "N/A"
+            - average_rating: Rating as a number (e.g., 4.78), or null for new listings
             - rating_count: Number of reviews
             - host_name: Host's first name
             - host_is_verified: Whether host is verified
@@ -347,128 +2228,366 @@ async def search_airbnb_listings(
             - host_months: Months as host
             - latitude: Listing latitude
             - longitude: Listing longitude
-            - beds: Number of beds (e.g., "2 beds")
-            - guests: Number of guests (e.g., "4 guests")
-            - bedrooms: Number of bedrooms (e.g., "2 bedrooms")
-            - bathrooms: Number of bathrooms (e.g., "1 bath")
+            - beds: Number of beds (e.g., 2)
+            - guests: Number of guests (e.g., 4)
+            - bedrooms: Number of bedrooms (e.g., 2)
+            - bathrooms: Number of bathrooms (e.g., 1.5)
             - amenities: List of amenities (e.g., ["Wi-Fi", "Kitchen"])
             - location: Neighborhood or specific location
             - image_urls: List of image URLs
             - badges: List of badges (e.g., ["NEW"])
             - listing_type: Type of listing (e.g., "Private Room")
-        If no listings are found, returns a plain-text error message.
+        Values that are not known are null. If no listings are found, returns a plain-text error message.
     """
     # Validate inputs
-    current_year = datetime.now().year  # Dynamically get the current year
-
-    # Validate and adjust checkin_date
-    if not re.match(r"^\d{4}-\d{2}-\d{2}$", checkin_date):
-        return "Invalid check-in date format: Must be YYYY-MM-DD."
     try:
-        cin_date = datetime.strptime(checkin_date, "%Y-%m-%d")
-        if cin_date.year < current_year:
-            checkin_date = f"{current_year}-{cin_date.strftime('%m-%d')}"
-            logger.info(f"Adjusted checkin_date from {cin_date.year} to {current_year}: {checkin_date}")
-    except ValueError:
-        return "Invalid check-in date: Unable to parse date."
+        selected_fields, enrich = resolve_listing_fields(detail_level, fields)
+    except ValueError as e:
+        return str(e)
+    if min_rating is not None and not 0 <= min_rating <= 5:
+        return "Invalid min_rating: must be between 0 and 5."
+    if bounding_box is not None and (len(bounding_box) != 4 or not bounding_box[0] <= bounding_box[2]):
+        return "Invalid bounding_box: must be [south_latitude, west_longitude, north_latitude, east_longitude]."
+    if sort_by is not None and sort_by not in LISTING_SORT_KEYS:
+        return f"Invalid sort_by: must be one of {', '.join(LISTING_SORT_KEYS)}."
+    if limit is not None and limit < 1:
+        return "Invalid limit: must be at least 1."
+    filters = ListingFilters(
+        min_rating=min_rating,
+        superhost_only=superhost_only,
+        bounding_box=tuple(bounding_box) if bounding_box is not None else None,
+        required_amenities=tuple(required_amenities or ()),
+        min_bedrooms=min_bedrooms,
+    )
+    # Listing-page filters need the listing pages even if the returned fields do not; a bedroom
+    # filter only needs those of listings whose search result did not state the bedrooms
+    enrich_if = filters.needs_listing_page if filters.needs_details and not enrich else None
+    # Without sorting or listing-page filters the first `limit` listings are the answer
+    max_results = limit if sort_by is None and not filters.needs_details else None
 
-    # Validate and adjust checkout_date
-    if not re.match(r"^\d{4}-\d{2}-\d{2}$", checkout_date):
-        return "Invalid check-out date format: Must be YYYY-MM-DD."
+    # Validate and adjust the dates
     try:
-        cout_date = datetime.strptime(checkout_date, "%Y-%m-%d")
-        if cout_date.year < current_year:
-            checkout_date = f"{current_year}-{cout_date.strftime('%m-%d')}"
-            logger.info(f"Adjusted checkout_date from {cout_date.year} to {current_year}: {checkout_date}")
-    except ValueError:
-        return "Invalid check-out date: Unable to parse date."
+        checkin_date = normalize_stay_date(checkin_date, 'check-in')
+        checkout_date = normalize_stay_date(checkout_date, 'check-out')
+    except ValueError as e:
+        return str(e)
 
     # Compute total guests
     guests = adults + children + infants
-    # URL-encode the place string
-    encoded_place = urllib.parse.quote(place)
-    logger.info(f"Starting scrape for place: {place} (encoded: {encoded_place})")
-
-    initial_url_template = (
-        "https://www.airbnb.ca/s/{encoded_place}/homes?"
-        "refinement_paths%5B%5D=%2Fhomes"
-        "&date_picker_type=calendar"
-        "&checkin={checkin_date}"
-        "&checkout={checkout_date}"
-        "&adults={adults}"
-        "&children={children}"
-        "&infants={infants}"
-        "&pets={pets}"
-        "&source=structured_search_input_header"
-    )
-
-    if price_max is not None:
-        initial_url_template += "&price_max={price_max}"
-
-    initial_url = initial_url_template.format(
-        encoded_place=encoded_place,
-        checkin_date=checkin_date,
-        checkout_date=checkout_date,
-        adults=adults,
-        children=children,
-        infants=infants,
-        pets=pets,
-        **({'price_max': price_max} if price_max is not None else {})
-    )
-    
-    all_rooms = []
-    current_url = initial_url
-    page_count = 0
+    logger.info("Starting scrape for place: %s", place)
+    initial_url = build_search_url(place, checkin_date, checkout_date, adults, children, infants, pets, price_max)
 
-    while current_url and page_count < max_pages:
-        page_count += 1
-        logger.info(f"Scraping page {page_count}: {current_url}")
-        html_content = await get_page_html_async(current_url)
+    started = time.perf_counter()
+    first_result_after = None
 
-        if html_content is None:
-            logger.error(f"Failed to retrieve HTML for page {page_count}. Stopping scrape.")
-            break
+    def mark_first_result(room: ListingRecord) -> None:
+        nonlocal first_result_after
+        if first_result_after is None:
+            first_result_after = time.perf_counter() - started
 
-        # Pass search parameters to extract_room_information
-        rooms_on_page, pagination_data = await extract_room_information(
-            html_content, checkin_date, checkout_date, adults, guests
+    async def crawl() -> List[ListingRecord] | None:
+        rooms = await crawl_search_listings(
+            initial_url, checkin_date, checkout_date, adults, guests, max_pages, mark_first_result, enrich,
+            keep=filters.matches_summary if filters.active else None, max_results=max_results, enrich_if=enrich_if
         )
-        
-        if rooms_on_page:
-            all_rooms.extend(rooms_on_page)
-            logger.info(f"Extracted {len(rooms_on_page)} rooms from page {page_count}")
+        # Empty results are not cached, so a blocked or failed crawl is retried by the next caller
+        return rooms or None
+
+    # Identical searches (same normalized parameters) share one crawl and its cached result
+    cache_key = search_cache_key(place, checkin_date, checkout_date, adults, children, infants, pets, price_max, max_pages, enrich, filters, max_results)
+    if stream:
+        all_rooms = []
+        crawl_done = None
+        if search_results_cache.is_loading(cache_key):
+            # An identical search is crawling: wait for its listings and replay them
+            cached_rooms = await search_results_cache.get_or_load(cache_key, crawl) or []
         else:
-            logger.warning(f"No rooms found on page {page_count}. This might indicate the end of the results.")
-            if page_count == 1:
-                break
-        
-        next_cursor_str = pagination_data.get('nextPageCursor')
-        if next_cursor_str:
-            parsed_initial_url = urllib.parse.urlparse(initial_url)
-            query_params = urllib.parse.parse_qs(parsed_initial_url.query)
-            query_params['cursor'] = [next_cursor_str]
-            
-            next_page_query = urllib.parse.urlencode(query_params, doseq=True)
-            current_url = parsed_initial_url._replace(query=next_page_query).geturl()
-            logger.info(f"Next page cursor found. Updating URL for page {page_count + 1}")
+            cached_rooms = search_results_cache.get(cache_key)
+        if cached_rooms is not None:
+            rooms = replay_listings(cached_rooms)
         else:
-            logger.info("No 'nextPageCursor' found. Reached the last page or an error occurred.")
-            current_url = None
-    
-    logger.info(f"Scraping complete. Total rooms extracted: {len(all_rooms)}")
+            # Registered like any other load, so identical searches started meanwhile share this crawl
+            crawl_done = search_results_cache.start_load(cache_key)
+            rooms = iter_search_listings(
+                initial_url, checkin_date, checkout_date, adults, guests, max_pages, enrich,
+                keep=filters.matches_summary if filters.active else None, max_results=max_results, enrich_if=enrich_if
+            )
+        try:
+            async for room in rooms:
+                mark_first_result(room)
+                all_rooms.append(room)
+                if ctx is not None and filters.matches_details(room):
+                    await ctx.report_progress(len(all_rooms), message=dump_json(room.to_dict(selected_fields)))
+        except BaseException:
+            # The failure may be this caller's own (e.g. its client went away), so searches waiting
+            # on this crawl are not failed with it: they start their own crawl instead
+            if crawl_done is not None:
+                crawl_done.cancel()
+            raise
+        if crawl_done is not None:
+            # Empty results are not cached, as for crawl()
+            crawl_done.set_result(all_rooms or None)
+    else:
+        all_rooms = await search_results_cache.get_or_load(cache_key, crawl) or []
+
+    total_time = time.perf_counter() - started
+    phase_timings.add('search_total', total_time, 0.0)
+    if first_result_after is not None:
+        phase_timings.add('search_first_result', first_result_after, 0.0)
+        logger.info("Search timing: first result after %.3fs, total %.3fs", first_result_after, total_time)
+    else:
+        logger.info("Search timing: total %.3fs (cached, shared with an identical search, or no results)", total_time)
 
-    # Deduplicate listings by listing_id
-    unique_rooms = {room['listing_id']: room for room in all_rooms if room['listing_id'] != 'N/A'}
-    all_rooms = list(unique_rooms.values())
-    logger.info(f"Total unique rooms after deduplication: {len(all_rooms)}")
+    logger.info("Scraping complete. Total rooms extracted: %s", len(all_rooms))
+
+    # Listings are deduplicated and summary-filtered while crawling; drop the ones without a listing ID
+    # and apply the listing-page filters, then rank and cut to the limit
+    all_rooms = [room for room in all_rooms if room.listing_id is not None and filters.matches_details(room)]
+    logger.info("Total unique rooms: %s", len(all_rooms))
+    if sort_by is not None:
+        all_rooms = rank_listings(all_rooms, sort_by)
+    if limit is not None:
+        all_rooms = all_rooms[:limit]
 
     if all_rooms:
-        return json.dumps(all_rooms, indent=2, ensure_ascii=False)
+        with span('serialize'):
+            return serialize_listings(all_rooms, selected_fields, pretty)
     else:
         logger.warning("No Airbnb listings found for the given criteria, or the scraper was blocked.")
         return "No Airbnb listings found for the given criteria, or the scraper was blocked. Check the debug_airbnb_page.html file for details."
 
 
+@mcp.tool()
+async def batch_search_airbnb_listings(
+    searches: List[Dict[str, str]],
+    checkin_date: str | None = None,
+    checkout_date: str | None = None,
+    adults: int = 1,
+    children: int = 0,
+    infants: int = 0,
+    pets: int = 0,
+    price_max: int = 1000,
+    max_pages: int = 1,
+    detail_level: str = "full",
+    fields: List[str] | None = None,
+    sort_by: str = "rating",
+    limit: int = 50,
+    pretty: bool = False
+) -> str:
+    """
+    Runs several Airbnb searches (different places and/or date ranges) concurrently and returns one combined,
+    ranked list. All searches share one fetch budget that is handed out to them in turn, and a listing found
+    by several searches with the same dates is returned (and fetched) once.
+
+    Args:
+        searches: The searches to run, each with a "place" and optionally its own "checkin_date" and "checkout_date"
+            (e.g., [{"place": "Lisbon"}, {"place": "Porto"}] or [{"place": "Lisbon", "checkin_date": "2025-09-01", "checkout_date": "2025-09-05"}]).
+        checkin_date: Check-in date in YYYY-MM-DD format for searches that do not give their own.
+        checkout_date: Check-out date in YYYY-MM-DD format for searches that do not give their own.
+        adults: Number of adults (default: 1).
+        children: Number of children (default: 0).
+        infants: Number of infants (default: 0).
+        pets: Number of pets (default: 0).
+        price_max: Maximum price per night (default: 1000).
+        max_pages: Maximum number of result pages per search (default: 1).
+        detail_level: "summary", "standard" or "full", as for search_airbnb_listings (default: "full").
+        fields: Exact list of fields to return instead of a detail level (listing_id is always included).
+        sort_by: Ranking of the combined list: "rating" (highest first) or "price" (lowest first) (default: "rating").
+        limit: Maximum number of listings to return (default: 50).
+        pretty: Indent the returned JSON for reading instead of returning compact JSON (default: False).
+
+    Returns:
+        str: JSON object with:
+            - searches: For each search, its place, dates, number of listings found, and an error message if it failed
+            - duplicates_avoided: Number of listings found again by another search with the same dates
+            - listings: The ranked listings, each with the same fields as search_airbnb_listings plus
+              "search", the index of the search that found it
+        Invalid arguments return a plain-text error message.
+    """
+    # Validate inputs
+    try:
+        selected_fields, enrich = resolve_listing_fields(detail_level, fields)
+    except ValueError as e:
+        return str(e)
+    if sort_by not in LISTING_SORT_KEYS:
+        return f"Invalid sort_by: must be one of {', '.join(LISTING_SORT_KEYS)}."
+    if limit < 1:
+        return "Invalid limit: must be at least 1."
+    if not searches:
+        return "No searches given."
+    if len(searches) > BATCH_MAX_QUERIES:
+        return f"Too many searches: at most {BATCH_MAX_QUERIES} can be run in one batch."
+
+    queries = []
+    for index, search in enumerate(searches):
+        place = (search.get('place') or '').strip()
+        if not place:
+            return f"Search {index} has no place."
+        try:
+            query_checkin = normalize_stay_date(search.get('checkin_date') or checkin_date or '', 'check-in')
+            query_checkout = normalize_stay_date(search.get('checkout_date') or checkout_date or '', 'check-out')
+        except ValueError as e:
+            return f"Search {index}: {e}"
+        queries.append({'place': place, 'checkin_date': query_checkin, 'checkout_date': query_checkout})
+
+    guests = adults + children + infants
+    budget = FairFetchBudget()
+    # Listings are only duplicates of each other when their stay dates match
+    sessions: Dict[tuple[str, str], SearchSession] = {}
+
+    async def run_query(index: int, query: Dict[str, Any]) -> List[ListingRecord]:
+        session = sessions.setdefault((query['checkin_date'], query['checkout_date']), SearchSession())
+        initial_url = build_search_url(query['place'], query['checkin_date'], query['checkout_date'], adults, children, infants, pets, price_max)
+        return await crawl_search_listings(
+            initial_url, query['checkin_date'], query['checkout_date'], adults, guests, max_pages,
+            enrich=enrich, session=session,
+            page_fetch=budget.fetcher(index, get_page_html_async),
+            detail_fetch=budget.fetcher(index, detail_scheduler.fetch),
+        )
+
+    logger.info("Starting batch of %s searches", len(queries))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_query(index, query) for index, query in enumerate(queries)), return_exceptions=True)
+    phase_timings.add('batch_search_total', time.perf_counter() - started, 0.0)
+
+    found_by: Dict[int, int] = {}
+    all_rooms = []
+    for index, (query, result) in enumerate(zip(queries, results)):
+        if isinstance(result, BaseException):
+            logger.error("Batch search %s for %s failed: %s", index, query['place'], result)
+            query['listings_found'] = 0
+            query['error'] = str(result) or type(result).__name__
+            continue
+        rooms = [room for room in result if room.listing_id is not None]
+        query['listings_found'] = len(rooms)
+        for room in rooms:
+            found_by[id(room)] = index
+        all_rooms.extend(rooms)
+
+    ranked = rank_listings(all_rooms, sort_by)[:limit]
+    logger.info("Batch search complete: %s listings, %s returned", len(all_rooms), len(ranked))
+
+    with span('serialize'):
+        output = {
+            'searches': queries,
+            'duplicates_avoided': sum(session.duplicates_avoided for session in sessions.values()),
+            'listings': [{'search': found_by[id(room)], **room.to_dict(selected_fields)} for room in ranked],
+        }
+        return dump_json(output, pretty)
+
+@mcp.tool()
+async def enrich_airbnb_listings(listing_ids: List[str], pretty: bool = False) -> str:
+    """
+    Fetches listing-page details for chosen listings, typically ones returned by search_airbnb_listings
+    with detail_level "summary" or "standard".
+
+    Args:
+        listing_ids: Listing IDs to enrich (e.g., ["15956982", "53125634"]).
+        pretty: Indent the returned JSON for reading instead of returning compact JSON (default: False).
+
+    Returns:
+        str: JSON string containing a list with, for each listing:
+            - listing_id: Unique listing identifier
+            - beds: Number of beds (e.g., 2)
+            - bedrooms: Number of bedrooms (e.g., 2)
+            - bathrooms: Number of bathrooms (e.g., 1.5)
+            - amenities: List of amenities (e.g., ["Wi-Fi", "Kitchen"])
+            - location: Neighborhood or specific location
+        Details that could not be fetched are null.
+    """
+    unique_ids = list(dict.fromkeys(str(listing_id).strip() for listing_id in listing_ids))
+    invalid_ids = [listing_id for listing_id in unique_ids if not listing_id.isdigit()]
+    if invalid_ids:
+        return f"Invalid listing IDs: {', '.join(invalid_ids)}. Listing IDs must be numeric."
+
+    logger.info("Enriching %s listings", len(unique_ids))
+    details_list = await asyncio.gather(*(scrape_listing_details(listing_id) for listing_id in unique_ids))
+    rows = [{'listing_id': listing_id, **details} for listing_id, details in zip(unique_ids, details_list)]
+    with span('serialize'):
+        return dump_json(rows, pretty)
+
+@mcp.tool()
+async def find_nearby_airbnb_listings(
+    latitude: float | None = None,
+    longitude: float | None = None,
+    radius_km: float = 1.0,
+    bounding_box: List[float] | None = None,
+    detail_level: str = "standard",
+    fields: List[str] | None = None,
+    sort_by: str | None = None,
+    limit: int = 50,
+    pretty: bool = False
+) -> str:
+    """
+    Finds listings near a point or inside a box among the listings this server has seen recently
+    in search results, without contacting Airbnb. Use it for questions like "within 1 km of X" after
+    search_airbnb_listings (or batch_search_airbnb_listings) has covered the area.
+
+    Args:
+        latitude: Latitude of the point to search around (e.g., 22.2819).
+        longitude: Longitude of the point to search around (e.g., 114.1582).
+        radius_km: Search radius around the point in kilometres (default: 1.0).
+        bounding_box: Instead of a point, return listings inside
+            [south_latitude, west_longitude, north_latitude, east_longitude].
+        detail_level: "summary", "standard" (default) or "full", as in search_airbnb_listings.
+            Listing page details are included when they were fetched earlier, otherwise they are null.
+        fields: Exact list of fields to return instead of a detail level (listing_id is always included).
+        sort_by: "distance" (nearest first, the default around a point), "rating" or "price".
+            Inside a bounding box listings are otherwise returned most recently seen first.
+        limit: Maximum number of listings to return (default: 50).
+        pretty: Indent the returned JSON for reading instead of returning compact JSON (default: False).
+
+    Returns:
+        str: JSON string containing a list of listings with the requested fields, plus distance_km
+            (distance from the point, in kilometres) when searching around a point.
+            If no recently seen listing matches, returns a plain-text message.
+    """
+    try:
+        selected_fields, _ = resolve_listing_fields(detail_level, fields)
+    except ValueError as e:
+        return str(e)
+    if bounding_box is not None:
+        if len(bounding_box) != 4 or not bounding_box[0] <= bounding_box[2]:
+            return "Invalid bounding_box: must be [south_latitude, west_longitude, north_latitude, east_longitude]."
+    elif latitude is None or longitude is None or not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        return "Invalid location: give latitude (-90 to 90) and longitude (-180 to 180), or a bounding_box."
+    elif radius_km <= 0:
+        return "Invalid radius_km: must be greater than 0."
+    if sort_by is not None and sort_by != 'distance' and sort_by not in LISTING_SORT_KEYS:
+        return f"Invalid sort_by: must be one of distance, {', '.join(LISTING_SORT_KEYS)}."
+    if sort_by == 'distance' and bounding_box is not None:
+        return "Invalid sort_by: distance needs latitude and longitude instead of a bounding_box."
+    if limit < 1:
+        return "Invalid limit: must be at least 1."
+
+    with span('geo_query'):
+        if bounding_box is not None:
+            matches = [(None, room) for room in listing_geo_index.within_bounding_box(tuple(bounding_box))]
+        else:
+            matches = listing_geo_index.within_radius(latitude, longitude, radius_km)
+        if sort_by in LISTING_SORT_KEYS:
+            sort_key = LISTING_SORT_KEYS[sort_by]
+            matches.sort(key=lambda match: sort_key(match[1]))
+        matches = matches[:limit]
+    if not matches:
+        return "No recently seen listings in this area. Search the area with search_airbnb_listings first."
+
+    with span('serialize'):
+        rows = []
+        for distance, room in matches:
+            row = room.to_dict(selected_fields)
+            if distance is not None:
+                row['distance_km'] = round(distance, 3)
+            rows.append(row)
+        return dump_json(rows, pretty)
+
+ROOM_URL_RE = re.compile(r'/rooms/(\d+)')
+
+class ListingInfoError(Exception):
+    """
+    Raised while loading a listing page; the message is returned to the caller as the tool result.
+    """
+
 @mcp.tool()
 async def scrape_airbnb_listing_info(url: str, max_retries: int = 3) -> str:
     """
@@ -481,108 +2600,120 @@ async def scrape_airbnb_listing_info(url: str, max_retries: int = 3) -> str:
     Returns:
         A information string containing a structured summary of the Airbnb Description, Location, Host, Rating and Reviews, House Rules, Prices Info, and Image Info.
     """
-    logger.info(f"Fetching details for listing URL: {url}")
-    
-    # Parse URL and extract query parameters
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
-    check_in = query_params.get('check_in', ['N/A'])[0]
-    check_out = query_params.get('check_out', ['N/A'])[0]
-    guests = query_params.get('guests', ['N/A'])[0]
-    adults = query_params.get('adults', ['N/A'])[0]
+    try:
+        return await load_listing_info(url, max_retries)
+    except ListingInfoError as e:
+        return str(e)
 
-    # Extract listing_id from URL
-    match = re.search(r'/rooms/(\d+)', url)
-    if not match:
-        logger.error(f"Invalid Airbnb URL: {url}")
-        return "Invalid Airbnb URL provided."
-    
-    listing_id = match.group(1)
-    
-    # Retry fetching HTML
-    for attempt in range(max_retries):
-        html_content = await get_page_html_async(url)
-        if html_content:
-            break
-        logger.warning(f"Retry {attempt + 1}/{max_retries} for listing {listing_id}")
-        await asyncio.sleep(1)
-    else:
-        logger.error(f"Failed to fetch HTML for listing {listing_id} after {max_retries} attempts")
-        return f"Failed to fetch details for listing {listing_id} after {max_retries} retries."
+@mcp.tool()
+async def scrape_airbnb_listings_info(listings: List[str], max_retries: int = 3) -> str:
+    """
+    Scrapes the same information as scrape_airbnb_listing_info for many listings at once, e.g. a shortlist
+    from search_airbnb_listings. Listings are fetched concurrently with bounded parallelism, and failed
+    fetches are retried with jittered exponential backoff. Cached listing pages are reused.
 
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        script_element = soup.find('script', id="data-deferred-state-0")
-        if not (script_element and script_element.string):
-            logger.error(f"No data-deferred-state-0 script found for listing {listing_id}")
-            return f"No data found for listing {listing_id}."
-
-        full_data = json.loads(script_element.string)
-        client_data = full_data.get("niobeMinimalClientData", [])
-        if not client_data or not isinstance(client_data, list) or len(client_data) < 1 or len(client_data[0]) < 2:
-            logger.error("'niobeMinimalClientData' is missing or has unexpected structure.")
-            return f"No valid data found for listing {listing_id}."
-        
-        logger.info("client_data")
-        relevant_data = client_data[0][1]
-        if not isinstance(relevant_data, dict):
-            logger.error("'niobeMinimalClientData[0][1]' is not a dictionary.")
-            return f"Invalid data structure for listing {listing_id}."
-            
-        logger.info("relevant_data")
-        data = relevant_data.get('data')
-        if data is None:
-            logger.error("'data' key missing in JSON payload.")
-            return f"No data found for listing {listing_id}."
-
-        logger.info("data")
-
-        presentation = data.get('presentation', {}).get('stayProductDetailPage', {}).get('sections', {})
-        sections = presentation.get('sections', [])
-
-        # Initialize variables to store extracted details
-        listing_details: Dict[str, Any] = {
-            'airbnb_description': 'N/A',
-            'airbnb_location': 'N/A',
-            'airbnb_host': 'N/A',
-            'airbnb_rating_and_reviews': 'N/A',
-            'airbnb_house_rules': 'N/A',
-            'airbnb_prices_info': 'N/A',
-            'airbnb_image_info': 'N/A'
-        }
+    Args:
+        listings: Listing URLs (with optional check_in, check_out, guests and adults query parameters) or listing IDs
+            (e.g., ["https://www.airbnb.ca/rooms/15956982?check_in=2025-08-01&check_out=2025-08-06", "53125634"]).
+        max_retries: Number of attempts to fetch each listing page (default: 3).
+
+    Returns:
+        str: JSON string containing a list with, for each input in order:
+            - listing: The URL or ID as given
+            - listing_id: The listing ID, or null if the input is not a listing URL or ID
+            - info: The scrape_airbnb_listing_info summary, or null on failure
+            - error: Why the listing could not be scraped, or null on success
+    """
+    if len(listings) > LISTING_INFO_MAX_BULK:
+        return f"Too many listings: at most {LISTING_INFO_MAX_BULK} can be scraped in one call."
+
+    semaphore = asyncio.Semaphore(LISTING_INFO_MAX_CONCURRENCY)
+
+    async def scrape(listing: str) -> Dict[str, Any]:
+        listing = str(listing).strip()
+        url = f"{BASE_AIRBNB_ROOM_URL}{listing}" if listing.isdigit() else listing
+        match = ROOM_URL_RE.search(url)
+        result = {'listing': listing, 'listing_id': match.group(1) if match else None, 'info': None, 'error': None}
+        try:
+            async with semaphore:
+                result['info'] = await load_listing_info(url, max_retries, fetch=detail_scheduler.fetch)
+        except ListingInfoError as e:
+            result['error'] = str(e)
+        except Exception as e:
+            # One listing failing in an unforeseen way must not fail the whole call
+            logger.error("Unexpected error scraping listing %s: %s", listing, e)
+            result['error'] = f"Unexpected error for listing {result['listing_id'] or listing}."
+        return result
 
-        # Iterate through sections to extract relevant information
-        for section_container in sections:
-            section = section_container.get('section', {})
-            section_type = section_container.get('sectionComponentType')
+    logger.info("Scraping info for %s listings", len(listings))
+    results = await asyncio.gather(*(scrape(listing) for listing in listings))
+    with span('serialize'):
+        return dump_json(results)
+
+def retry_delay(attempt: int) -> float:
+    """
+    Returns the wait before retry number attempt (0-based): exponential backoff capped at RETRY_MAX_DELAY,
+    with full jitter so concurrent retries do not hit Airbnb at the same moment.
+    """
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
 
-            # Title and description
-            if section_type == 'PDP_DESCRIPTION_MODAL':
-                listing_details['airbnb_description'] = section
+async def load_listing_info(url: str, max_retries: int = 3, fetch=get_page_html_async) -> str:
+    """
+    Returns the scrape_airbnb_listing_info summary of a listing URL, served from the in-process cache when possible.
+    Raises ListingInfoError with a user-facing message when the URL is invalid or the listing cannot be loaded.
+    """
+    logger.info("Fetching details for listing URL: %s", url)
 
-            # Location and coordinates
-            if section_type == 'LOCATION_PDP':
-                listing_details['airbnb_location'] = section
+    # Extract listing_id from URL
+    match = ROOM_URL_RE.search(url)
+    if not match:
+        logger.error("Invalid Airbnb URL: %s", url)
+        raise ListingInfoError("Invalid Airbnb URL provided.")
 
-            # Host details
-            if section_type == 'MEET_YOUR_HOST':
-                listing_details['airbnb_location'] = section
+    listing_id = match.group(1)
 
-            # Rating and reviews
-            if section_type == 'REVIEWS_DEFAULT':
-                listing_details['airbnb_host'] = section
+    # Serve repeated lookups of the same URL from the in-process cache
+    return await listing_info_cache.get_or_load(url, lambda: _fetch_listing_info(url, listing_id, max_retries, fetch))
 
-            # House rules and safety info
-            if section_type == 'POLICIES_DEFAULT':
-                listing_details['airbnb_house_rules'] = section
+async def _fetch_listing_info(url: str, listing_id: str, max_retries: int, fetch=get_page_html_async) -> str:
+    """
+    Loads the section index of a listing page and formats it into the scrape_airbnb_listing_info summary.
+    Raises ListingInfoError with a user-facing message on failure, so failures are never cached.
+    """
+    # Retry fetching the page, backing off between attempts
+    try:
+        for attempt in range(max_retries):
+            section_index = await get_section_index_async(url, fetch=fetch)
+            if section_index is not None:
+                break
+            if attempt + 1 < max_retries:
+                metrics.inc('http_retries_total', tool='scrape_airbnb_listing_info')
+                delay = retry_delay(attempt)
+                logger.warning("Retry %s/%s for listing %s in %.2fs", attempt + 1, max_retries - 1, listing_id, delay)
+                await asyncio.sleep(delay)
+        else:
+            logger.error("Failed to fetch HTML for listing %s after %s attempts", listing_id, max_retries)
+            raise ListingInfoError(f"Failed to fetch details for listing {listing_id} after {max_retries} retries.")
+    except ListingInfoError:
+        raise
+    except ValueError as e:
+        logger.error("Error processing listing details for %s: %s", listing_id, e)
+        raise ListingInfoError(f"No valid data found for listing {listing_id}.")
+    except Exception as e:
+        logger.error("Unexpected error processing listing %s: %s", listing_id, e)
+        raise ListingInfoError(f"Unexpected error for listing {listing_id}.")
 
-            # Price, capacity, and listing type
-            if section_type in ['BOOK_IT_SIDEBAR', 'BOOK_IT_FLOATING_FOOTER']:
-                listing_details['airbnb_prices_info'] = section
+    # Formatting only reads the few sections kept in the index, so it stays on the event loop
+    return format_listing_info(section_index, listing_id)
 
-            # Images and badges
-            if section_type == 'HERO_DEFAULT':
-                listing_details['airbnb_image_info'] = section
+def format_listing_info(section_index: SectionIndex, listing_id: str) -> str:
+    """
+    Formats the indexed sections of a listing page into the scrape_airbnb_listing_info summary.
+    Raises ListingInfoError with a user-facing message when the sections cannot be formatted.
+    """
+    try:
+        with span('extract_fields'):
+            listing_details = extract_section_fields(section_index, LISTING_INFO_EXTRACTORS)
 
         # Format the output string
         output = f"""
@@ -604,16 +2735,171 @@ async def scrape_airbnb_listing_info(url: str, max_retries: int = 3) -> str:
 
         return output
 
-    except (json.JSONDecodeError, KeyError, IndexError) as e:
-        logger.error(f"Error processing listing details for {listing_id}: {e}")
-        return f"Error processing details for listing {listing_id}."
     except Exception as e:
-        logger.error(f"Unexpected error processing listing {listing_id}: {e}")
-        return f"Unexpected error for listing {listing_id}."
+        logger.error("Unexpected error processing listing %s: %s", listing_id, e)
+        raise ListingInfoError(f"Unexpected error for listing {listing_id}.")
+
+def collect_server_stats() -> Dict[str, Any]:
+    """
+    Gathers phase timings, counters, scheduler and cache statistics into one dictionary.
+    """
+    disk_cache = get_disk_cache()
+    return {
+        'uptime_s': round(time.time() - SERVER_STARTED_AT, 3),
+        'phases': phase_timings.snapshot(),
+        'counters': metrics.snapshot(),
+        'detail_scheduler': detail_scheduler.stats(),
+        'caches': {
+            'listing_details': listing_details_cache.stats(),
+            'listing_info': listing_info_cache.stats(),
+            'section_index': section_index_cache.stats(),
+            'search_results': search_results_cache.stats(),
+            'disk': disk_cache.stats() if disk_cache is not None else None,
+        },
+        'search': {
+            'duplicates_avoided_total': SearchSession.duplicates_avoided_total,
+        },
+        'geo_index': listing_geo_index.stats(),
+    }
+
+COUNTER_HELP = {
+    'http_responses_total': 'HTTP responses received, by status code.',
+    'http_request_errors_total': 'HTTP requests that failed without a response.',
+    'http_bytes_received_total': 'Response body bytes downloaded, as sent on the wire (before content decoding).',
+    'http_early_stops_total': 'Page downloads ended once the data-deferred-state-0 script had closed.',
+    'http_bytes_saved_total': 'Response bytes not downloaded because of early stops (per Content-Length).',
+    'http_retries_total': 'Fetch retries, by tool.',
+}
+
+def _prometheus_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def render_prometheus(stats: Dict[str, Any]) -> str:
+    """
+    Renders collect_server_stats() output in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[tuple[Dict[str, Any], float]]) -> None:
+        lines.append(f"# HELP airbnb_{name} {help_text}")
+        lines.append(f"# TYPE airbnb_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"airbnb_{name}{_prometheus_labels(labels)} {value}")
+
+    metric('uptime_seconds', 'gauge', 'Seconds since the server started.', [({}, stats['uptime_s'])])
+    phases = stats['phases']
+    metric('phase_calls_total', 'counter', 'Timed spans per phase.', [({'phase': p}, t['count']) for p, t in phases.items()])
+    metric('phase_wall_seconds_total', 'counter', 'Wall-clock seconds spent per phase.', [({'phase': p}, t['wall_s']) for p, t in phases.items()])
+    metric('phase_cpu_seconds_total', 'counter', 'CPU seconds spent per phase.', [({'phase': p}, t['cpu_s']) for p, t in phases.items()])
+
+    counters: Dict[str, List[tuple[Dict[str, Any], float]]] = {}
+    for name, labels, value in metrics.items():
+        counters.setdefault(name, []).append((labels, value))
+    for name, samples in counters.items():
+        metric(name, 'counter', COUNTER_HELP.get(name, name.replace('_', ' ') + '.'), samples)
+
+    scheduler = stats['detail_scheduler']
+    metric('detail_fetch_queue_depth', 'gauge', 'Detail fetches waiting for a slot or token.', [({}, scheduler['queue_depth'])])
+    metric('detail_fetch_in_flight', 'gauge', 'Detail fetches in flight.', [({}, scheduler['in_flight'])])
+    metric('detail_fetch_throttled_total', 'counter', 'Detail fetches answered with 429/403.', [({}, scheduler['throttled'])])
+    metric('detail_fetch_rate', 'gauge', 'Current detail fetch rate per host (requests/second).', [({'host': h}, r) for h, r in scheduler['rates'].items()])
+
+    caches = {name: cache for name, cache in stats['caches'].items() if cache is not None}
+    metric('cache_hits_total', 'counter', 'Cache hits.', [({'cache': n}, c['hits']) for n, c in caches.items()])
+    metric('cache_misses_total', 'counter', 'Cache misses.', [({'cache': n}, c['misses']) for n, c in caches.items()])
+    metric('cache_evictions_total', 'counter', 'Cache evictions.', [({'cache': n}, c['evictions']) for n, c in caches.items()])
+    metric('cache_entries', 'gauge', 'Entries held per cache.', [({'cache': n}, c.get('size', c.get('entries'))) for n, c in caches.items()])
+    metric('search_duplicates_avoided_total', 'counter', 'Duplicate listings skipped before enrichment.', [({}, stats['search']['duplicates_avoided_total'])])
+    metric('geo_index_listings', 'gauge', 'Listings held by the geospatial index.', [({}, stats['geo_index']['size'])])
+    return "\n".join(lines) + "\n"
+
+@mcp.tool()
+async def get_server_stats(format: str = "json") -> str:
+    """
+    Reports where time goes inside this server: per-phase timings (fetch, extract, json_decode, normalize,
+    parse, enrich, serialize, search_first_result, search_total, time_to_payload), HTTP status/retry/byte counters,
+    detail fetch scheduler state and cache statistics.
+
+    Args:
+        format: "json" (default) or "prometheus" for the Prometheus text exposition format.
 
+    Returns:
+        str: The statistics in the requested format.
+    """
+    stats = collect_server_stats()
+    if format == "prometheus":
+        return render_prometheus(stats)
+    if format != "json":
+        return 'Invalid format: must be "json" or "prometheus".'
+    return dump_json(stats, pretty=True)
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
+    """
+    Liveness and load endpoint of the HTTP transports.
+    """
+    return JSONResponse({
+        'status': 'ok',
+        'transport': MCP_TRANSPORT,
+        'pid': os.getpid(),
+        'uptime_s': round(time.time() - SERVER_STARTED_AT, 3),
+        'active_sessions': active_mcp_sessions,
+        'http_client_open': _http_client is not None and not _http_client.is_closed,
+        'detail_fetch_queue_depth': detail_scheduler.queued,
+        'detail_fetch_in_flight': detail_scheduler.in_flight,
+    })
+
+def build_http_app():
+    """
+    Returns the ASGI app of the configured HTTP transport. The app holds the shared infrastructure from
+    startup to shutdown, so every session served by this process uses the same HTTP client, caches,
+    fetch scheduler and rate limits.
+    """
+    app = mcp.sse_app() if MCP_TRANSPORT == 'sse' else mcp.streamable_http_app()
+    transport_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        async with shared_infrastructure():
+            async with transport_lifespan(app):
+                logger.info("Serving MCP over %s on %s:%s (pid %s)", MCP_TRANSPORT, MCP_HOST, MCP_PORT, os.getpid())
+                yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+def run_http_server() -> None:
+    if MCP_TRANSPORT == 'sse' and MCP_WORKERS > 1:
+        # An SSE session lives in the memory of the process that opened its stream, and its messages
+        # are posted separately, to whichever process accepts them
+        logger.error("AIRBNB_MCP_TRANSPORT=sse needs AIRBNB_MCP_WORKERS=1; use streamable-http for more workers.")
+        raise SystemExit("AIRBNB_MCP_TRANSPORT=sse needs AIRBNB_MCP_WORKERS=1; use streamable-http for more workers.")
+
+    import uvicorn
+
+    if MCP_WORKERS > 1:
+        # Each worker process imports this module and builds its own app
+        uvicorn.run(
+            "main:build_http_app", factory=True, host=MCP_HOST, port=MCP_PORT, workers=MCP_WORKERS,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+        )
+    else:
+        uvicorn.run(build_http_app(), host=MCP_HOST, port=MCP_PORT)
 
 
 if __name__ == "__main__":
     logger.info("Starting Airbnb MCP server...")
-    mcp.run(transport='stdio')
+    if MCP_TRANSPORT in ('streamable-http', 'sse'):
+        run_http_server()
+    elif MCP_TRANSPORT == 'stdio':
+        mcp.run(transport='stdio')
+    else:
+        logger.error("Unknown AIRBNB_MCP_TRANSPORT %r; expected stdio, streamable-http or sse.", MCP_TRANSPORT)
+        raise SystemExit(f"Unknown AIRBNB_MCP_TRANSPORT {MCP_TRANSPORT!r}; expected stdio, streamable-http or sse.")
     logger.info("Airbnb MCP server stopped.")
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+The offset scan for <script id="data-deferred-state-0"> must return exactly what a BeautifulSoup
+parse of the same page returns.
+
+Pages recorded with benchmarks/record_fixtures.py are checked too when they are present, in
+benchmarks/recorded or in the directory named by AIRBNB_RECORDED_FIXTURES.
+"""
+import glob
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import fixtures
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+RECORDED_DIR = os.environ.get(
+    'AIRBNB_RECORDED_FIXTURES',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'recorded'),
+)
+
+PAYLOAD = '{"niobeMinimalClientData":[["StaysSearch",{"data":{"ok":true}}]]}'
+
+SYNTHETIC_PAGES = {
+    'plain': f'<html><script id="data-deferred-state-0">{PAYLOAD}</script></html>',
+    'commented_out_tag_first': (
+        '<html><!-- <script id="data-deferred-state-0">{"old":1}</script> -->'
+        f'<script id="data-deferred-state-0">{PAYLOAD}</script></html>'
+    ),
+    'multiline_comment_first': (
+        '<html><!--\n<script id="data-deferred-state-0" type="application/json">{"old":1}</script>\n-->\n'
+        f'<body><script id="data-deferred-state-0" type="application/json">{PAYLOAD}</script></body></html>'
+    ),
+    'only_commented_out': '<html><!-- <script id="data-deferred-state-0">{"old":1}</script> --></html>',
+    'gt_in_earlier_attribute': f'<script data-x="a>b" id="data-deferred-state-0">{PAYLOAD}</script>',
+    'gt_in_later_attribute': f'<script id="data-deferred-state-0" data-x=\'a>b\' type="application/json">{PAYLOAD}</script>',
+    'single_quotes': f"<script id='data-deferred-state-0'>{PAYLOAD}</script>",
+    'unquoted_id': f'<script type=application/json id=data-deferred-state-0>{PAYLOAD}</script>',
+    'uppercase_tag': f'<SCRIPT ID="data-deferred-state-0">{PAYLOAD}</SCRIPT>',
+    'spaces_around_equals': f'<script id = "data-deferred-state-0" >{PAYLOAD}</script>',
+    'lookalike_id_first': (
+        '<script id="data-deferred-state-01">{"wrong":1}</script>'
+        '<script data-id="data-deferred-state-0">{"wrong":2}</script>'
+        f'<script id="data-deferred-state-0">{PAYLOAD}</script>'
+    ),
+    'comment_markers_in_script_text': (
+        '<script>var s = "<!-- x -->";</script>'
+        f'<script id="data-deferred-state-0">{PAYLOAD}</script>'
+    ),
+    'unterminated_comment_marker_in_script_text': (
+        '<script>var s = "<!--";</script>'
+        f'<script id="data-deferred-state-0">{PAYLOAD}</script>'
+    ),
+    'empty_script': '<script id="data-deferred-state-0"></script>',
+    'missing': '<html><script id="other">{}</script></html>',
+}
+
+def _fixture_pages() -> list:
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    paths += sorted(glob.glob(os.path.join(RECORDED_DIR, '*.html')))
+    return [pytest.param(path, id=os.path.relpath(path)) for path in paths]
+
+def _generated_pages() -> list:
+    return [
+        pytest.param(fixtures.search_page(0, 0, per_page=3, padding=2000), id='generated-search'),
+        pytest.param(fixtures.room_page('1000001', padding=2000), id='generated-room'),
+    ]
+
+def soup_deferred_state(html: str) -> str | None:
+    script_element = BeautifulSoup(html, 'html.parser').find('script', id='data-deferred-state-0')
+    if not (script_element and script_element.string):
+        return None
+    return script_element.string
+
+def assert_scan_matches_soup(html: str) -> None:
+    expected = soup_deferred_state(html)
+    assert main.extract_deferred_state(html) == expected
+
+    # Whenever the scan commits to a span, it must be the element soup finds, on text and on bytes
+    text_span = main.find_deferred_state_span(html)
+    if text_span is not None:
+        assert (html[text_span[0]:text_span[1]] or None) == expected
+    raw = html.encode('utf-8')
+    bytes_span = main.find_deferred_state_span(raw)
+    if bytes_span is not None:
+        assert (raw[bytes_span[0]:bytes_span[1]].decode('utf-8') or None) == expected
+
+@pytest.mark.parametrize('path', _fixture_pages())
+def test_fixture_pages_match_soup(path):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    assert soup_deferred_state(html) is not None
+    assert_scan_matches_soup(html)
+
+@pytest.mark.parametrize('html', _generated_pages())
+def test_generated_pages_match_soup(html):
+    assert_scan_matches_soup(html)
+
+@pytest.mark.parametrize('html', list(SYNTHETIC_PAGES.values()), ids=list(SYNTHETIC_PAGES))
+def test_synthetic_pages_match_soup(html):
+    assert_scan_matches_soup(html)
+
+def test_commented_out_tag_is_skipped_without_fallback():
+    html = SYNTHETIC_PAGES['commented_out_tag_first']
+    start, end = main.find_deferred_state_span(html)
+    assert html[start:end] == PAYLOAD
+
+def test_gt_inside_quoted_attribute_is_part_of_the_tag():
+    html = SYNTHETIC_PAGES['gt_in_earlier_attribute']
+    start, end = main.find_deferred_state_span(html)
+    assert html[start:end] == PAYLOAD
+
+def test_unterminated_comment_defers_to_soup():
+    assert main.find_deferred_state_span('<!-- <script id="data-deferred-state-0">{}</script>') is None
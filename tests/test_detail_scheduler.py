@@ -0,0 +1,80 @@
+"""
+The detail fetch scheduler backs off on throttling (AIMD), paces each host with a token bucket
+and caps concurrency.
+"""
+import asyncio
+import time
+
+import main
+
+def _scheduler(**settings) -> main.DetailFetchScheduler:
+    defaults = dict(max_concurrency=4, initial_rate=8.0, min_rate=0.5, max_rate=10.0, burst=100.0, rate_increase=0.5, rate_decrease_factor=0.5)
+    return main.DetailFetchScheduler(**{**defaults, **settings})
+
+def _serve_statuses(monkeypatch, statuses: list) -> None:
+    async def fetch_page_async(url, early_stop=main.HTTP_EARLY_STOP):
+        status = statuses.pop(0)
+        return status, ('<html></html>' if status == 200 else None)
+    monkeypatch.setattr(main, 'fetch_page_async', fetch_page_async)
+
+def test_rate_is_cut_on_429_and_grows_on_success(monkeypatch):
+    scheduler = _scheduler()
+    _serve_statuses(monkeypatch, [429, 200, 200, 403, 500])
+    url = f"{main.BASE_AIRBNB_ROOM_URL}1"
+
+    async def run():
+        rates = []
+        for _ in range(5):
+            await scheduler.fetch(url)
+            rates.append(scheduler.stats()['rates'][main.urlparse(url).netloc])
+        return rates
+
+    # Multiplicative decrease on 429/403, additive increase on success, unchanged on other errors
+    assert asyncio.run(run()) == [4.0, 4.5, 5.0, 2.5, 2.5]
+    assert scheduler.stats()['throttled'] == 2
+    assert scheduler.stats()['completed'] == 5
+
+def test_rate_stays_within_bounds(monkeypatch):
+    scheduler = _scheduler(initial_rate=1.0, min_rate=0.5, max_rate=1.5)
+    _serve_statuses(monkeypatch, [429] * 3 + [200] * 4)
+
+    async def run():
+        rates = []
+        for _ in range(7):
+            await scheduler.fetch(f"{main.BASE_AIRBNB_ROOM_URL}2")
+            rates.append(next(iter(scheduler.stats()['rates'].values())))
+        return rates
+
+    assert asyncio.run(run()) == [0.5, 0.5, 0.5, 1.0, 1.5, 1.5, 1.5]
+
+def test_token_bucket_paces_requests_after_the_burst():
+    bucket = main.TokenBucket(rate=50.0, capacity=2.0)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens are available at once, the other three arrive at 50 per second
+    assert asyncio.run(run()) >= 3 / 50 * 0.9
+
+def test_concurrency_is_capped(monkeypatch):
+    scheduler = _scheduler(max_concurrency=2)
+    active = {'now': 0, 'peak': 0}
+
+    async def fetch_page_async(url, early_stop=main.HTTP_EARLY_STOP):
+        active['now'] += 1
+        active['peak'] = max(active['peak'], active['now'])
+        await asyncio.sleep(0.01)
+        active['now'] -= 1
+        return 200, '<html></html>'
+
+    monkeypatch.setattr(main, 'fetch_page_async', fetch_page_async)
+
+    async def run():
+        await asyncio.gather(*(scheduler.fetch(f"{main.BASE_AIRBNB_ROOM_URL}{k}") for k in range(6)))
+
+    asyncio.run(run())
+    assert active['peak'] == 2
+    assert scheduler.stats()['queue_depth'] == 0
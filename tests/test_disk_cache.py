@@ -0,0 +1,86 @@
+"""
+The persistent response cache survives a reopen, expires entries per URL class and evicts the least
+recently used entries past its size limit.
+"""
+import asyncio
+import time
+import zlib
+
+import pytest
+
+import fixtures
+import main
+
+ROOM_URL = f"{main.BASE_AIRBNB_ROOM_URL}8000001?adults=1&check_in=2025-08-01"
+SEARCH_URL = f"{main.AIRBNB_BASE_URL}/s/Lisbon/homes?adults=1"
+
+def test_payload_survives_a_reopen(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = main.DiskResponseCache(path)
+    cache.put(ROOM_URL, '{"payload": "é"}')
+    cache.close()
+
+    reopened = main.DiskResponseCache(path)
+    try:
+        # Keys are normalized: host case, query order and fragments do not matter
+        same_url = ROOM_URL.replace('airbnb', 'AIRBNB').replace('adults=1&check_in=2025-08-01', 'check_in=2025-08-01&adults=1') + '#photos'
+        assert reopened.get(same_url) == '{"payload": "é"}'
+        assert reopened.get(SEARCH_URL) is None
+        assert (reopened.stats()['hits'], reopened.stats()['misses']) == (1, 1)
+    finally:
+        reopened.close()
+
+def test_entries_expire_per_url_class(tmp_path):
+    cache = main.DiskResponseCache(str(tmp_path / 'cache.sqlite3'), ttls={'search': 0.05, 'room': 60})
+    try:
+        cache.put(SEARCH_URL, 'search payload')
+        cache.put(ROOM_URL, 'room payload')
+        time.sleep(0.06)
+        assert cache.get(SEARCH_URL) is None
+        assert cache.get(ROOM_URL) == 'room payload'
+    finally:
+        cache.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len(zlib.compress(b'payload-1'))
+    cache = main.DiskResponseCache(str(tmp_path / 'cache.sqlite3'), max_bytes=2 * entry_size)
+    urls = [f"{main.BASE_AIRBNB_ROOM_URL}{k}" for k in range(1, 4)]
+    try:
+        cache.put(urls[0], 'payload-1')
+        time.sleep(0.01)
+        cache.put(urls[1], 'payload-2')
+        time.sleep(0.01)
+        assert cache.get(urls[0]) == 'payload-1'
+        time.sleep(0.01)
+        cache.put(urls[2], 'payload-3')
+
+        assert [cache.get(url) for url in urls] == ['payload-1', None, 'payload-3']
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] <= 2 * entry_size
+    finally:
+        cache.close()
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'DISK_CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setattr(main, 'PARSE_EXECUTOR', 'inline')
+    main.close_disk_cache()
+    yield
+    main.close_disk_cache()
+
+def test_loaded_page_is_served_from_the_cache_without_fetching(disk_cache):
+    html = fixtures.room_page('8000002', padding=2000)
+    fetches = []
+
+    async def fetch(url: str) -> str | None:
+        fetches.append(url)
+        return html if len(fetches) == 1 else None
+
+    async def load_twice():
+        url = f"{main.BASE_AIRBNB_ROOM_URL}8000002"
+        first = await main.load_page_async(url, main.build_section_index, fetch=fetch)
+        return first, await main.load_page_async(url, main.build_section_index, fetch=fetch)
+
+    first, second = asyncio.run(load_twice())
+    assert first == second != {}
+    assert len(fetches) == 1
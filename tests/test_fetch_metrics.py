@@ -0,0 +1,50 @@
+"""
+Byte counters of fetches count what was downloaded: compressed bytes on the wire, not the decoded page.
+"""
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+import main
+
+PAGE = ('<html>' + '<p>filler</p>' * 2000 + '<script id="data-deferred-state-0">{"ok":1}</script>' + '<p>filler</p>' * 2000 + '</html>').encode()
+COMPRESSED = gzip.compress(PAGE)
+
+def _received() -> float:
+    return main.metrics.snapshot().get('http_bytes_received_total', 0)
+
+class WireStream(httpx.AsyncByteStream):
+    """
+    Streams the body in chunks like a network response does; bytes given as content count as already read.
+    """
+    async def __aiter__(self):
+        for offset in range(0, len(COMPRESSED), 64):
+            yield COMPRESSED[offset:offset + 64]
+
+def _fetch_with(monkeypatch, status: int, early_stop: bool) -> tuple[int | None, str | None]:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status, stream=WireStream(), headers={'Content-Encoding': 'gzip'})
+
+    async def fetch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(main, 'get_http_client', lambda: client)
+            return await main.fetch_page_async(f"{main.BASE_AIRBNB_ROOM_URL}7000001", early_stop=early_stop)
+
+    return asyncio.run(fetch())
+
+@pytest.mark.parametrize('early_stop', [False, True])
+def test_received_bytes_are_wire_bytes(monkeypatch, early_stop):
+    before = _received()
+    status, html = _fetch_with(monkeypatch, 200, early_stop)
+    assert status == 200 and '"ok":1' in html
+    received = _received() - before
+    assert 0 < received <= len(COMPRESSED) < len(PAGE)
+    if not early_stop:
+        assert received == len(COMPRESSED)
+
+def test_received_bytes_of_error_responses_are_wire_bytes(monkeypatch):
+    before = _received()
+    assert _fetch_with(monkeypatch, 503, early_stop=True) == (503, None)
+    assert _received() - before == len(COMPRESSED)
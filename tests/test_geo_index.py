@@ -0,0 +1,75 @@
+"""
+The listing geo index answers radius and bounding box queries exactly like a brute-force scan,
+and keeps its own copies of the listings it is given.
+"""
+import random
+import time
+
+import pytest
+
+import main
+
+def _random_rooms() -> list:
+    rng = random.Random(1)
+    rooms = [main.ListingRecord(listing_id=str(k), latitude=rng.uniform(-89, 89), longitude=rng.uniform(-180, 180)) for k in range(5000)]
+    # A dense city, and listings on both sides of the antimeridian
+    rooms += [main.ListingRecord(listing_id=f"hk{k}", latitude=22.28 + rng.uniform(-0.1, 0.1), longitude=114.15 + rng.uniform(-0.1, 0.1)) for k in range(3000)]
+    rooms += [main.ListingRecord(listing_id=f"am{k}", latitude=rng.uniform(-1, 1), longitude=rng.choice([179.99, -179.99])) for k in range(100)]
+    return rooms
+
+@pytest.fixture(scope='module')
+def indexed_rooms():
+    rooms = _random_rooms()
+    index = main.ListingGeoIndex(max_size=100_000, ttl=1e9)
+    index.add(rooms)
+    return index, rooms
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (22.28, 114.15, 1), (22.28, 114.15, 5), (0, 180, 10), (0, -179.995, 3), (88.9, 10, 300), (10, 10, 2000),
+])
+def test_radius_matches_brute_force(indexed_rooms, latitude, longitude, radius_km):
+    index, rooms = indexed_rooms
+    found = index.within_radius(latitude, longitude, radius_km)
+
+    expected = sorted(room.listing_id for room in rooms if main.haversine_km(latitude, longitude, room.latitude, room.longitude) <= radius_km)
+    assert sorted(room.listing_id for _, room in found) == expected
+    assert [distance for distance, _ in found] == sorted(distance for distance, _ in found)
+
+@pytest.mark.parametrize('bounding_box', [(22.2, 114.1, 22.3, 114.2), (-1, 179, 1, -179), (-90, -180, 90, 180), (10, 10, 10.5, 10.5)])
+def test_bounding_box_matches_brute_force(indexed_rooms, bounding_box):
+    index, rooms = indexed_rooms
+    found = index.within_bounding_box(bounding_box)
+
+    expected = sorted(room.listing_id for room in rooms if main.in_bounding_box(room.latitude, room.longitude, bounding_box))
+    assert sorted(room.listing_id for room in found) == expected
+
+def test_size_and_ttl_limits():
+    rooms = _random_rooms()[:5]
+    small = main.ListingGeoIndex(max_size=3, ttl=1e9)
+    small.add(rooms)
+    assert sorted(room.listing_id for room in small.within_bounding_box((-90, -180, 90, 180))) == ['2', '3', '4']
+
+    expiring = main.ListingGeoIndex(ttl=0.01)
+    expiring.add(rooms)
+    time.sleep(0.02)
+    assert expiring.within_bounding_box((-90, -180, 90, 180)) == []
+    assert len(expiring) == 0
+
+def test_added_records_are_not_modified():
+    index = main.ListingGeoIndex(ttl=1e9)
+    index.add([main.ListingRecord(listing_id='7000001', latitude=22.28, longitude=114.15)])
+    index.update_details('7000001', {'beds': 2, 'bedrooms': 1, 'bathrooms': 1.0, 'amenities': ['Wifi'], 'location': 'Central'})
+
+    # A fresh search record of the same listing stays as parsed; the index keeps the details
+    fresh = main.ListingRecord(listing_id='7000001', latitude=22.28, longitude=114.15, title='Flat')
+    index.add([fresh])
+    assert fresh == main.ListingRecord(listing_id='7000001', latitude=22.28, longitude=114.15, title='Flat')
+
+    [indexed] = index.within_bounding_box((22, 114, 23, 115))
+    assert indexed is not fresh
+    assert (indexed.title, indexed.bedrooms, indexed.amenities, indexed.location) == ('Flat', 1, ['Wifi'], 'Central')
+
+    # Details merged later reach the index only
+    index.update_details('7000001', {'beds': 3, 'bedrooms': 2, 'bathrooms': None, 'amenities': [], 'location': 'Soho'})
+    assert fresh.location is None
+    assert index.within_bounding_box((22, 114, 23, 115))[0].location == 'Soho'
@@ -0,0 +1,62 @@
+"""
+Over HTTP, the sessions served by one process share the HTTP client, caches and fetch scheduler the
+app holds for its lifetime, and /health reports them.
+"""
+import asyncio
+
+import httpx
+import pytest
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+import main
+
+async def _serve(app) -> tuple[uvicorn.Server, asyncio.Task, str]:
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=0, log_level='warning'))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://127.0.0.1:{port}"
+
+# streamablehttp_client, as in benchmarks/load_test.py, is deprecated in newer mcp releases but exists in all supported ones
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+def test_sessions_share_the_infrastructure(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'DISK_CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+
+    async def run():
+        server, task, base_url = await _serve(main.build_http_app())
+        try:
+            http_client = main._http_client
+            scheduler, search_cache = main.detail_scheduler, main.search_results_cache
+            async with streamablehttp_client(f"{base_url}/mcp") as (read_1, write_1, _), \
+                    streamablehttp_client(f"{base_url}/mcp") as (read_2, write_2, _):
+                async with ClientSession(read_1, write_1) as first, ClientSession(read_2, write_2) as second:
+                    await asyncio.gather(first.initialize(), second.initialize())
+                    await asyncio.gather(first.list_tools(), second.list_tools())
+                    # The app holds the infrastructure once, and each session once more
+                    assert main._infrastructure_users == 3
+                    assert main.active_mcp_sessions == 2
+                    async with httpx.AsyncClient() as client:
+                        health = await client.get(f"{base_url}/health")
+            # Sessions ending leave the shared objects in place for the next ones
+            assert main._infrastructure_users == 1
+            assert main._http_client is http_client and not http_client.is_closed
+            assert (main.detail_scheduler, main.search_results_cache) == (scheduler, search_cache)
+            return health
+        finally:
+            server.should_exit = True
+            await task
+
+    health = asyncio.run(run())
+    assert health.status_code == 200
+    assert health.json()['active_sessions'] == 2
+    assert health.json()['http_client_open'] is True
+    assert main._infrastructure_users == 0
+
+def test_sse_with_several_workers_is_refused(monkeypatch):
+    monkeypatch.setattr(main, 'MCP_TRANSPORT', 'sse')
+    monkeypatch.setattr(main, 'MCP_WORKERS', 2)
+    with pytest.raises(SystemExit, match='AIRBNB_MCP_WORKERS=1'):
+        main.run_http_server()
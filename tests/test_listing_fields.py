@@ -0,0 +1,63 @@
+"""
+Detail levels and field selection decide which listing fields the tools return and whether
+listing pages are fetched for them.
+"""
+import asyncio
+import json
+
+import pytest
+
+import main
+
+INVALID_FIELDS = "Invalid detail_level or fields: detail_level must be one of summary, standard, full"
+
+@pytest.mark.parametrize('detail_level, enrich', [('summary', False), ('standard', False), ('full', True)])
+def test_detail_levels(detail_level, enrich):
+    fields, needs_details = main.resolve_listing_fields(detail_level, None)
+    assert fields == tuple(name for name in main.LISTING_FIELDS if name in main.DETAIL_LEVEL_FIELDS[detail_level])
+    assert needs_details is enrich
+
+def test_selected_fields_come_in_record_order_with_the_listing_id():
+    assert main.resolve_listing_fields('summary', ['price', 'title']) == (('listing_id', 'title', 'price'), False)
+    assert main.resolve_listing_fields('summary', ['amenities']) == (('listing_id', 'amenities'), True)
+
+@pytest.mark.parametrize('detail_level, fields', [('everything', None), ('full', ['price', 'owner_phone'])])
+def test_unknown_detail_level_or_field_is_rejected(detail_level, fields):
+    with pytest.raises(ValueError, match=INVALID_FIELDS):
+        main.resolve_listing_fields(detail_level, fields)
+
+def test_serialized_listings_hold_only_the_selected_fields():
+    records = [main.ListingRecord(listing_id='1', title='Flat', price=40.0, amenities=['Wifi'])]
+
+    compact = main.serialize_listings(records, ('listing_id', 'price'))
+    assert compact == '[{"listing_id":"1","price":40.0}]'
+    assert json.loads(main.serialize_listings(records, ('listing_id', 'price'), pretty=True)) == json.loads(compact)
+    assert '\n' in main.serialize_listings(records, ('listing_id',), pretty=True)
+
+@pytest.mark.parametrize('call', [
+    lambda: main.search_airbnb_listings("Lisbon", "2025-09-01", "2025-09-05", detail_level="everything"),
+    lambda: main.batch_search_airbnb_listings([{"place": "Lisbon"}], "2025-09-01", "2025-09-05", fields=["owner_phone"]),
+    lambda: main.find_nearby_airbnb_listings(38.7, -9.1, detail_level="everything"),
+], ids=['search', 'batch_search', 'find_nearby'])
+def test_tools_reject_unknown_fields(call):
+    assert asyncio.run(call()).startswith(INVALID_FIELDS)
+
+def test_search_skips_listing_pages_unless_fields_need_them(monkeypatch):
+    enrich_flags = []
+
+    async def crawl_search_listings(initial_url, checkin_date, checkout_date, adults, guests, max_pages, on_enriched=None, enrich=True, **kwargs):
+        enrich_flags.append(enrich)
+        return [main.ListingRecord(listing_id='9000001', title='Flat', price=40.0, average_rating=4.5)]
+
+    monkeypatch.setattr(main, 'crawl_search_listings', crawl_search_listings)
+    main.search_results_cache.clear()
+
+    async def search(**selection):
+        return json.loads(await main.search_airbnb_listings("Lisbon", "2025-09-01", "2025-09-05", **selection))
+
+    try:
+        assert asyncio.run(search(fields=['price'])) == [{'listing_id': '9000001', 'price': 40.0}]
+        assert set(asyncio.run(search(detail_level='full'))[0]) == set(main.DETAIL_LEVEL_FIELDS['full'])
+    finally:
+        main.search_results_cache.clear()
+    assert enrich_flags == [False, True]
@@ -0,0 +1,51 @@
+"""
+The bedroom filter reads the bedrooms from the search results where they are stated and only fetches
+the listing pages of the other listings.
+"""
+import asyncio
+
+import pytest
+
+import main
+
+def test_studio_is_zero_bedrooms():
+    studio = main.ListingRecord(listing_id='1', bedrooms=0)
+    assert main.ListingFilters(min_bedrooms=0).matches_details(studio)
+    assert not main.ListingFilters(min_bedrooms=1).matches_details(studio)
+    assert main.parse_secondary_lines([["Studio", "1 bed"]]) == [{'bedrooms': 0, 'beds': 1}]
+
+@pytest.mark.parametrize('min_bedrooms', [None, 0, -1])
+def test_no_bedroom_minimum_filters_nothing(min_bedrooms):
+    filters = main.ListingFilters(min_bedrooms=min_bedrooms)
+    assert not filters.needs_details
+    assert filters.matches_details(main.ListingRecord(listing_id='1'))
+
+def test_only_listings_with_unknown_bedrooms_are_enriched(monkeypatch):
+    filters = main.ListingFilters(min_bedrooms=2)
+    rooms = [
+        main.ListingRecord(listing_id='1', bedrooms=3),
+        main.ListingRecord(listing_id='2'),
+        main.ListingRecord(listing_id='3', bedrooms=0),
+    ]
+    enriched, passed_on = [], []
+
+    async def load_page_async(url, parse, *args, **kwargs):
+        return rooms, {}
+
+    async def enrich_room_details(rooms_to_enrich, on_enriched=None, detail_fetch=None):
+        for room in rooms_to_enrich:
+            enriched.append(room.listing_id)
+            room.bedrooms = 2
+            on_enriched(room)
+
+    monkeypatch.setattr(main, 'load_page_async', load_page_async)
+    monkeypatch.setattr(main, 'enrich_room_details', enrich_room_details)
+
+    found = asyncio.run(main.crawl_search_listings(
+        "https://www.airbnb.com/s/Lisbon/homes", "2025-09-01", "2025-09-05", 1, 1, 1,
+        lambda room: passed_on.append(room.listing_id), enrich=False, enrich_if=filters.needs_listing_page
+    ))
+
+    assert enriched == ['2']
+    assert sorted(passed_on) == ['1', '2', '3']
+    assert [room.listing_id for room in found if filters.matches_details(room)] == ['1', '2']
@@ -0,0 +1,25 @@
+"""
+scrape_airbnb_listings_info reports each listing's failure in its own entry.
+"""
+import asyncio
+import json
+
+import main
+
+def test_unexpected_errors_stay_with_their_listing(monkeypatch):
+    async def load_listing_info(url, max_retries=3, fetch=None):
+        if url.endswith('/4000001'):
+            raise AttributeError("'NoneType' object has no attribute 'get'")
+        if url.endswith('/4000002'):
+            raise main.ListingInfoError("No valid data found for listing 4000002.")
+        return f"info for {url}"
+
+    monkeypatch.setattr(main, 'load_listing_info', load_listing_info)
+    results = json.loads(asyncio.run(main.scrape_airbnb_listings_info(["4000001", "4000002", "4000003"])))
+
+    assert [(result['listing_id'], result['error']) for result in results] == [
+        ('4000001', "Unexpected error for listing 4000001."),
+        ('4000002', "No valid data found for listing 4000002."),
+        ('4000003', None),
+    ]
+    assert results[2]['info'] == f"info for {main.BASE_AIRBNB_ROOM_URL}4000003"
@@ -0,0 +1,71 @@
+"""
+A page is extracted, decoded and normalized in one parse executor call, and only the parsed result
+(plus the payload when the persistent cache stores it) comes back.
+"""
+import asyncio
+
+import pytest
+
+import fixtures
+import main
+
+@pytest.fixture
+def executor_calls(monkeypatch):
+    calls = []
+    timed_call = main._timed_call
+
+    def recording_timed_call(func, *args):
+        calls.append(func.__name__)
+        return timed_call(func, *args)
+
+    monkeypatch.setattr(main, 'PARSE_EXECUTOR', 'inline')
+    monkeypatch.setattr(main, '_timed_call', recording_timed_call)
+    return calls
+
+def _serve(html: str):
+    async def fetch(url: str) -> str:
+        return html
+    return fetch
+
+def test_listing_page_takes_one_executor_call(executor_calls):
+    url = f"{main.BASE_AIRBNB_ROOM_URL}2000001"
+    section_index = asyncio.run(main.get_section_index_async(url, fetch=_serve(fixtures.room_page('2000001', padding=2000))))
+
+    assert executor_calls == ['parse_page']
+    assert set(section_index) <= main.INDEXED_SECTION_TYPES
+    assert 'REVIEWS' not in section_index
+    assert main.extract_section_fields(section_index, main.LISTING_DETAIL_EXTRACTORS)['bedrooms'] == 1
+
+def test_listing_info_formats_without_another_executor_call(executor_calls):
+    url = f"{main.BASE_AIRBNB_ROOM_URL}2000002"
+    info = asyncio.run(main.load_listing_info(url, fetch=_serve(fixtures.room_page('2000002', padding=2000))))
+
+    assert executor_calls == ['parse_page']
+    assert '# Airbnb Location:' in info
+
+def test_payload_is_only_returned_for_the_persistent_cache():
+    html = fixtures.room_page('2000003', padding=2000)
+
+    payload, section_index = main.parse_page(html, False, main.build_section_index)
+    assert payload is None
+    payload, _ = main.parse_page(html, True, main.build_section_index)
+    assert payload == main.extract_deferred_state(html)
+    assert main.parse_page('<html></html>', True, main.build_section_index) is None
+
+def test_process_executor_matches_inline(monkeypatch):
+    html = fixtures.search_page(7, 0, per_page=4, padding=2000)
+    args = ('2025-08-01', '2025-08-06', 2, 2)
+    inline_rooms, inline_pagination = main.parse_page(html, False, main.parse_search_results, *args)[1]
+
+    async def load_in_process_pool():
+        try:
+            return await main.load_page_async(f"{main.AIRBNB_BASE_URL}/s/Hong-Kong/homes", main.parse_search_results, *args, fetch=_serve(html))
+        finally:
+            main.shutdown_parse_executor()
+
+    monkeypatch.setattr(main, 'PARSE_EXECUTOR', 'process')
+    monkeypatch.setattr(main, 'PARSE_WORKERS', 1)
+    rooms, pagination = asyncio.run(load_in_process_pool())
+
+    assert pagination == inline_pagination
+    assert rooms == inline_rooms
@@ -0,0 +1,69 @@
+"""
+Identical concurrent searches share one crawl, whether they stream their results or not.
+"""
+import asyncio
+import json
+
+import pytest
+
+import main
+
+@pytest.fixture
+def crawls(monkeypatch):
+    """
+    Replaces the crawl with one that waits for release before finding two listings.
+    """
+    state = {'calls': 0, 'release': None}
+
+    async def crawl_search_listings(initial_url, checkin_date, checkout_date, adults, guests, max_pages, on_enriched=None, enrich=True, **kwargs):
+        state['calls'] += 1
+        await state['release'].wait()
+        rooms = [main.ListingRecord(listing_id=str(5000000 + k), title=f"Flat {k}", average_rating=4.5) for k in range(2)]
+        for room in rooms:
+            if on_enriched is not None:
+                on_enriched(room)
+        return rooms
+
+    monkeypatch.setattr(main, 'crawl_search_listings', crawl_search_listings)
+    main.search_results_cache.clear()
+    yield state
+    main.search_results_cache.clear()
+
+def _search(place: str, stream: bool):
+    return main.search_airbnb_listings(place, "2025-09-01", "2025-09-05", detail_level="summary", stream=stream)
+
+@pytest.mark.parametrize('first_streams, second_streams', [(True, False), (False, True), (True, True)])
+def test_identical_searches_share_one_crawl(crawls, first_streams, second_streams):
+    async def run():
+        crawls['release'] = asyncio.Event()
+        first = asyncio.create_task(_search("Lisbon", first_streams))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_search("Lisbon", second_streams))
+        await asyncio.sleep(0)
+        crawls['release'].set()
+        return await asyncio.gather(first, second)
+
+    first, second = asyncio.run(run())
+
+    assert crawls['calls'] == 1
+    assert json.loads(first) == json.loads(second)
+    assert len(json.loads(first)) == 2
+
+def test_abandoned_streaming_crawl_is_not_shared(crawls):
+    async def run():
+        crawls['release'] = asyncio.Event()
+        streaming = asyncio.create_task(_search("Porto", True))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(_search("Porto", False))
+        await asyncio.sleep(0)
+        streaming.cancel()
+        await asyncio.sleep(0)
+        crawls['release'].set()
+        return await waiting, streaming
+
+    result, streaming = asyncio.run(run())
+
+    assert streaming.cancelled()
+    assert crawls['calls'] == 2
+    assert len(json.loads(result)) == 2
+    assert main.search_results_cache.stats()['in_flight'] == 0
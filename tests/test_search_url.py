@@ -0,0 +1,13 @@
+"""
+Search result page URLs.
+"""
+import main
+
+def test_next_page_url_encodes_the_cursor():
+    initial_url = main.build_search_url("Lisbon", "2025-09-01", "2025-09-05")
+    url = main.next_page_url(initial_url, "eyJh+Yi/c==")
+
+    query = main.parse_qs(main.urlparse(url).query)
+    assert query['cursor'] == ["eyJh+Yi/c=="]
+    assert query['checkin'] == ["2025-09-01"]
+    assert query['refinement_paths[]'] == ["/homes"]
@@ -0,0 +1,71 @@
+"""
+Counts parsed from the secondaryLine texts of search listings, in English and localized forms.
+"""
+import pytest
+
+import main
+
+CASES = [
+    # English
+    ("1 bed", {'beds': 1}),
+    ("2 beds", {'beds': 2}),
+    ("1 bedroom", {'bedrooms': 1}),
+    ("3 bedrooms", {'bedrooms': 3}),
+    ("1 bath", {'bathrooms': 1.0}),
+    ("1.5 baths", {'bathrooms': 1.5}),
+    ("1 shared bath", {'bathrooms': 1.0}),
+    ("1 guest", {'guests': 1}),
+    ("4 guests", {'guests': 4}),
+    # German
+    ("1 Bett", {'beds': 1}),
+    ("3 Betten", {'beds': 3}),
+    ("2 Schlafzimmer", {'bedrooms': 2}),
+    ("1 Bad", {'bathrooms': 1.0}),
+    ("1 Gast", {'guests': 1}),
+    ("2 Gäste", {'guests': 2}),
+    # Italian
+    ("1 letto", {'beds': 1}),
+    ("2 letti", {'beds': 2}),
+    ("1 camera da letto", {'bedrooms': 1}),
+    ("1 bagno", {'bathrooms': 1.0}),
+    ("1 ospite", {'guests': 1}),
+    ("3 ospiti", {'guests': 3}),
+    # Spanish
+    ("1 cama", {'beds': 1}),
+    ("2 habitaciones", {'bedrooms': 2}),
+    ("1,5 baños", {'bathrooms': 1.5}),
+    ("1 huésped", {'guests': 1}),
+    ("2 huéspedes", {'guests': 2}),
+    # Portuguese
+    ("2 quartos", {'bedrooms': 2}),
+    ("1 banheiro", {'bathrooms': 1.0}),
+    ("1 hóspede", {'guests': 1}),
+    ("4 hóspedes", {'guests': 4}),
+    # French
+    ("1 lit", {'beds': 1}),
+    ("2 chambres", {'bedrooms': 2}),
+    ("1 salle de bain", {'bathrooms': 1.0}),
+    ("1 voyageur", {'guests': 1}),
+    ("4 voyageurs", {'guests': 4}),
+    # A studio is 0 bedrooms
+    ("Studio", {'bedrooms': 0}),
+    ("Estudio", {'bedrooms': 0}),
+    ("Monolocale", {'bedrooms': 0}),
+]
+
+@pytest.mark.parametrize('text, expected', CASES, ids=[text for text, _ in CASES])
+def test_secondary_line_counts(text, expected):
+    assert main.parse_secondary_lines([[text]]) == [expected]
+
+def test_counts_stay_with_their_listing():
+    lines = [["1 Bett", "2 Gäste"], ["2 letti · 1 camera da letto"], [], ["1 huésped"]]
+    assert main.parse_secondary_lines(lines) == [
+        {'beds': 1, 'guests': 2},
+        {'beds': 2, 'bedrooms': 1},
+        {},
+        {'guests': 1},
+    ]
+
+@pytest.mark.parametrize('text', ["1 Bettwäsche", "2 lettori", "1 guesthouse", "3 ospitalità"])
+def test_longer_words_are_not_counts(text):
+    assert main.parse_secondary_lines([[text]]) == [{}]
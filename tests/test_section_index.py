@@ -0,0 +1,78 @@
+"""
+Listing page payloads with unexpected shapes are either indexed around or rejected with ValueError,
+and loading listing info turns any failure into a ListingInfoError with a user-facing message.
+"""
+import asyncio
+import json
+
+import pytest
+
+import main
+
+def _payload(presentation) -> str:
+    return json.dumps({"niobeMinimalClientData": [["StaysPdpSections", {"data": {"presentation": presentation}}]]})
+
+def _page(presentation) -> str:
+    return f'<html><script id="data-deferred-state-0">{_payload(presentation)}</script></html>'
+
+@pytest.fixture(params=['targeted', 'full'])
+def json_decode(request, monkeypatch):
+    monkeypatch.setattr(main, 'JSON_DECODE', request.param)
+    return request.param
+
+def test_entries_that_are_not_objects_are_skipped(json_decode):
+    presentation = {
+        "stayProductDetail": {"sections": {"sectionData": [None, "x", {"sectionType": "LOCATION", "title": "Central"}]}},
+        "stayProductDetailPage": {"sections": {"sections": [None, 3, {"sectionComponentType": "LOCATION_PDP", "section": {"subtitle": "Central"}}]}},
+    }
+    section_index = main.build_section_index(_payload(presentation))
+
+    assert section_index == {
+        'LOCATION': [{"sectionType": "LOCATION", "title": "Central"}],
+        'LOCATION_PDP': [{"subtitle": "Central"}],
+    }
+
+@pytest.mark.parametrize('presentation', [
+    {"stayProductDetail": {"sections": []}},
+    {"stayProductDetail": {"sections": {"sectionData": {"sectionType": "LOCATION"}}}},
+    {"stayProductDetailPage": {"sections": {"sections": "LOCATION_PDP"}}},
+    {"stayProductDetailPage": {"sections": {"sections": [{}]}}, "stayProductDetail": {"sections": 1}},
+], ids=['sections_list', 'section_data_object', 'sections_string', 'sections_number'])
+def test_structural_surprises_raise_value_error(json_decode, presentation):
+    with pytest.raises(ValueError):
+        main.build_section_index(_payload(presentation))
+
+@pytest.mark.parametrize('payload', ['[]', '{"niobeMinimalClientData": [1]}', '{"niobeMinimalClientData": [["x", {"data": []}]]}'])
+def test_unexpected_payload_shapes_raise_value_error(monkeypatch, payload):
+    monkeypatch.setattr(main, 'JSON_DECODE', 'full')
+    with pytest.raises(ValueError):
+        main.build_section_index(payload)
+
+def _load_listing_info(listing_id: str, fetch) -> str:
+    return asyncio.run(main.load_listing_info(f"{main.BASE_AIRBNB_ROOM_URL}{listing_id}", max_retries=1, fetch=fetch))
+
+def test_listing_info_skips_null_sections(monkeypatch):
+    monkeypatch.setattr(main, 'PARSE_EXECUTOR', 'inline')
+
+    async def fetch(url: str) -> str:
+        return _page({"stayProductDetailPage": {"sections": {"sections": [None, {"sectionComponentType": "LOCATION_PDP", "section": {"subtitle": "Central"}}]}}})
+
+    assert "{'subtitle': 'Central'}" in _load_listing_info('3000001', fetch)
+
+def test_structural_surprises_become_a_listing_info_error(monkeypatch):
+    monkeypatch.setattr(main, 'PARSE_EXECUTOR', 'inline')
+
+    async def fetch(url: str) -> str:
+        return _page({"stayProductDetail": {"sections": []}})
+
+    with pytest.raises(main.ListingInfoError, match=r"^No valid data found for listing 3000002\.$"):
+        _load_listing_info('3000002', fetch)
+
+def test_unexpected_errors_become_a_listing_info_error(monkeypatch):
+    monkeypatch.setattr(main, 'PARSE_EXECUTOR', 'inline')
+
+    async def fetch(url: str) -> str:
+        raise RuntimeError("boom")
+
+    with pytest.raises(main.ListingInfoError, match=r"^Unexpected error for listing 3000003\.$"):
+        _load_listing_info('3000003', fetch)
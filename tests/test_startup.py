@@ -0,0 +1,45 @@
+"""
+The stdio server starts quickly and leaves lazily loaded modules unimported.
+"""
+import os
+import subprocess
+import sys
+
+import startup_time
+
+# Only guards against a hang; the startup budget is checked against a bare mcp import instead
+READY_TIMEOUT_S = 60
+# Time to ready may exceed importing mcp.server.fastmcp alone by at most this much
+STARTUP_MARGIN_MS = float(os.environ.get('AIRBNB_STARTUP_MARGIN_MS', '1000'))
+
+def test_stdio_server_answers_initialize_and_tools_list(tmp_path):
+    initialized, ready, tool_count = startup_time.handshake(str(tmp_path), timeout=READY_TIMEOUT_S)
+
+    assert initialized <= ready < READY_TIMEOUT_S
+    assert tool_count >= 7
+
+def test_time_to_ready_stays_close_to_importing_mcp(tmp_path):
+    workdir = str(tmp_path)
+    startup_time.handshake(workdir, timeout=READY_TIMEOUT_S)  # warm the bytecode cache, as startup_time.py does
+    # Best of a few runs on both sides, so a single slow run does not fail the test
+    ready = min(startup_time.handshake(workdir, timeout=READY_TIMEOUT_S)[1] for _ in range(3))
+    baseline = min(startup_time.mcp_import_time(workdir) for _ in range(3))
+
+    assert (ready - baseline) * 1000 < STARTUP_MARGIN_MS, f"ready after {ready * 1000:.0f} ms, mcp import alone {baseline * 1000:.0f} ms"
+
+def test_lazy_modules_are_not_imported_at_startup(tmp_path):
+    # mcp already imports multiprocessing (mcp.server.sse -> sse_starlette -> uvicorn._subprocess), so
+    # checking sys.modules cannot tell whether main imports it too. Once mcp is loaded, the lazy modules
+    # are made unimportable instead: any import of them while main loads raises ImportError.
+    check = (
+        "import sys, mcp.server.fastmcp\n"
+        "lazy = ('bs4', 'multiprocessing', 'concurrent.futures.process')\n"
+        "for name in [m for m in sys.modules if m in lazy or m.startswith(tuple(l + '.' for l in lazy))] + list(lazy):\n"
+        "    sys.modules[name] = None\n"
+        "import main\n"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', check], cwd=str(tmp_path), capture_output=True, text=True, timeout=READY_TIMEOUT_S,
+        env={**os.environ, 'PYTHONPATH': os.path.dirname(startup_time.MAIN)},
+    )
+    assert result.returncode == 0, result.stderr
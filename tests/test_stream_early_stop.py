@@ -0,0 +1,110 @@
+"""
+Reading a streamed page until the data-deferred-state-0 script closes yields the same payload as
+scanning the whole page, however the body is split into chunks.
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+
+import fixtures
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def _fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+PAGES = {
+    'search_fixture': _fixture('search-page.html'),
+    'room_fixture': _fixture('room-page.html'),
+    'generated_room': fixtures.room_page('6000001', padding=2000).encode(),
+    'commented_out_tag_first': (
+        '<html><!-- <script id="data-deferred-state-0">{"old":1}</script> -->'
+        '<script data-x="a>b" id="data-deferred-state-0">{"new":1}</script>' + 'x' * 3000 + '</html>'
+    ).encode(),
+    'multibyte_text': ('<html><p>Ünïcödé 住宿</p><script id="data-deferred-state-0">{"t":"résumé ✓"}</script>' + 'é' * 2000).encode(),
+    'unclosed_script': b'<html><script id="data-deferred-state-0">{"cut":',
+    'missing': b'<html><body>' + b'y' * 3000 + b'</body></html>',
+}
+
+class ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.sent = 0
+
+    async def __aiter__(self):
+        for offset in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[offset:offset + self.chunk_size]
+            self.sent += len(chunk)
+            yield chunk
+
+def _payload(document: bytes) -> bytes | None:
+    payload_span = main.find_deferred_state_span(document)
+    return None if payload_span is None else document[payload_span[0]:payload_span[1]]
+
+def _chunk_sizes(body: bytes) -> list:
+    return sorted({1, 2, 3, 7, 64, 1000, 4096, len(body)})
+
+@pytest.mark.parametrize('name', list(PAGES))
+def test_payload_matches_whole_page_scan_for_every_chunk_size(name):
+    body = PAGES[name]
+    expected = _payload(body)
+
+    async def read(chunk_size: int):
+        stream = ChunkedStream(body, chunk_size)
+        return (*await main.read_until_deferred_state(httpx.Response(200, stream=stream)), stream)
+
+    for chunk_size in _chunk_sizes(body):
+        read_body, payload_at, stopped, stream = asyncio.run(read(chunk_size))
+        assert body.startswith(read_body), chunk_size
+        assert _payload(read_body) == expected, chunk_size
+        if expected is None:
+            assert (read_body, payload_at, stopped) == (body, None, False), chunk_size
+        else:
+            assert read_body.lower().endswith(b'</script'), chunk_size
+            assert payload_at is not None, chunk_size
+            # Without a Content-Length the read always stops at the closing tag
+            assert stream.sent <= len(read_body) + chunk_size, chunk_size
+
+def test_short_tail_is_drained():
+    body = PAGES['commented_out_tag_first']
+    expected = _payload(body)
+
+    async def read():
+        stream = ChunkedStream(body, 64)
+        response = httpx.Response(200, headers={'Content-Length': str(len(body))}, stream=stream)
+        return (*await main.read_until_deferred_state(response, len(body)), stream)
+
+    read_body, payload_at, stopped, stream = asyncio.run(read())
+    assert _payload(read_body) == expected
+    assert not stopped
+    assert stream.sent == len(body)
+
+def test_fetch_stops_early_and_returns_the_same_payload(monkeypatch):
+    body = fixtures.room_page('6000002', padding=400_000).encode()
+    streams = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        stream = ChunkedStream(body, int(request.url.params['chunk']))
+        streams.append(stream)
+        return httpx.Response(200, headers={'Content-Length': str(len(body)), 'Content-Type': 'text/html; charset=utf-8'}, stream=stream)
+
+    async def fetch_all():
+        monkeypatch.setattr(main, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        try:
+            return [await main.get_page_html_async(f"{main.BASE_AIRBNB_ROOM_URL}6000002?chunk={chunk}", early_stop=early_stop)
+                    for chunk, early_stop in ((4096, True), (len(body), True), (4096, False))]
+        finally:
+            await main._http_client.aclose()
+
+    streamed, single_chunk, full = asyncio.run(fetch_all())
+    expected = main.extract_deferred_state(body.decode())
+
+    assert main.extract_deferred_state(streamed) == expected
+    assert main.extract_deferred_state(single_chunk) == expected
+    assert full == body.decode()
+    assert streams[0].sent < len(body)
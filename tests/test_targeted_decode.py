@@ -0,0 +1,62 @@
+"""
+Decoding only the subtrees the parsers read gives the same results as decoding the whole page
+payload, including when a key the targeted decode looks for also appears elsewhere in the payload.
+"""
+import json
+import os
+
+import pytest
+
+import fixtures
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def _fixture_state(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return main.extract_deferred_state(f.read())
+
+def _with_decoy(deferred_state: str, key: str, decoy) -> str:
+    """
+    Puts an unrelated member holding key before the real payload, where a text search finds it first.
+    """
+    return json.dumps({"decoy": {key: decoy}, **json.loads(deferred_state)})
+
+SEARCH_STATES = {
+    'search_fixture': _fixture_state('search-page.html'),
+    'generated_search': main.extract_deferred_state(fixtures.search_page(0, 0, per_page=5, padding=2000)),
+}
+SEARCH_STATES['decoy_stays_search'] = _with_decoy(SEARCH_STATES['generated_search'], 'staysSearch', {"results": {"searchResults": []}})
+SEARCH_STATES['decoy_without_results'] = _with_decoy(SEARCH_STATES['generated_search'], 'staysSearch', {"other": 1})
+
+ROOM_STATES = {
+    'room_fixture': _fixture_state('room-page.html'),
+    'generated_room': main.extract_deferred_state(fixtures.room_page('1000001', padding=2000)),
+}
+ROOM_STATES['decoy_detail'] = _with_decoy(ROOM_STATES['generated_room'], 'stayProductDetail', {"sections": {"sectionData": []}})
+ROOM_STATES['decoy_detail_page'] = _with_decoy(ROOM_STATES['generated_room'], 'stayProductDetailPage', {"sections": {"sections": []}})
+
+def _decode_with(monkeypatch, mode: str, parse, deferred_state: str):
+    monkeypatch.setattr(main, 'JSON_DECODE', mode)
+    return parse(deferred_state)
+
+def _parse_search(deferred_state: str):
+    return main.parse_search_results(deferred_state, '2025-09-01', '2025-09-05', 1, 1)
+
+@pytest.mark.parametrize('name', list(SEARCH_STATES))
+def test_search_page_targeted_matches_full(monkeypatch, name):
+    full = _decode_with(monkeypatch, 'full', _parse_search, SEARCH_STATES[name])
+    assert full[0]
+    assert _decode_with(monkeypatch, 'targeted', _parse_search, SEARCH_STATES[name]) == full
+
+@pytest.mark.parametrize('name', list(ROOM_STATES))
+def test_room_page_targeted_matches_full(monkeypatch, name):
+    full = _decode_with(monkeypatch, 'full', main.build_section_index, ROOM_STATES[name])
+    assert full
+    assert _decode_with(monkeypatch, 'targeted', main.build_section_index, ROOM_STATES[name]) == full
+
+def test_repeated_key_is_not_decoded_on_its_own():
+    assert main.decode_json_subtree('{"a": {"k": 1}, "b": {"k": 2}}', 'a') == {"k": 1}
+    assert main.decode_json_subtree('{"a": 1}', 'k') is None
+    with pytest.raises(ValueError):
+        main.decode_json_subtree('{"a": {"k": 1}, "b": {"k": 2}}', 'k')
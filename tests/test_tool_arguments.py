@@ -0,0 +1,18 @@
+"""
+Tools reject invalid arguments with a plain-text message before doing any work.
+"""
+import asyncio
+
+import pytest
+
+import main
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_batch_search_rejects_a_limit_below_one(limit):
+    result = asyncio.run(main.batch_search_airbnb_listings([{"place": "Lisbon"}], "2025-09-01", "2025-09-05", limit=limit))
+    assert result == "Invalid limit: must be at least 1."
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_search_rejects_a_limit_below_one(limit):
+    result = asyncio.run(main.search_airbnb_listings("Lisbon", "2025-09-01", "2025-09-05", limit=limit))
+    assert result == "Invalid limit: must be at least 1."
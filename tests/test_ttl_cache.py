@@ -0,0 +1,80 @@
+"""
+AsyncTTLCache: entries expire after their TTL, the least recently used go first, and concurrent
+loads of one key run once.
+"""
+import asyncio
+import time
+
+import main
+
+def _counting_loader(value, delay: float = 0.01):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load, calls
+
+def test_concurrent_loads_of_one_key_run_once():
+    cache = main.AsyncTTLCache(max_size=8, ttl=60)
+    load, calls = _counting_loader('page')
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load('k', load) for _ in range(5)))
+
+    assert asyncio.run(run()) == ['page'] * 5
+    assert len(calls) == 1
+    assert cache.stats()['coalesced'] == 4
+    assert cache.stats()['in_flight'] == 0
+
+def test_entries_expire_after_the_ttl():
+    cache = main.AsyncTTLCache(max_size=8, ttl=0.05)
+    load, calls = _counting_loader('page', delay=0)
+
+    async def run():
+        await cache.get_or_load('k', load)
+        await cache.get_or_load('k', load)
+        time.sleep(0.06)
+        return await cache.get_or_load('k', load)
+
+    assert asyncio.run(run()) == 'page'
+    assert len(calls) == 2
+    assert cache.stats()['hits'] == 1
+
+def test_none_is_shared_but_not_cached():
+    cache = main.AsyncTTLCache(max_size=8, ttl=60)
+    load, calls = _counting_loader(None)
+
+    async def run():
+        first = await asyncio.gather(cache.get_or_load('k', load), cache.get_or_load('k', load))
+        return first, await cache.get_or_load('k', load)
+
+    assert asyncio.run(run()) == ([None, None], None)
+    assert len(calls) == 2
+
+def test_least_recently_used_entry_is_evicted():
+    cache = main.AsyncTTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert cache.stats()['evictions'] == 1
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = main.AsyncTTLCache(max_size=8, ttl=60)
+    load, calls = _counting_loader('page', delay=0.02)
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_load('k', load))
+        second = asyncio.create_task(cache.get_or_load('k', load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 'page'
+    assert len(calls) == 1
+    assert cache.get('k') == 'page'